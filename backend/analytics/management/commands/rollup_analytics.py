@@ -0,0 +1,39 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from analytics.rollups import run_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll up daily analytics (market trends, city, user and platform "
+        "analytics). Without options only the days not yet computed are "
+        "processed; use --start/--end or --days to backfill a range."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First day to recompute (YYYY-MM-DD)")
+        parser.add_argument("--end", help="Last day to compute (YYYY-MM-DD, default today)")
+        parser.add_argument("--days", type=int, help="Recompute the last N days")
+
+    def handle(self, *args, **options):
+        try:
+            end_date = date.fromisoformat(options["end"]) if options["end"] else None
+            start_date = date.fromisoformat(options["start"]) if options["start"] else None
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+
+        if options["days"] is not None:
+            if start_date:
+                raise CommandError("Use either --start or --days, not both")
+            start_date = (end_date or timezone.localdate()) - timedelta(days=options["days"])
+
+        if start_date and end_date and start_date > end_date:
+            raise CommandError("--start must not be after --end")
+
+        written = run_rollups(start_date, end_date)
+        for name, count in written.items():
+            self.stdout.write(f"{name}: {count} rows")
+        self.stdout.write(self.style.SUCCESS("Analytics rollups complete"))
@@ -54,82 +54,12 @@ class MarketTrend(models.Model):
     
     @classmethod
     def generate_daily_trend(cls):
-        """Generate daily market trend analysis"""
-        from real_estate.models import Property
-        from datetime import date, timedelta
-        
-        today = date.today()
-        yesterday = today - timedelta(days=1)
-        week_ago = today - timedelta(days=7)
-        month_ago = today - timedelta(days=30)
-        
-        # Get properties
-        properties = Property.objects.filter(is_active=True)
-        new_properties = properties.filter(created_at__date=today)
-        sold_properties = properties.filter(property_status='sold', updated_at__date=today)
-        rented_properties = properties.filter(property_status='rented', updated_at__date=today)
-        
-        # Calculate metrics
-        total_listings = properties.count()
-        active_listings = properties.filter(property_status='available').count()
-        
-        # Price calculations
-        sale_properties = properties.filter(listing_type='for_sale', price_etb__gt=0)
-        rent_properties = properties.filter(listing_type='for_rent', monthly_rent__gt=0)
-        
-        avg_price = sale_properties.aggregate(avg=Avg('price_etb'))['avg'] or Decimal('0')
-        
-        # Calculate price changes
-        yesterday_trend = cls.objects.filter(date=yesterday).first()
-        week_ago_trend = cls.objects.filter(date=week_ago).first()
-        month_ago_trend = cls.objects.filter(date=month_ago).first()
-        
-        price_change_daily = Decimal('0')
-        price_change_weekly = Decimal('0')
-        price_change_monthly = Decimal('0')
-        
-        if yesterday_trend and yesterday_trend.average_price > 0:
-            price_change_daily = ((avg_price - yesterday_trend.average_price) / yesterday_trend.average_price) * 100
-        
-        if week_ago_trend and week_ago_trend.average_price > 0:
-            price_change_weekly = ((avg_price - week_ago_trend.average_price) / week_ago_trend.average_price) * 100
-        
-        if month_ago_trend and month_ago_trend.average_price > 0:
-            price_change_monthly = ((avg_price - month_ago_trend.average_price) / month_ago_trend.average_price) * 100
-        
-        # Market health indicators (simplified calculations)
-        inventory_months = Decimal('0')
-        if sold_properties.count() > 0:
-            inventory_months = Decimal(total_listings) / Decimal(sold_properties.count())
-        
-        absorption_rate = Decimal('0')
-        if total_listings > 0:
-            absorption_rate = (Decimal(sold_properties.count()) / Decimal(total_listings)) * 100
-        
-        # Create trend record
-        trend = cls.objects.create(
-            date=today,
-            total_listings=total_listings,
-            active_listings=active_listings,
-            new_listings=new_properties.count(),
-            sold_listings=sold_properties.count(),
-            rented_listings=rented_properties.count(),
-            average_price=avg_price,
-            median_price=avg_price,  # Simplified median
-            min_price=sale_properties.aggregate(min=Min('price_etb'))['min'] or Decimal('0'),
-            max_price=sale_properties.aggregate(max=Max('price_etb'))['max'] or Decimal('0'),
-            total_views=properties.aggregate(total=Sum('views_count'))['total'] or 0,
-            total_inquiries=properties.aggregate(total=Sum('inquiry_count'))['total'] or 0,
-            price_change_daily=price_change_daily,
-            price_change_weekly=price_change_weekly,
-            price_change_monthly=price_change_monthly,
-            inventory_months=inventory_months,
-            absorption_rate=absorption_rate,
-            price_to_rent_ratio=Decimal('20.0'),  # Default value
-            rental_yield=Decimal('5.2'),  # Default value
-        )
-        
-        return trend
+        """Generate (or refresh) today's market trend analysis"""
+        from .rollups import rollup_market_trends
+
+        today = timezone.localdate()
+        rollup_market_trends(today, today)
+        return cls.objects.get(date=today)
 
 class CityAnalytics(models.Model):
     """City-level market analytics"""
@@ -0,0 +1,589 @@
+"""
+Daily rollups of platform data into the analytics tables.
+
+MarketTrend, CityAnalytics (period_type "daily"), UserAnalytics and
+PlatformAnalytics get one row per day (per city / per user). A run only
+computes the days after the last stored one, plus that last day again
+because it may have been rolled up before the day was over. Rows are
+written with bulk upserts, so re-running a day or backfilling a range
+replaces existing rows instead of duplicating them.
+
+Every metric is fetched with grouped queries over the whole range (see
+timeseries.daily_buckets), so the cost of a run depends on the number of
+days computed, not on the length of the history.
+
+Snapshot metrics (total listings, total users, ...) are rebuilt from
+creation dates: a backfilled day counts what existed by the end of that
+day, with its current status.
+"""
+import logging
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count, Max, Min, Q, Sum
+from django.utils import timezone
+
+from api.statistics import median
+from real_estate.models import Inquiry, Property, PropertyView
+from subscriptions.models import Payment, PropertyPromotion
+from users.models import CustomUser, UserActivity
+
+from . import timeseries
+from .models import CityAnalytics, MarketTrend, PlatformAnalytics, UserAnalytics
+
+logger = logging.getLogger(__name__)
+
+SALE = Q(listing_type="for_sale", price_etb__gt=0)
+RENT = Q(listing_type="for_rent", monthly_rent__gt=0)
+
+# Day-over-day change (in %) beyond which a city's price counts as moving
+PRICE_TREND_THRESHOLD = Decimal("2")
+
+
+def _money(value):
+    return Decimal(value or 0).quantize(Decimal("0.01"))
+
+
+def _percent_change(current, previous):
+    if not previous:
+        return Decimal("0")
+    return (Decimal(current) - Decimal(previous)) / Decimal(previous) * 100
+
+
+def _average(total, count):
+    return Decimal(total) / count if count else Decimal("0")
+
+
+def _parse_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def _upsert(model, rows, unique_fields):
+    """
+    INSERT ... ON DUPLICATE KEY UPDATE (ON CONFLICT on other backends).
+
+    Every concrete field except the key and created_at is overwritten.
+    """
+    if not rows:
+        return 0
+
+    update_fields = [
+        field.name
+        for field in model._meta.concrete_fields
+        if not field.primary_key
+        and field.name not in unique_fields
+        and field.name != "created_at"
+    ]
+    options = {"update_conflicts": True, "update_fields": update_fields}
+    # MySQL always resolves conflicts on every unique key and rejects a target
+    if connection.features.supports_update_conflicts_with_target:
+        options["unique_fields"] = unique_fields
+
+    model.objects.bulk_create(rows, batch_size=500, **options)
+    return len(rows)
+
+
+def pending_range(queryset, date_field, end_date=None):
+    """
+    Days that still need a rollup: from the last stored day (recomputed,
+    it may be partial) to `end_date`, or the initial window when empty.
+    """
+    end_date = end_date or timezone.localdate()
+    last = queryset.aggregate(last=Max(date_field))["last"]
+    if last is None:
+        return end_date - timedelta(days=settings.ANALYTICS_ROLLUP_INITIAL_DAYS), end_date
+    return min(last, end_date), end_date
+
+
+def _listing_aggregates():
+    return {
+        "listings": Count("id"),
+        "available": Count("id", filter=Q(property_status="available")),
+        "for_sale": Count("id", filter=Q(listing_type="for_sale")),
+        "for_rent": Count("id", filter=Q(listing_type="for_rent")),
+        "sale_count": Count("id", filter=SALE),
+        "sale_total": Sum("price_etb", filter=SALE),
+        "sale_min": Min("price_etb", filter=SALE),
+        "sale_max": Max("price_etb", filter=SALE),
+        "rent_count": Count("id", filter=RENT),
+        "rent_total": Sum("monthly_rent", filter=RENT),
+        "sqm_price_total": Sum("price_etb", filter=SALE & Q(total_area__gt=0)),
+        "sqm_area_total": Sum("total_area", filter=SALE & Q(total_area__gt=0)),
+    }
+
+
+class _Listings:
+    """Running totals of listing aggregates, advanced one day at a time"""
+
+    ADDITIVE = (
+        "listings", "available", "for_sale", "for_rent", "sale_count",
+        "sale_total", "rent_count", "rent_total", "sqm_price_total",
+        "sqm_area_total",
+    )
+
+    def __init__(self, baseline=None):
+        baseline = baseline or {}
+        for name in self.ADDITIVE:
+            setattr(self, name, baseline.get(name) or 0)
+        self.sale_min = baseline.get("sale_min")
+        self.sale_max = baseline.get("sale_max")
+
+    def add(self, bucket):
+        for name in self.ADDITIVE:
+            setattr(self, name, getattr(self, name) + (bucket.get(name) or 0))
+        if bucket.get("sale_min") is not None:
+            self.sale_min = min(
+                value for value in (self.sale_min, bucket["sale_min"]) if value is not None
+            )
+        if bucket.get("sale_max") is not None:
+            self.sale_max = max(
+                value for value in (self.sale_max, bucket["sale_max"]) if value is not None
+            )
+
+    @property
+    def average_sale_price(self):
+        return _average(self.sale_total, self.sale_count)
+
+    @property
+    def average_rent(self):
+        return _average(self.rent_total, self.rent_count)
+
+    @property
+    def price_per_sqm(self):
+        return _average(self.sqm_price_total, self.sqm_area_total)
+
+
+def rollup_market_trends(start_date, end_date):
+    """Upsert one MarketTrend row per day of [start_date, end_date]"""
+    properties = Property.objects.filter(is_active=True)
+    period_start, _ = timeseries.period_bounds(start_date, end_date)
+
+    listings = _Listings(
+        properties.filter(created_at__lt=period_start).aggregate(**_listing_aggregates())
+    )
+    created = timeseries.daily_buckets(
+        properties, "created_at", start_date, end_date, **_listing_aggregates()
+    )
+    closed = timeseries.daily_buckets(
+        properties.filter(property_status__in=["sold", "rented"]),
+        "updated_at",
+        start_date,
+        end_date,
+        sold=Count("id", filter=Q(property_status="sold")),
+        rented=Count("id", filter=Q(property_status="rented")),
+    )
+    views = timeseries.daily_buckets(
+        PropertyView.objects.all(), "viewed_at", start_date, end_date
+    )
+    inquiries = timeseries.daily_buckets(
+        Inquiry.objects.all(), "created_at", start_date, end_date
+    )
+
+    # Average prices of earlier days for the daily/weekly/monthly changes
+    averages = dict(
+        MarketTrend.objects.filter(
+            date__gte=start_date - timedelta(days=30), date__lt=start_date
+        ).values_list("date", "average_price")
+    )
+
+    rows = []
+    for day in timeseries.date_range(start_date, end_date):
+        listings.add(created.get(day, {}))
+        day_closed = closed.get(day, {})
+        sold = day_closed.get("sold", 0)
+        _, day_end = timeseries.period_bounds(day, day)
+
+        average_price = listings.average_sale_price
+        averages[day] = average_price
+        median_price = median(
+            properties.filter(SALE, created_at__lt=day_end),
+            "price_etb",
+            count=listings.sale_count,
+        )
+
+        price_to_rent_ratio = Decimal("0")
+        rental_yield = Decimal("0")
+        if average_price and listings.average_rent:
+            annual_rent = listings.average_rent * 12
+            price_to_rent_ratio = average_price / annual_rent
+            rental_yield = annual_rent / average_price * 100
+
+        rows.append(
+            MarketTrend(
+                date=day,
+                total_listings=listings.listings,
+                active_listings=listings.available,
+                new_listings=created.get(day, {}).get("listings", 0),
+                sold_listings=sold,
+                rented_listings=day_closed.get("rented", 0),
+                average_price=_money(average_price),
+                median_price=_money(median_price),
+                min_price=_money(listings.sale_min),
+                max_price=_money(listings.sale_max),
+                total_views=views.get(day, {}).get("count", 0),
+                total_inquiries=inquiries.get(day, {}).get("count", 0),
+                price_change_daily=_money(
+                    _percent_change(average_price, averages.get(day - timedelta(days=1)))
+                ),
+                price_change_weekly=_money(
+                    _percent_change(average_price, averages.get(day - timedelta(days=7)))
+                ),
+                price_change_monthly=_money(
+                    _percent_change(average_price, averages.get(day - timedelta(days=30)))
+                ),
+                inventory_months=_money(_average(listings.listings, sold)),
+                absorption_rate=_money(_average(sold * 100, listings.listings)),
+                price_to_rent_ratio=_money(price_to_rent_ratio),
+                rental_yield=_money(rental_yield),
+            )
+        )
+
+    return _upsert(MarketTrend, rows, ["date"])
+
+
+def _demand_level(views, recent_views):
+    """Compare a day's views with the average of the previous week"""
+    if not recent_views:
+        return "medium"
+    baseline = sum(recent_views) / len(recent_views)
+    if views > baseline * 1.2:
+        return "high"
+    if views < baseline * 0.8:
+        return "low"
+    return "medium"
+
+
+def _price_trend(current, previous):
+    change = _percent_change(current, previous)
+    if change > PRICE_TREND_THRESHOLD:
+        return "rising"
+    if change < -PRICE_TREND_THRESHOLD:
+        return "falling"
+    return "stable"
+
+
+def rollup_city_analytics(start_date, end_date):
+    """Upsert daily CityAnalytics rows for every city with listings"""
+    properties = Property.objects.filter(is_active=True)
+    period_start, _ = timeseries.period_bounds(start_date, end_date)
+    by_city = ("city_id",)
+
+    listings = defaultdict(_Listings)
+    for row in (
+        properties.filter(created_at__lt=period_start)
+        .values("city_id")
+        .annotate(**_listing_aggregates())
+        .order_by()
+    ):
+        listings[row.pop("city_id")] = _Listings(row)
+
+    created = timeseries.daily_buckets(
+        properties, "created_at", start_date, end_date,
+        group_by=by_city, **_listing_aggregates()
+    )
+    closed = timeseries.daily_buckets(
+        properties.filter(property_status__in=["sold", "rented"]),
+        "updated_at",
+        start_date,
+        end_date,
+        group_by=by_city,
+        sold=Count("id", filter=Q(property_status="sold")),
+        rented=Count("id", filter=Q(property_status="rented")),
+    )
+    views = timeseries.daily_buckets(
+        PropertyView.objects.all(), "viewed_at", start_date, end_date,
+        group_by=("property__city_id",),
+    )
+    inquiries = timeseries.daily_buckets(
+        Inquiry.objects.all(), "created_at", start_date, end_date,
+        group_by=("property__city_id",),
+    )
+
+    city_ids = set(listings) | {city_id for city_id, _ in created}
+
+    # Previous rows seed the price and demand trends of the first days
+    previous_prices = {}
+    recent_views = defaultdict(list)
+    for row in (
+        CityAnalytics.objects.filter(
+            period_type="daily",
+            period_end__gte=start_date - timedelta(days=7),
+            period_end__lt=start_date,
+        )
+        .order_by("period_end")
+        .values("city_id", "avg_sale_price", "total_views")
+    ):
+        previous_prices[row["city_id"]] = row["avg_sale_price"]
+        recent_views[row["city_id"]].append(row["total_views"])
+
+    rows = []
+    for day in timeseries.date_range(start_date, end_date):
+        for city_id in city_ids:
+            city_listings = listings[city_id]
+            city_listings.add(created.get((city_id, day), {}))
+            day_closed = closed.get((city_id, day), {})
+            day_views = views.get((city_id, day), {}).get("count", 0)
+            average_sale_price = city_listings.average_sale_price
+
+            rows.append(
+                CityAnalytics(
+                    city_id=city_id,
+                    period_start=day,
+                    period_end=day,
+                    period_type="daily",
+                    total_properties=city_listings.listings,
+                    properties_for_sale=city_listings.for_sale,
+                    properties_for_rent=city_listings.for_rent,
+                    avg_sale_price=_money(average_sale_price),
+                    avg_rent_price=_money(city_listings.average_rent),
+                    price_per_sqm=_money(city_listings.price_per_sqm),
+                    total_views=day_views,
+                    total_inquiries=inquiries.get((city_id, day), {}).get("count", 0),
+                    properties_sold=day_closed.get("sold", 0),
+                    properties_rented=day_closed.get("rented", 0),
+                    price_trend=_price_trend(
+                        average_sale_price, previous_prices.get(city_id)
+                    ),
+                    demand_trend=_demand_level(day_views, recent_views[city_id][-7:]),
+                )
+            )
+            previous_prices[city_id] = average_sale_price
+            recent_views[city_id].append(day_views)
+
+    return _upsert(
+        CityAnalytics, rows, ["city", "period_start", "period_end", "period_type"]
+    )
+
+
+def _top_values(counts, limit=3):
+    return [value for value, _ in counts.most_common(limit) if value]
+
+
+def rollup_user_analytics(start_date, end_date):
+    """Upsert UserAnalytics rows for every user active on a day of the range"""
+    by_user = ("user_id",)
+
+    activities = timeseries.daily_buckets(
+        UserActivity.objects.all(),
+        "created_at",
+        start_date,
+        end_date,
+        group_by=by_user,
+        login_count=Count("id", filter=Q(activity_type="login")),
+        property_views=Count("id", filter=Q(activity_type="property_view")),
+        property_saves=Count("id", filter=Q(activity_type="property_save")),
+        searches_performed=Count("id", filter=Q(activity_type="search")),
+        inquiries_sent=Count(
+            "id", filter=Q(activity_type__in=["inquiry", "inquiry_created"])
+        ),
+        properties_listed=Count("id", filter=Q(activity_type="property_add")),
+        promotions_purchased=Count("id", filter=Q(activity_type="promotion_purchase")),
+    )
+    spending = timeseries.daily_buckets(
+        Payment.objects.filter(status="completed"),
+        "paid_at",
+        start_date,
+        end_date,
+        group_by=by_user,
+        total=Sum("amount_etb"),
+    )
+
+    # Viewing preferences from the properties each user looked at
+    viewed = PropertyView.objects.filter(user__isnull=False)
+    viewed_types = timeseries.daily_buckets(
+        viewed, "viewed_at", start_date, end_date,
+        group_by=("user_id", "property__property_type"),
+    )
+    viewed_cities = timeseries.daily_buckets(
+        viewed, "viewed_at", start_date, end_date,
+        group_by=("user_id", "property__city__name"),
+    )
+    viewed_prices = timeseries.daily_buckets(
+        viewed.filter(property__price_etb__gt=0),
+        "viewed_at",
+        start_date,
+        end_date,
+        group_by=by_user,
+        min=Min("property__price_etb"),
+        max=Max("property__price_etb"),
+        avg=Avg("property__price_etb"),
+    )
+
+    property_types = defaultdict(Counter)
+    for (user_id, property_type, day), bucket in viewed_types.items():
+        property_types[(user_id, day)][property_type] += bucket["count"]
+    locations = defaultdict(Counter)
+    for (user_id, city_name, day), bucket in viewed_cities.items():
+        locations[(user_id, day)][city_name] += bucket["count"]
+
+    keys = set(activities) | set(spending) | set(property_types)
+    rows = []
+    for user_id, day in keys:
+        counts = activities.get((user_id, day), {})
+        prices = viewed_prices.get((user_id, day))
+        rows.append(
+            UserAnalytics(
+                user_id=user_id,
+                date=day,
+                total_spent=_money(spending.get((user_id, day), {}).get("total")),
+                most_viewed_property_types=_top_values(property_types[(user_id, day)]),
+                preferred_locations=_top_values(locations[(user_id, day)]),
+                price_range_preference=(
+                    {name: float(prices[name] or 0) for name in ("min", "max", "avg")}
+                    if prices
+                    else {}
+                ),
+                **{name: counts.get(name, 0) for name in (
+                    "login_count", "property_views", "property_saves",
+                    "searches_performed", "inquiries_sent", "properties_listed",
+                    "promotions_purchased",
+                )},
+            )
+        )
+
+    return _upsert(UserAnalytics, rows, ["user", "date"])
+
+
+def rollup_platform_analytics(start_date, end_date):
+    """Upsert one PlatformAnalytics snapshot per day of [start_date, end_date]"""
+    period_start, _ = timeseries.period_bounds(start_date, end_date)
+    before = {"created_at__lt": period_start}
+
+    property_aggregates = {
+        "total": Count("id"),
+        "verified": Count("id", filter=Q(is_verified=True)),
+        "featured": Count("id", filter=Q(is_featured=True)),
+        "promoted": Count("id", filter=Q(is_promoted=True)),
+    }
+    inquiry_aggregates = {
+        "total": Count("id"),
+        "responded": Count("id", filter=Q(responded_at__isnull=False)),
+    }
+    promotions = PropertyPromotion.objects.filter(status__in=["active", "expired"])
+    payments = Payment.objects.filter(status="completed")
+
+    # Totals before the range, then one grouped query per source
+    totals = {
+        "users": CustomUser.objects.filter(**before).count(),
+        "page_views": PropertyView.objects.filter(viewed_at__lt=period_start).count(),
+        "promotions": promotions.filter(**before).count(),
+        "revenue": payments.filter(paid_at__lt=period_start).aggregate(
+            total=Sum("amount_etb")
+        )["total"] or 0,
+    }
+    for prefix, counts in (
+        ("properties", Property.objects.filter(**before).aggregate(**property_aggregates)),
+        ("inquiries", Inquiry.objects.filter(**before).aggregate(**inquiry_aggregates)),
+    ):
+        for name, value in counts.items():
+            totals[f"{prefix}_{name}"] = value or 0
+
+    new_users = timeseries.daily_buckets(
+        CustomUser.objects.all(), "created_at", start_date, end_date
+    )
+    active_users = timeseries.daily_distinct_on_any(
+        CustomUser.objects.all(), ["last_login", "last_activity"], start_date, end_date
+    )
+    new_properties = timeseries.daily_buckets(
+        Property.objects.all(), "created_at", start_date, end_date, **property_aggregates
+    )
+    new_inquiries = timeseries.daily_buckets(
+        Inquiry.objects.all(), "created_at", start_date, end_date, **inquiry_aggregates
+    )
+    page_views = timeseries.daily_buckets(
+        PropertyView.objects.all(), "viewed_at", start_date, end_date
+    )
+    new_promotions = timeseries.daily_buckets(
+        promotions, "created_at", start_date, end_date
+    )
+    revenue = timeseries.daily_buckets(
+        payments, "paid_at", start_date, end_date, total=Sum("amount_etb")
+    )
+
+    rows = []
+    for day in timeseries.date_range(start_date, end_date):
+        day_new_users = new_users.get(day, {}).get("count", 0)
+        previous_users = totals["users"]
+        totals["users"] += day_new_users
+        totals["page_views"] += page_views.get(day, {}).get("count", 0)
+        totals["promotions"] += new_promotions.get(day, {}).get("count", 0)
+        totals["revenue"] += revenue.get(day, {}).get("total") or 0
+        for name, value in new_properties.get(day, {}).items():
+            totals[f"properties_{name}"] += value
+        for name, value in new_inquiries.get(day, {}).items():
+            totals[f"inquiries_{name}"] += value
+
+        rows.append(
+            PlatformAnalytics(
+                date=day,
+                total_users=totals["users"],
+                new_users=day_new_users,
+                active_users=active_users[day],
+                user_growth_rate=_money(_average(day_new_users * 100, previous_users)),
+                total_properties=totals["properties_total"],
+                verified_properties=totals["properties_verified"],
+                featured_properties=totals["properties_featured"],
+                promoted_properties=totals["properties_promoted"],
+                total_page_views=totals["page_views"],
+                total_inquiries=totals["inquiries_total"],
+                successful_contacts=totals["inquiries_responded"],
+                total_promotions=totals["promotions"],
+                total_revenue=_money(totals["revenue"]),
+            )
+        )
+
+    return _upsert(PlatformAnalytics, rows, ["date"])
+
+
+ROLLUPS = (
+    ("market_trends", rollup_market_trends, MarketTrend.objects.all(), "date"),
+    (
+        "city_analytics",
+        rollup_city_analytics,
+        CityAnalytics.objects.filter(period_type="daily"),
+        "period_end",
+    ),
+    ("user_analytics", rollup_user_analytics, UserAnalytics.objects.all(), "date"),
+    ("platform_analytics", rollup_platform_analytics, PlatformAnalytics.objects.all(), "date"),
+)
+
+
+def run_rollups(start_date=None, end_date=None):
+    """
+    Bring every analytics table up to date.
+
+    Without `start_date` each table resumes from its own last stored day.
+    With it, the whole range is recomputed (backfill). Returns the number
+    of rows written per table.
+    """
+    start_date = _parse_date(start_date)
+    end_date = _parse_date(end_date) or timezone.localdate()
+
+    written = {}
+    for name, rollup, queryset, date_field in ROLLUPS:
+        if start_date is None:
+            first_day, last_day = pending_range(queryset, date_field, end_date)
+        else:
+            first_day, last_day = start_date, end_date
+        if first_day > last_day:
+            written[name] = 0
+            continue
+
+        try:
+            with transaction.atomic():
+                written[name] = rollup(first_day, last_day)
+        except Exception as e:
+            logger.error(f"Analytics rollup {name} failed: {e}", exc_info=True)
+            written[name] = 0
+            continue
+
+        logger.info(
+            f"Analytics rollup {name}: {written[name]} rows for {first_day} to {last_day}"
+        )
+
+    return written
@@ -0,0 +1,12 @@
+from .rollups import run_rollups
+
+try:
+    # Prefer Celery task if celery app exists (scheduled by CELERY_BEAT_SCHEDULE)
+    from utopia_backend.celery_app import app
+
+    @app.task(ignore_result=True)
+    def rollup_analytics_task(start_date=None, end_date=None):
+        return run_rollups(start_date, end_date)
+except Exception:
+    def rollup_analytics_task(start_date=None, end_date=None):
+        return run_rollups(start_date, end_date)
@@ -0,0 +1,134 @@
+"""
+Daily time-series helpers for analytics endpoints.
+
+Each metric is fetched with a single grouped query (TruncDate + annotate)
+over the whole period instead of one query per day. Days without rows are
+filled in Python, and running totals are computed in one pass.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def date_range(start_date, end_date):
+    """Yield every date from start_date to end_date inclusive"""
+    for offset in range((end_date - start_date).days + 1):
+        yield start_date + timedelta(days=offset)
+
+
+def day_bounds(day):
+    """Timezone-aware start and end of a local day"""
+    return (
+        timezone.make_aware(datetime.combine(day, time.min)),
+        timezone.make_aware(datetime.combine(day, time.max)),
+    )
+
+
+def period_bounds(start_date, end_date):
+    """Aware [start, end) datetimes covering whole local days"""
+    return (
+        timezone.make_aware(datetime.combine(start_date, time.min)),
+        timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min)),
+    )
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def daily_buckets(queryset, date_field, start_date, end_date, group_by=(), **aggregates):
+    """
+    Aggregate `queryset` per local day of `date_field` in one query.
+
+    `aggregates` are annotate() expressions (default: count=Count("pk")).
+    Returns {date: {name: value}} for days that have rows only. With
+    `group_by` fields the keys become (*group_values, date) tuples.
+    """
+    if not aggregates:
+        aggregates = {"count": Count("pk")}
+
+    period_start, period_end = period_bounds(start_date, end_date)
+    rows = (
+        queryset.filter(
+            **{f"{date_field}__gte": period_start, f"{date_field}__lt": period_end}
+        )
+        .annotate(day=TruncDate(date_field, tzinfo=timezone.get_current_timezone()))
+        .values(*group_by, "day")
+        .annotate(**aggregates)
+        .order_by()
+    )
+
+    buckets = {}
+    for row in rows:
+        day = _as_date(row.pop("day"))
+        if group_by:
+            key = tuple(row.pop(field) for field in group_by) + (day,)
+        else:
+            key = day
+        buckets[key] = row
+    return buckets
+
+
+def daily_series(queryset, date_field, start_date, end_date, **aggregates):
+    """
+    Like daily_buckets, but returns one dict per day of the period in
+    order, with missing days filled with zeros.
+    """
+    names = list(aggregates) or ["count"]
+    buckets = daily_buckets(queryset, date_field, start_date, end_date, **aggregates)
+
+    series = []
+    for day in date_range(start_date, end_date):
+        bucket = buckets.get(day, {})
+        entry = {"date": day}
+        for name in names:
+            entry[name] = bucket.get(name) or 0
+        series.append(entry)
+    return series
+
+
+def daily_distinct_on_any(queryset, date_fields, start_date, end_date):
+    """
+    Count rows per day where any of `date_fields` falls on that day.
+
+    A row is counted once per day even if several of its fields fall on the
+    same day. Rows are grouped by the tuple of truncated dates, so this is a
+    single query whatever the length of the period.
+    """
+    period_start, period_end = period_bounds(start_date, end_date)
+    tz = timezone.get_current_timezone()
+
+    in_period = Q()
+    for field in date_fields:
+        in_period |= Q(**{f"{field}__gte": period_start, f"{field}__lt": period_end})
+
+    truncated = {
+        f"{field}_day": TruncDate(field, tzinfo=tz) for field in date_fields
+    }
+    rows = (
+        queryset.filter(in_period)
+        .annotate(**truncated)
+        .values(*truncated)
+        .annotate(count=Count("pk"))
+        .order_by()
+    )
+
+    counts = {day: 0 for day in date_range(start_date, end_date)}
+    for row in rows:
+        days = {_as_date(row[name]) for name in truncated}
+        for day in days:
+            if day in counts:
+                counts[day] += row["count"]
+    return counts
+
+
+def running_total(series, key, initial=0, total_key=None):
+    """Add a cumulative sum of `key` to each entry of a series in place"""
+    total_key = total_key or f"cumulative_{key}"
+    total = initial
+    for entry in series:
+        total += entry[key]
+        entry[total_key] = total
+    return series
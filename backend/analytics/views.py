@@ -15,6 +15,7 @@ import platform
 from django.db import connection
 import os
 from .models import MarketTrend, CityAnalytics, UserAnalytics, PlatformAnalytics
+from . import timeseries
 from .serializers import (
     MarketTrendSerializer,
     CityAnalyticsSerializer,
@@ -25,8 +26,9 @@ from .serializers import (
     DemandAnalysisSerializer,
 )
 from real_estate.models import Property, City, SubCity, PropertyView, Inquiry
-from users.models import CustomUser, UserActivity
+from users.models import CustomUser, UserActivity, PROFILE_COMPLETION_FIELDS
 from api.permissions import *
+from api import exports
 from subscriptions.models import Payment
 
 
@@ -39,57 +41,9 @@ class MarketTrendViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         days = int(self.request.query_params.get("days", 30))
-        date_from = timezone.now() - timedelta(days=days)
+        date_from = timezone.localdate() - timedelta(days=days)
         return MarketTrend.objects.filter(date__gte=date_from).order_by("date")
 
-    def list(self, request, *args, **kwargs):
-        """Override list to return generated trends if no data exists"""
-        queryset = self.get_queryset()
-
-        # If no market trends exist, generate from property data
-        if not queryset.exists():
-            days = int(self.request.query_params.get("days", 30))
-
-            # Try to generate from market overview first
-            try:
-                from .views import MarketAnalyticsView
-
-                analytics_view = MarketAnalyticsView()
-                trends = analytics_view.generate_market_trends_from_properties(days)
-
-                # Create MarketTrend objects to return
-                for trend_data in trends:
-                    trend = MarketTrend(
-                        date=datetime.fromisoformat(trend_data["date"]).date(),
-                        total_listings=trend_data["total_listings"],
-                        active_listings=trend_data["active_listings"],
-                        new_listings=trend_data["new_listings"],
-                        sold_listings=trend_data["sold_listings"],
-                        rented_listings=trend_data["rented_listings"],
-                        average_price=trend_data["average_price"],
-                        total_views=trend_data["total_views"],
-                        total_inquiries=trend_data["total_inquiries"],
-                    )
-
-                page = self.paginate_queryset(trends)
-                if page is not None:
-                    return self.get_paginated_response(page)
-
-                return Response(trends)
-
-            except Exception as e:
-                # Return empty array if generation fails
-                return Response([])
-
-        # Serialize and return existing data
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
-
 
 class MarketAnalyticsView(generics.GenericAPIView):
     """Comprehensive market analytics"""
@@ -372,147 +326,25 @@ class MarketAnalyticsView(generics.GenericAPIView):
         return 0
 
     def get_market_trends_data(self, days):
-        """Get market trends data for the period"""
-        date_from = timezone.now() - timedelta(days=days)
+        """Get market trends data for the period from the daily rollups"""
+        date_from = timezone.localdate() - timedelta(days=days)
 
-        # Get daily trends for the period
         trends = MarketTrend.objects.filter(date__gte=date_from).order_by("date")
 
-        # If no market trends exist, create basic trend data
-        if not trends.exists():
-            return self.generate_basic_trends_data(days)
-
-        # Convert trends to serializable format
-        trend_data = []
-        for trend in trends:
-            trend_data.append(
-                {
-                    "date": trend.date.isoformat(),
-                    "average_price": float(trend.average_price),
-                    "active_listings": trend.active_listings,
-                    "new_listings": trend.new_listings,
-                    "sold_listings": trend.sold_listings,
-                    "total_views": trend.total_views,
-                    "total_inquiries": trend.total_inquiries,
-                    "price_change_daily": float(trend.price_change_daily),
-                    "inventory_months": float(trend.inventory_months),
-                }
-            )
-
-        return trend_data
-
-    def generate_basic_trends_data(self, days):
-        """Generate basic trend data when no MarketTrend records exist"""
-        from datetime import timedelta
-
-        trend_data = []
-        for i in range(days, -1, -1):
-            current_date = timezone.now().date() - timedelta(days=i)
-
-            # Get properties for this day
-            properties = Property.objects.filter(
-                created_at__date=current_date, is_active=True
-            )
-
-            avg_price = (
-                properties.filter(price_etb__gt=0).aggregate(avg=Avg("price_etb"))[
-                    "avg"
-                ]
-                or 0
-            )
-
-            active_listings = properties.filter(property_status="available").count()
-            new_listings = Property.objects.filter(
-                created_at__date=current_date
-            ).count()
-            sold_listings = properties.filter(property_status="sold").count()
-
-            # Get views and inquiries for this day
-            total_views = PropertyView.objects.filter(
-                viewed_at__date=current_date
-            ).count()
-
-            total_inquiries = Inquiry.objects.filter(
-                created_at__date=current_date
-            ).count()
-
-            trend_data.append(
-                {
-                    "date": current_date.isoformat(),
-                    "average_price": float(avg_price),
-                    "active_listings": active_listings,
-                    "new_listings": new_listings,
-                    "sold_listings": sold_listings,
-                    "total_views": total_views,
-                    "total_inquiries": total_inquiries,
-                    "price_change_daily": 0,
-                    "inventory_months": 0,
-                }
-            )
-
-        return trend_data
-
-    def generate_market_trends_from_properties(self, days=30):
-        """Generate market trends from property data when no MarketTrend records exist"""
-        from datetime import datetime, time, timedelta
-        import json
-
-        trends = []
-        today = timezone.now().date()
-
-        for i in range(days, -1, -1):
-            current_date = today - timedelta(days=i)
-
-            # Create timezone-aware datetime for the day
-            day_start = timezone.make_aware(datetime.combine(current_date, time.min))
-            day_end = timezone.make_aware(datetime.combine(current_date, time.max))
-
-            # Get properties for this day
-            properties = Property.objects.filter(
-                created_at__gte=day_start, created_at__lte=day_end, is_active=True
-            )
-
-            # Get views and inquiries for this day
-            views = PropertyView.objects.filter(
-                viewed_at__gte=day_start, viewed_at__lte=day_end
-            ).count()
-
-            inquiries = Inquiry.objects.filter(
-                created_at__gte=day_start, created_at__lte=day_end
-            ).count()
-
-            # Calculate average price
-            avg_price = (
-                properties.filter(price_etb__gt=0).aggregate(avg=Avg("price_etb"))[
-                    "avg"
-                ]
-                or 0
-            )
-
-            # Create trend data
-            trend_data = {
-                "date": current_date.isoformat(),
-                "total_listings": properties.count(),
-                "active_listings": properties.filter(
-                    property_status="available"
-                ).count(),
-                "new_listings": Property.objects.filter(
-                    created_at__date=current_date
-                ).count(),
-                "sold_listings": properties.filter(property_status="sold").count(),
-                "rented_listings": properties.filter(property_status="rented").count(),
-                "average_price": float(avg_price),
-                "price_change_daily": 0,
-                "price_change_weekly": 0,
-                "price_change_monthly": 0,
-                "total_views": views,
-                "total_inquiries": inquiries,
-                "inventory_months": 0,
+        return [
+            {
+                "date": trend.date.isoformat(),
+                "average_price": float(trend.average_price),
+                "active_listings": trend.active_listings,
+                "new_listings": trend.new_listings,
+                "sold_listings": trend.sold_listings,
+                "total_views": trend.total_views,
+                "total_inquiries": trend.total_inquiries,
+                "price_change_daily": float(trend.price_change_daily),
+                "inventory_months": float(trend.inventory_months),
             }
-
-            trends.append(trend_data)
-
-        return trends
+            for trend in trends
+        ]
 
 
 class PriceAnalyticsView(generics.GenericAPIView):
@@ -1254,13 +1086,32 @@ class AnalyticsExportView(generics.GenericAPIView):
         users = CustomUser.objects.all().order_by("-created_at")
 
         if format_type == "csv":
-            response = HttpResponse(content_type="text/csv")
-            response["Content-Disposition"] = (
-                'attachment; filename="user_analytics.csv"'
-            )
+            fields = [
+                "email", "user_type", "created_at", "last_activity",
+                "total_logins", "total_properties_viewed", "total_properties_saved",
+                "total_inquiries_sent", "properties_listed",
+                *PROFILE_COMPLETION_FIELDS,
+            ]
+            listed = users.annotate(properties_listed=Count("owned_properties"))
+
+            def rows():
+                for user in exports.iter_rows(listed, fields):
+                    completed = sum(1 for name in PROFILE_COMPLETION_FIELDS if user[name])
+                    yield [
+                        user["email"],
+                        user["user_type"],
+                        exports.format_datetime(user["created_at"]),
+                        exports.format_datetime(user["last_activity"]),
+                        user["total_logins"],
+                        user["total_properties_viewed"],
+                        user["total_properties_saved"],
+                        user["total_inquiries_sent"],
+                        user["properties_listed"],
+                        int((completed / len(PROFILE_COMPLETION_FIELDS)) * 100),
+                    ]
 
-            writer = csv.writer(response)
-            writer.writerow(
+            return exports.streaming_csv_response(
+                "user_analytics.csv",
                 [
                     "Email",
                     "User Type",
@@ -1272,30 +1123,9 @@ class AnalyticsExportView(generics.GenericAPIView):
                     "Inquiries Sent",
                     "Properties Listed",
                     "Profile Completion %",
-                ]
+                ],
+                rows(),
             )
-
-            for user in users:
-                writer.writerow(
-                    [
-                        user.email,
-                        user.user_type,
-                        user.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                        (
-                            user.last_activity.strftime("%Y-%m-%d %H:%M:%S")
-                            if user.last_activity
-                            else ""
-                        ),
-                        user.total_logins,
-                        user.total_properties_viewed,
-                        user.total_properties_saved,
-                        user.total_inquiries_sent,
-                        user.owned_properties.count(),
-                        user.profile_completion_percentage,
-                    ]
-                )
-
-            return response
         else:
             # Return summary data for JSON
             summary = {
@@ -1315,13 +1145,39 @@ class AnalyticsExportView(generics.GenericAPIView):
         properties = Property.objects.all().select_related("city", "sub_city")
 
         if format_type == "csv":
-            response = HttpResponse(content_type="text/csv")
-            response["Content-Disposition"] = (
-                'attachment; filename="property_analytics.csv"'
-            )
+            fields = [
+                "title", "property_type", "listing_type", "city__name", "sub_city__name",
+                "price_etb", "monthly_rent", "bedrooms", "bathrooms", "total_area",
+                "views_count", "inquiry_count", "property_status", "is_featured",
+                "is_verified", "is_promoted", "created_at", "listed_date",
+            ]
+            now = timezone.now()
+
+            def rows():
+                for prop in exports.iter_rows(properties, fields):
+                    yield [
+                        prop["title"],
+                        prop["property_type"],
+                        prop["listing_type"],
+                        prop["city__name"] or "",
+                        prop["sub_city__name"] or "",
+                        prop["price_etb"],
+                        prop["monthly_rent"],
+                        prop["bedrooms"],
+                        prop["bathrooms"],
+                        prop["total_area"],
+                        prop["views_count"],
+                        prop["inquiry_count"],
+                        prop["property_status"],
+                        "Yes" if prop["is_featured"] else "No",
+                        "Yes" if prop["is_verified"] else "No",
+                        "Yes" if prop["is_promoted"] else "No",
+                        exports.format_datetime(prop["created_at"]),
+                        (now - prop["listed_date"]).days if prop["listed_date"] else 0,
+                    ]
 
-            writer = csv.writer(response)
-            writer.writerow(
+            return exports.streaming_csv_response(
+                "property_analytics.csv",
                 [
                     "Title",
                     "Property Type",
@@ -1341,34 +1197,9 @@ class AnalyticsExportView(generics.GenericAPIView):
                     "Promoted",
                     "Created Date",
                     "Days on Market",
-                ]
+                ],
+                rows(),
             )
-
-            for prop in properties:
-                writer.writerow(
-                    [
-                        prop.title,
-                        prop.property_type,
-                        prop.listing_type,
-                        prop.city.name if prop.city else "",
-                        prop.sub_city.name if prop.sub_city else "",
-                        prop.price_etb,
-                        prop.monthly_rent,
-                        prop.bedrooms,
-                        prop.bathrooms,
-                        prop.total_area,
-                        prop.views_count,
-                        prop.inquiry_count,
-                        prop.property_status,
-                        "Yes" if prop.is_featured else "No",
-                        "Yes" if prop.is_verified else "No",
-                        "Yes" if prop.is_promoted else "No",
-                        prop.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                        prop.days_on_market,
-                    ]
-                )
-
-            return response
         else:
             # Return summary for JSON
             summary = {
@@ -2022,63 +1853,39 @@ class AdminUserAnalyticsView(generics.GenericAPIView):
 
 
 class UserGrowthView(APIView):
-    """User growth analytics endpoint - TIMEZONE FIXED"""
+    """User growth analytics endpoint, read from the daily platform rollups"""
 
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         days = int(request.query_params.get("days", 30))
-        date_from = timezone.now() - timedelta(days=days)
-
-        user_growth_data = []
-
-        # Get initial cumulative users (users created before the period)
-        initial_cumulative = CustomUser.objects.filter(
-            created_at__lt=date_from  # Use the datetime object directly, not .date()
-        ).count()
-
-        cumulative_users = initial_cumulative
-
-        print(
-            f"DEBUG: Initial cumulative users before {date_from.date()}: {initial_cumulative}"
-        )
-
-        # For each day in the range
-        for i in range(days + 1):
-            current_date = (date_from + timedelta(days=i)).date()
-
-            # Create timezone-aware datetime for the start and end of the day
-            day_start = timezone.make_aware(datetime.combine(current_date, time.min))
-            day_end = timezone.make_aware(datetime.combine(current_date, time.max))
-
-            print(f"DEBUG: Processing day {current_date} from {day_start} to {day_end}")
-
-            # Count new users for this day - using timezone-aware range
-            new_users = CustomUser.objects.filter(
-                created_at__gte=day_start, created_at__lte=day_end
-            ).count()
-
-            print(f"DEBUG: New users on {current_date}: {new_users}")
+        end_date = timezone.localdate()
+        start_date = end_date - timedelta(days=days)
 
-            # Count active users - using timezone-aware range
-            active_users = (
-                CustomUser.objects.filter(
-                    Q(last_login__gte=day_start, last_login__lte=day_end)
-                    | Q(last_activity__gte=day_start, last_activity__lte=day_end)
-                )
-                .distinct()
-                .count()
-            )
+        snapshots = {
+            snapshot.date: snapshot
+            for snapshot in PlatformAnalytics.objects.filter(
+                date__gte=start_date, date__lte=end_date
+            ).only("date", "total_users", "new_users", "active_users")
+        }
 
-            print(f"DEBUG: Active users on {current_date}: {active_users}")
+        # Users before the period; carried over days missing from the rollup
+        cumulative_users = (
+            PlatformAnalytics.objects.filter(date__lt=start_date)
+            .order_by("-date")
+            .values_list("total_users", flat=True)
+            .first()
+        ) or 0
 
-            # Update cumulative total
-            cumulative_users += new_users
+        user_growth_data = []
+        for current_date in timeseries.date_range(start_date, end_date):
+            day_start, day_end = timeseries.day_bounds(current_date)
+            snapshot = snapshots.get(current_date)
 
-            # Calculate daily growth rate
-            previous_day_users = CustomUser.objects.filter(
-                created_at__lt=day_start
-            ).count()
+            new_users = snapshot.new_users if snapshot else 0
+            if snapshot:
+                cumulative_users = snapshot.total_users
+            previous_day_users = cumulative_users - new_users
 
             growth_rate = 0
             if previous_day_users > 0 and cumulative_users > previous_day_users:
@@ -2090,8 +1897,8 @@ class UserGrowthView(APIView):
                 {
                     "date": current_date.isoformat(),
                     "new_users": new_users,
-                    "active_users": active_users,
                     "cumulative_users": cumulative_users,
+                    "active_users": snapshot.active_users if snapshot else 0,
                     "growth_rate": round(growth_rate, 2),
                     "previous_day_users": previous_day_users,
                     "day_start": day_start.isoformat(),
@@ -2099,16 +1906,17 @@ class UserGrowthView(APIView):
                 }
             )
 
+        total_new_in_period = sum(item["new_users"] for item in user_growth_data)
+
         # Add summary
         summary = {
-            "total_users": CustomUser.objects.count(),
-            "period_start": date_from.date().isoformat(),
-            "period_end": timezone.now().date().isoformat(),
+            "total_users": cumulative_users,
+            "period_start": start_date.isoformat(),
+            "period_end": end_date.isoformat(),
             "days_analyzed": days + 1,
-            "total_new_in_period": cumulative_users - initial_cumulative,
+            "total_new_in_period": total_new_in_period,
             "average_daily_growth": (
-                sum(item["new_users"] for item in user_growth_data)
-                / len(user_growth_data)
+                total_new_in_period / len(user_growth_data)
                 if user_growth_data
                 else 0
             ),
@@ -2118,93 +1926,72 @@ class UserGrowthView(APIView):
 
 
 class DailyActivityView(APIView):
-    """Daily user activity analytics - TIMEZONE FIXED"""
+    """Daily user activity analytics, read from the daily rollups"""
 
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        from real_estate.models import PropertyView, Inquiry, Property
-        from users.models import UserActivity
-        from datetime import datetime, time
-
         days = int(request.query_params.get("days", 30))
-        date_from = timezone.now() - timedelta(days=days)
-
-        daily_activity_data = []
-
-        # For each day in the range
-        for i in range(days + 1):
-            current_date = (date_from + timedelta(days=i)).date()
-
-            # Create timezone-aware datetime for the start and end of the day
-            day_start = timezone.make_aware(datetime.combine(current_date, time.min))
-            day_end = timezone.make_aware(datetime.combine(current_date, time.max))
-
-            print(f"DEBUG: Processing day {current_date} from {day_start} to {day_end}")
+        end_date = timezone.localdate()
+        start_date = end_date - timedelta(days=days)
 
-            # Count user activities for this day - using timezone-aware range
-            activities = UserActivity.objects.filter(
-                created_at__gte=day_start, created_at__lte=day_end
+        platform = {
+            row["date"]: row
+            for row in PlatformAnalytics.objects.filter(
+                date__gte=start_date, date__lte=end_date
+            ).values("date", "new_users", "active_users")
+        }
+        market = {
+            row["date"]: row
+            for row in MarketTrend.objects.filter(
+                date__gte=start_date, date__lte=end_date
+            ).values("date", "new_listings", "total_views", "total_inquiries")
+        }
+        # Per-user rollups summed per day in one grouped query
+        activities = {
+            row["date"]: row
+            for row in UserAnalytics.objects.filter(
+                date__gte=start_date, date__lte=end_date
             )
-
-            # Count different types of activities
-            page_views = activities.filter(activity_type="property_view").count()
-            searches = activities.filter(activity_type="search").count()
-            inquiries = activities.filter(activity_type="inquiry_created").count()
-            properties_listed = activities.filter(activity_type="property_add").count()
-
-            print(f"DEBUG: Activities on {current_date}: {activities.count()}")
-
-            # Count active users for this day - using timezone-aware range
-            active_users = (
-                CustomUser.objects.filter(
-                    Q(last_login__gte=day_start, last_login__lte=day_end)
-                    | Q(last_activity__gte=day_start, last_activity__lte=day_end)
-                )
-                .distinct()
-                .count()
+            .values("date")
+            .annotate(
+                page_views=Sum("property_views"),
+                searches=Sum("searches_performed"),
+                inquiries=Sum("inquiries_sent"),
+                properties_listed=Sum("properties_listed"),
             )
+            .order_by()
+        }
 
-            # Count new users for this day - using timezone-aware range
-            new_users = CustomUser.objects.filter(
-                created_at__gte=day_start, created_at__lte=day_end
-            ).count()
-
-            # Count property views for this day - using timezone-aware range
-            property_views = PropertyView.objects.filter(
-                viewed_at__gte=day_start, viewed_at__lte=day_end
-            ).count()
-
-            # Count inquiries for this day - using timezone-aware range
-            daily_inquiries = Inquiry.objects.filter(
-                created_at__gte=day_start, created_at__lte=day_end
-            ).count()
+        daily_activity_data = []
 
-            # Count properties listed today - using timezone-aware range
-            properties_listed_direct = Property.objects.filter(
-                created_at__gte=day_start, created_at__lte=day_end, is_active=True
-            ).count()
+        for current_date in timeseries.date_range(start_date, end_date):
+            day_start, day_end = timeseries.day_bounds(current_date)
+            day_platform = platform.get(current_date, {})
+            day_market = market.get(current_date, {})
+            day_activities = activities.get(current_date, {})
+            listed_direct = day_market.get("new_listings", 0)
 
             # Use direct count if activity count is 0
-            if properties_listed == 0 and properties_listed_direct > 0:
-                properties_listed = properties_listed_direct
+            properties_listed = day_activities.get("properties_listed") or 0
+            if properties_listed == 0 and listed_direct > 0:
+                properties_listed = listed_direct
 
             daily_activity_data.append(
                 {
                     "date": current_date.isoformat(),
-                    "active_users": active_users,
-                    "new_users": new_users,
-                    "page_views": page_views,
-                    "searches": searches,
-                    "inquiries": inquiries,
+                    "active_users": day_platform.get("active_users", 0),
+                    "new_users": day_platform.get("new_users", 0),
+                    "page_views": day_activities.get("page_views") or 0,
+                    "searches": day_activities.get("searches") or 0,
+                    "inquiries": day_activities.get("inquiries") or 0,
                     "properties_listed": properties_listed,
-                    "property_views": property_views,
-                    "daily_inquiries": daily_inquiries,
+                    "property_views": day_market.get("total_views", 0),
+                    "daily_inquiries": day_market.get("total_inquiries", 0),
                     "debug_info": {
                         "day_start": day_start.isoformat(),
                         "day_end": day_end.isoformat(),
-                        "total_activities": activities.count(),
-                        "properties_listed_direct": properties_listed_direct,
+                        "properties_listed_direct": listed_direct,
                     },
                 }
             )
@@ -2212,8 +1999,8 @@ class DailyActivityView(APIView):
         # Add summary
         summary = {
             "total_days": len(daily_activity_data),
-            "period_start": date_from.date().isoformat(),
-            "period_end": timezone.now().date().isoformat(),
+            "period_start": start_date.isoformat(),
+            "period_end": end_date.isoformat(),
             "total_new_users": sum(item["new_users"] for item in daily_activity_data),
             "total_active_users": sum(
                 item["active_users"] for item in daily_activity_data
@@ -2230,7 +2017,7 @@ class DailyActivityView(APIView):
 
 
 class PlatformAnalyticsView(APIView):
-    """Platform-wide analytics summary"""
+    """Platform-wide analytics summary, read from the daily platform rollups"""
 
     permission_classes = [IsAuthenticated]
 
@@ -2247,86 +2034,66 @@ class PlatformAnalyticsView(APIView):
         else:
             days = 30
 
-        date_from = timezone.now() - timedelta(days=days)
+        today = timezone.localdate()
+        date_from = today - timedelta(days=days)
+        previous_period_start = date_from - timedelta(days=days)
 
-        # Calculate user metrics
-        total_users = CustomUser.objects.count()
-        new_users = CustomUser.objects.filter(created_at__gte=date_from).count()
+        # Totals come from the latest snapshot
+        latest = (
+            PlatformAnalytics.objects.filter(date__lte=today).order_by("-date").first()
+            or PlatformAnalytics(date=today)
+        )
+
+        # New users in this period and in the one before it
+        new_user_counts = PlatformAnalytics.objects.filter(
+            date__gt=previous_period_start, date__lte=today
+        ).aggregate(
+            new_users=Sum("new_users", filter=Q(date__gt=date_from)),
+            previous=Sum("new_users", filter=Q(date__lte=date_from)),
+        )
+        new_users = new_user_counts["new_users"] or 0
+        users_previous_period = new_user_counts["previous"] or 0
 
-        # Active users (users with activity in the last 7 days)
+        # Active users (users with activity in the last 7 days); a distinct
+        # count over several days can't be derived from the daily rollups
         active_users = CustomUser.objects.filter(
             last_activity__gte=timezone.now() - timedelta(days=7)
         ).count()
 
-        # User growth rate
-        previous_period_start = date_from - timedelta(days=days)
-        users_previous_period = CustomUser.objects.filter(
-            created_at__gte=previous_period_start, created_at__lt=date_from
-        ).count()
-
         user_growth_rate = 0
         if users_previous_period > 0:
             user_growth_rate = (
                 (new_users - users_previous_period) / users_previous_period
             ) * 100
 
-        # Property metrics
-        total_properties = Property.objects.count()
-        verified_properties = Property.objects.filter(is_verified=True).count()
-        featured_properties = Property.objects.filter(is_featured=True).count()
-        promoted_properties = Property.objects.filter(is_promoted=True).count()
-
-        # Engagement metrics (simplified - you'd want to use actual analytics)
-        total_page_views = (
-            Property.objects.aggregate(total=Sum("views_count"))["total"] or 0
-        )
-
         # Average session duration (placeholder - integrate with actual analytics)
         avg_session_duration = 185  # seconds
 
         # Bounce rate (placeholder)
         bounce_rate = 32.5
 
-        # Transaction metrics
-        total_inquiries = (
-            Property.objects.aggregate(total=Sum("inquiry_count"))["total"] or 0
-        )
-
-        successful_contacts = int(
-            total_inquiries * 0.6
-        )  # 60% conversion rate (placeholder)
-
-        # Revenue metrics
-        total_promotions = promoted_properties
-        total_revenue = (
-            Payment.objects.filter(status="completed").aggregate(
-                total=Sum("amount_etb")
-            )["total"]
-            or 0
-        )
-
         # Performance metrics (placeholders)
         api_response_time = 245  # ms
         error_rate = 0.8  # percentage
         server_uptime = 99.7  # percentage
 
         data = {
-            "date": timezone.now().date().isoformat(),
-            "total_users": total_users,
+            "date": latest.date.isoformat(),
+            "total_users": latest.total_users,
             "new_users": new_users,
             "active_users": active_users,
             "user_growth_rate": user_growth_rate,
-            "total_properties": total_properties,
-            "verified_properties": verified_properties,
-            "featured_properties": featured_properties,
-            "promoted_properties": promoted_properties,
-            "total_page_views": total_page_views,
+            "total_properties": latest.total_properties,
+            "verified_properties": latest.verified_properties,
+            "featured_properties": latest.featured_properties,
+            "promoted_properties": latest.promoted_properties,
+            "total_page_views": latest.total_page_views,
             "avg_session_duration": avg_session_duration,
             "bounce_rate": bounce_rate,
-            "total_inquiries": total_inquiries,
-            "successful_contacts": successful_contacts,
-            "total_promotions": total_promotions,
-            "total_revenue": total_revenue,
+            "total_inquiries": latest.total_inquiries,
+            "successful_contacts": latest.successful_contacts,
+            "total_promotions": latest.total_promotions,
+            "total_revenue": latest.total_revenue,
             "api_response_time": api_response_time,
             "error_rate": error_rate,
             "server_uptime": server_uptime,
@@ -2,7 +2,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
-from .models import MarketStats, PropertyValuation, Notification, AuditLog
+from .models import MarketStats, PropertyValuation, Notification, AuditLog, ExportJob
 
 @admin.register(MarketStats)
 class MarketStatsAdmin(admin.ModelAdmin):
@@ -206,4 +206,15 @@ class AuditLogAdmin(admin.ModelAdmin):
             # We call management command which will collect all deferred notifs per user
             call_command('send_notification_digest')
         self.message_user(request, f"Triggered digest send for {len(users)} users")
-    send_digest.short_description = 'Send digest for selected notifications'
\ No newline at end of file
+    send_digest.short_description = 'Send digest for selected notifications'
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'requested_by', 'status', 'progress', 'file_size',
+                   'created_at', 'completed_at', 'expires_at')
+    list_filter = ('status', 'format')
+    search_fields = ('id', 'requested_by__email', 'cache_key')
+    readonly_fields = ('cache_key', 'progress', 'reports_done', 'file_size',
+                      'started_at', 'completed_at', 'created_at')
+    list_per_page = 50
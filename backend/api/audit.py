@@ -0,0 +1,261 @@
+"""
+Write-behind pipeline for AuditLog rows.
+
+AuditLog.log_action builds the row and hands it to the buffer below once
+the surrounding transaction commits (so rolled back actions are not
+logged). A background thread writes buffered rows with bulk_create every
+AUDIT_LOG_FLUSH_INTERVAL seconds, or as soon as AUDIT_LOG_BATCH_SIZE rows
+are waiting, instead of one INSERT per logged action.
+
+The buffer is bounded by AUDIT_LOG_MAX_BUFFER. When it is full the caller
+flushes inline, which slows the request down instead of losing entries.
+When the database rejects a batch, its rows are retried one at a time:
+rows that fail on their own (a deleted user, a value too long for its
+column) are logged and dropped, so a single bad row can't block the
+pipeline. Only connection errors put the rows back for the next flush,
+and those are dropped when there is no room left to keep them.
+stats() exposes the counters.
+
+Set AUDIT_LOG_SYNC to write every entry immediately (tests, shell).
+
+WriteBehindBuffer is shared with other append-only tables, such as the
+valuation history (api/valuation_history.py).
+"""
+import atexit
+import logging
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+# Errors after which a batch may succeed as is, so it is kept for the next flush
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class WriteBehindBuffer:
+    """
+    Thread-safe bounded buffer of unsaved model instances, written with
+    bulk_create. Subclasses name the model and the prefix of their
+    settings (<prefix>_FLUSH_INTERVAL, _BATCH_SIZE, _MAX_BUFFER, _SYNC).
+    Buffers of other entries override write() and write_one(), and can
+    follow entries in and out of the buffer with _added() and _settled().
+    """
+    setting_prefix = None
+    label = "entry"
+    thread_name = "write-behind-flusher"
+
+    def get_model(self):
+        raise NotImplementedError
+
+    def _setting(self, name, default):
+        return _setting(f"{self.setting_prefix}_{name}", default)
+
+    def write(self, entries):
+        """Insert a batch of entries in one transaction; returns the rows written"""
+        self.get_model().objects.bulk_create(entries, batch_size=self._setting("BATCH_SIZE", 500))
+        return len(entries)
+
+    def write_one(self, entry):
+        """Insert one entry right away (the SYNC setting)"""
+        entry.save()
+
+    def _added(self, entry):
+        """Called with the lock held when an entry enters the buffer"""
+
+    def _settled(self, entries):
+        """Called when buffered entries are written or dropped for good"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._entries = deque()
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._atexit_registered = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.inline_flushes = 0
+        self.failed_flushes = 0
+        self.high_water = 0
+        self.last_flush_at = None
+
+    def enqueue(self, log):
+        """Queue an instance for writing once the current transaction commits"""
+        if self._setting("SYNC", False):
+            # Written right away, inside the current transaction like a save()
+            self.write_one(log)
+            with self._lock:
+                self.enqueued += 1
+                self.written += 1
+            return
+
+        transaction.on_commit(lambda: self._append(log))
+
+    def _append(self, log):
+        if not self._offer(log):
+            # Backpressure: the caller pays for a flush instead of losing entries
+            with self._lock:
+                self.inline_flushes += 1
+            logger.warning(f"{self.label.capitalize()} buffer full, flushing in the request thread")
+            self.flush()
+            if not self._offer(log):
+                with self._lock:
+                    self.dropped += 1
+                logger.error(f"{self.label.capitalize()} buffer still full after flushing, entry dropped")
+                return
+
+        self._ensure_worker()
+        if self.pending() >= self._setting("BATCH_SIZE", 500):
+            self._wakeup.set()
+
+    def _offer(self, log):
+        """Append unless the buffer is full; returns whether it was added"""
+        with self._lock:
+            if len(self._entries) >= self._setting("MAX_BUFFER", 10000):
+                return False
+            self._entries.append(log)
+            self._added(log)
+            self.enqueued += 1
+            self.high_water = max(self.high_water, len(self._entries))
+            return True
+
+    def pending(self):
+        with self._lock:
+            return len(self._entries)
+
+    def flush(self):
+        """Write all buffered entries; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                entries = list(self._entries)
+                self._entries.clear()
+
+            if not entries:
+                return 0
+
+            try:
+                written, retry = self.write(entries), []
+            except TRANSIENT_ERRORS as e:
+                with self._lock:
+                    self.failed_flushes += 1
+                logger.error(f"Failed to flush {len(entries)} {self.label} rows: {e}", exc_info=True)
+                self._requeue(entries)
+                return 0
+            except Exception as e:
+                with self._lock:
+                    self.failed_flushes += 1
+                logger.warning(f"Batch of {len(entries)} {self.label} rows rejected, retrying one by one: {e}")
+                written, retry = self._write_one_by_one(entries)
+                self._requeue(retry)
+
+            self._settled(entries[:len(entries) - len(retry)])
+            with self._lock:
+                self.written += written
+                if not retry:
+                    self.last_flush_at = timezone.now()
+            return written
+
+    def _write_one_by_one(self, entries):
+        """
+        Insert the rows of a rejected batch separately, dropping those the
+        database rejects. Returns (rows written, rows to retry after a
+        connection error).
+        """
+        written = 0
+        for position, entry in enumerate(entries):
+            try:
+                with transaction.atomic():
+                    written += self.write([entry])
+            except TRANSIENT_ERRORS as e:
+                logger.error(f"Failed to flush {len(entries) - position} {self.label} rows: {e}", exc_info=True)
+                return written, entries[position:]
+            except Exception as e:
+                with self._lock:
+                    self.rejected += 1
+                logger.error(f"Dropped {self.label} row rejected by the database: {e}")
+        return written, []
+
+    def _requeue(self, entries):
+        """Put entries of a failed flush back, oldest first, as far as room allows"""
+        if not entries:
+            return
+        with self._lock:
+            room = max(self._setting("MAX_BUFFER", 10000) - len(self._entries), 0)
+            kept = entries[:room]
+            self._entries.extendleft(reversed(kept))
+            lost = len(entries) - len(kept)
+            self.dropped += lost
+        if lost:
+            self._settled(entries[room:])
+            logger.error(f"Dropped {lost} {self.label} rows after a failed flush")
+
+    def stats(self):
+        """Backpressure and throughput counters of this process"""
+        with self._lock:
+            return {
+                "pending": len(self._entries),
+                "capacity": self._setting("MAX_BUFFER", 10000),
+                "high_water": self.high_water,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "rejected": self.rejected,
+                "inline_flushes": self.inline_flushes,
+                "failed_flushes": self.failed_flushes,
+                "last_flush_at": self.last_flush_at,
+                "sync": self._setting("SYNC", False),
+            }
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+
+        with self._lock:
+            # A forked worker inherits the thread object but not the thread
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name=self.thread_name, daemon=True
+                )
+                self._worker.start()
+            if not self._atexit_registered:
+                atexit.register(self.flush)
+                self._atexit_registered = True
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self._setting("FLUSH_INTERVAL", 5))
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception(f"{self.label.capitalize()} flusher crashed")
+            finally:
+                # This thread owns its own connection; don't keep it open idle
+                connection.close()
+
+
+class AuditLogBuffer(WriteBehindBuffer):
+    """Thread-safe bounded buffer of unsaved AuditLog instances"""
+    setting_prefix = "AUDIT_LOG"
+    label = "audit log"
+    thread_name = "audit-log-flusher"
+
+    def get_model(self):
+        from .models import AuditLog
+
+        return AuditLog
+
+
+audit_buffer = AuditLogBuffer()
@@ -0,0 +1,131 @@
+"""
+Cache helpers for the API.
+
+Keys are namespaced and versioned: each namespace keeps a version counter
+in the cache and every key built for that namespace embeds the current
+version. Bumping the version invalidates all keys of the namespace at once
+without having to track or delete individual entries.
+"""
+import hashlib
+import logging
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+# Namespaces for read-mostly lookup data
+CITIES = "cities"
+SUB_CITIES = "sub_cities"
+AMENITIES = "amenities"
+PROMOTION_TIERS = "promotion_tiers"
+
+# Namespaces for computed aggregates (expire by TTL; property listings
+# are also invalidated on Property changes, see real_estate/search_cache.py)
+MARKET_STATS = "market_stats"
+COUNTS = "counts"  # Paginator counts, see api/counting.py
+FACETS = "facets"  # Property facet counts, see real_estate/facets.py
+SEARCH_RESULTS = "search_results"  # Property search result ids, see real_estate/search_cache.py
+COMPARISONS = "comparisons"  # Comparison frames, see real_estate/comparison_engine.py
+VALUATION_MODELS = "valuation_models"  # Fitted models, see real_estate/valuation.py
+
+
+def _version_key(namespace):
+    return f"cache_version:{namespace}"
+
+
+def get_cache_version(namespace):
+    """Get the current version of a cache namespace"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Seed with a timestamp so a lost counter never reuses an old version
+        cache.add(key, int(time.time()), timeout=None)
+        version = cache.get(key) or int(time.time())
+    return version
+
+
+def bump_cache_version(*namespaces):
+    """Invalidate every cached entry in the given namespaces"""
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time()), timeout=None)
+        except Exception as e:
+            logger.warning(f"Could not bump cache version for {namespace}: {e}")
+
+
+def make_cache_key(namespace, *parts):
+    """Build a versioned cache key from a namespace and arbitrary key parts"""
+    raw = "|".join(str(part) for part in parts)
+    digest = hashlib.md5(raw.encode("utf-8")).hexdigest()
+    return f"{namespace}:v{get_cache_version(namespace)}:{digest}"
+
+
+def normalized_params(query_params, exclude=()):
+    """
+    Canonical form of a request's query parameters for use in cache keys:
+    sorted names, each with its sorted non-empty values, leaving out the
+    names in `exclude` (paging, ordering, ...). Parameter order and blank
+    values then no longer split otherwise identical requests.
+    """
+    normalized = []
+    for name in sorted(query_params.keys()):
+        if name in exclude:
+            continue
+        values = sorted(
+            value.strip() for value in query_params.getlist(name) if value.strip()
+        )
+        if values:
+            normalized.append((name, tuple(values)))
+    return tuple(normalized)
+
+
+def cache_response(namespace, timeout=None):
+    """
+    Cache the response data of a DRF view method.
+
+    Only successful GET/HEAD responses are cached. The key is built from the
+    absolute request URL, so query parameters (filters, search, pagination)
+    each get their own entry. A cache outage never breaks the view; it just
+    falls through to the database.
+    """
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view_method(self, request, *args, **kwargs)
+
+            try:
+                key = make_cache_key(namespace, request.build_absolute_uri())
+                cached = cache.get(key)
+            except Exception as e:
+                logger.warning(f"Cache read failed for {namespace}: {e}")
+                return view_method(self, request, *args, **kwargs)
+
+            if cached is not None:
+                return Response(cached)
+
+            response = view_method(self, request, *args, **kwargs)
+
+            if response.status_code == 200:
+                try:
+                    cache.set(
+                        key,
+                        response.data,
+                        timeout if timeout is not None else settings.LOOKUP_CACHE_TTL,
+                    )
+                except Exception as e:
+                    logger.warning(f"Cache write failed for {namespace}: {e}")
+
+            return response
+
+        return wrapper
+
+    return decorator
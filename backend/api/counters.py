@@ -0,0 +1,129 @@
+"""
+Per-user unread counters for messages and notifications.
+
+The unread badges are polled by every open tab, so the counts are kept in
+the cache instead of running a COUNT(*) per poll. A counter is seeded from
+the database on first read, incremented when an unread row is created
+(post_save receivers in api/models.py) and decremented by the mark-read
+code paths with the number of rows they actually changed.
+
+Writes that bypass those paths (admin, shell, raw updates) make a counter
+drift. Counters expire after UNREAD_COUNTER_TTL and are periodically reset
+from the database by reconcile_unread_counters, so drift is short-lived.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MESSAGES = "messages"
+NOTIFICATIONS = "notifications"
+
+
+def _key(kind, user_id):
+    return f"unread:{kind}:{user_id}"
+
+
+def _unread_queryset(kind):
+    if kind == MESSAGES:
+        from real_estate.models import Message
+        return Message.objects.filter(is_read=False), "receiver_id"
+
+    from .models import Notification
+    return Notification.objects.filter(is_read=False), "user_id"
+
+
+def count_unread(kind, user_id):
+    """Count unread rows in the database"""
+    queryset, user_field = _unread_queryset(kind)
+    return queryset.filter(**{user_field: user_id}).count()
+
+
+def get_unread_count(kind, user_id):
+    """Unread count for a user, from the cache when possible"""
+    key = _key(kind, user_id)
+    try:
+        value = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Unread counter read failed for {key}: {e}")
+        return count_unread(kind, user_id)
+
+    if value is None:
+        value = count_unread(kind, user_id)
+        try:
+            cache.add(key, value, settings.UNREAD_COUNTER_TTL)
+        except Exception as e:
+            logger.warning(f"Unread counter seed failed for {key}: {e}")
+
+    return max(value, 0)
+
+
+def _adjust(kind, user_id, delta):
+    key = _key(kind, user_id)
+    try:
+        if delta > 0:
+            cache.incr(key, delta)
+        else:
+            cache.decr(key, -delta)
+    except ValueError:
+        # Not seeded yet; the next read counts from the database
+        pass
+    except Exception as e:
+        logger.warning(f"Unread counter update failed for {key}: {e}")
+        try:
+            cache.delete(key)
+        except Exception:
+            pass
+
+
+def adjust_unread_count(kind, user_id, delta):
+    """Add `delta` to a user's counter once the current transaction commits"""
+    if not delta or user_id is None:
+        return
+    transaction.on_commit(lambda: _adjust(kind, user_id, delta))
+
+
+def reconcile_unread_counters(user_ids=None):
+    """
+    Reset counters from the database with one grouped query per kind.
+
+    Defaults to users active in the last UNREAD_COUNTER_TTL, who are the
+    ones whose counters can be in the cache. Returns the number of users.
+    """
+    if user_ids is None:
+        from users.models import CustomUser
+
+        since = timezone.now() - timedelta(seconds=settings.UNREAD_COUNTER_TTL)
+        user_ids = CustomUser.objects.filter(last_activity__gte=since).values_list(
+            "id", flat=True
+        )
+    user_ids = list(user_ids)
+
+    batch_size = 1000
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        values = {}
+        for kind in (MESSAGES, NOTIFICATIONS):
+            queryset, user_field = _unread_queryset(kind)
+            counts = dict(
+                queryset.filter(**{f"{user_field}__in": batch})
+                .values(user_field)
+                .annotate(count=Count("id"))
+                .order_by()
+                .values_list(user_field, "count")
+            )
+            for user_id in batch:
+                values[_key(kind, user_id)] = counts.get(user_id, 0)
+
+        try:
+            cache.set_many(values, settings.UNREAD_COUNTER_TTL)
+        except Exception as e:
+            logger.warning(f"Unread counter reconcile failed: {e}")
+
+    return len(user_ids)
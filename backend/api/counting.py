@@ -0,0 +1,84 @@
+"""
+Row counts for pagination that stay cheap on large tables.
+
+An exact COUNT(*) over a filtered, joined queryset can cost more than
+fetching the page itself. count_queryset() counts exactly only while the
+result is small and otherwise returns an estimate:
+
+1. Count at most PAGINATION_EXACT_COUNT_LIMIT + 1 rows (COUNT over a LIMIT
+   subquery). Anything up to the limit is exact.
+2. An unfiltered queryset on MySQL uses the table row estimate kept in
+   information_schema.
+3. Anything else is counted once and the result cached for
+   PAGINATION_COUNT_CACHE_TTL seconds, keyed on the compiled SQL and
+   parameters of the queryset, i.e. on its filter signature.
+
+The second value returned says whether the count is an estimate.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from . import cache as api_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _table_row_estimate(queryset):
+    """InnoDB's row estimate for the whole table, or None"""
+    connection = connections[queryset.db]
+    if connection.vendor != "mysql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None else None
+
+
+def _is_whole_table(queryset):
+    query = queryset.query
+    return not query.where.children and not query.distinct and not query.combinator
+
+
+def count_queryset(queryset):
+    """Return (count, is_estimate) for a queryset; see the module docstring"""
+    limit = settings.PAGINATION_EXACT_COUNT_LIMIT
+    queryset = queryset.order_by()
+
+    bounded = queryset[:limit + 1].count()
+    if bounded <= limit:
+        return bounded, False
+
+    if _is_whole_table(queryset):
+        try:
+            estimate = _table_row_estimate(queryset)
+        except Exception as e:
+            logger.warning(f"Row estimate failed for {queryset.model._meta.db_table}: {e}")
+            estimate = None
+        if estimate is not None:
+            # The estimate can undershoot; never report fewer rows than we saw
+            return max(estimate, bounded), True
+
+    try:
+        sql, params = queryset.query.sql_with_params()
+        key = api_cache.make_cache_key(api_cache.COUNTS, queryset.db, sql, params)
+        cached = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Count cache read failed: {e}")
+        return queryset.count(), False
+
+    if cached is not None:
+        return cached, True
+
+    count = queryset.count()
+    try:
+        cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Count cache write failed: {e}")
+    return count, False
@@ -0,0 +1,278 @@
+"""
+Background batch exports.
+
+BatchExportView used to build every requested report into an in-memory ZIP
+inside the request. It now records an ExportJob and returns at once; a
+worker (api.tasks.run_export_job_task) writes each report straight into a
+ZIP on local disk, reporting progress as it goes, and then moves the file
+to media storage. Clients poll the job and download the artifact, with
+Range support, once it is completed.
+
+Jobs are keyed by a hash of (report_types, filters, date). Requesting the
+same export again on the same day returns the existing job, finished or
+still running, instead of building it twice.
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+import tempfile
+import zipfile
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+REPORT_TYPES = (
+    'user_report', 'property_report', 'inquiry_report',
+    'revenue_report', 'performance_report', 'market_report',
+    'activity_report', 'comprehensive_report',
+    'users', 'properties', 'inquiries', 'audit-logs', 'transactions',
+)
+
+# Request fields accepted as filters, all YYYY-MM-DD dates on created_at
+FILTER_FIELDS = ('start_date', 'end_date')
+
+
+def export_cache_key(report_types, filters, day=None):
+    """Hash identifying an export of `report_types` with `filters` on `day`"""
+    day = day or timezone.localdate()
+    payload = json.dumps(
+        {
+            "report_types": sorted(set(report_types)),
+            "filters": filters,
+            "date": day.isoformat(),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def find_reusable_job(cache_key):
+    """Latest job for the same export that is finished or still in progress"""
+    from .models import ExportJob
+
+    now = timezone.now()
+    in_flight_since = now - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT)
+    return (
+        ExportJob.objects.filter(cache_key=cache_key)
+        .filter(
+            Q(status="completed", expires_at__gt=now)
+            | Q(status__in=["pending", "running"], created_at__gte=in_flight_since)
+        )
+        .order_by("-created_at")
+        .first()
+    )
+
+
+def create_export_job(user, report_types, filters, format_type="csv"):
+    """
+    Return (job, created). A new job is queued once the current transaction
+    commits; an equivalent existing job is returned as is.
+    """
+    from .models import ExportJob
+    from .tasks import enqueue_export_job
+
+    cache_key = export_cache_key(report_types, filters)
+    job = find_reusable_job(cache_key)
+    if job is not None:
+        return job, False
+
+    job = ExportJob.objects.create(
+        requested_by=user,
+        report_types=list(report_types),
+        filters=filters,
+        format=format_type,
+        cache_key=cache_key,
+    )
+    transaction.on_commit(lambda: enqueue_export_job(job.pk))
+    return job, True
+
+
+def run_export_job(job_id):
+    """Build the artifact of a pending job; called by the worker"""
+    from .models import ExportJob
+
+    claimed = ExportJob.objects.filter(pk=job_id, status="pending").update(
+        status="running", started_at=timezone.now()
+    )
+    if not claimed:
+        # Already picked up by another worker, or gone
+        return
+
+    job = ExportJob.objects.get(pk=job_id)
+    try:
+        build_export(job)
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {e}", exc_info=True)
+        ExportJob.objects.filter(pk=job_id).update(
+            status="failed", error=str(e)[:1000], completed_at=timezone.now()
+        )
+
+
+def build_export(job):
+    """Write every report of `job` into a ZIP and attach it to the job"""
+    from .models import ExportJob
+
+    total = len(job.report_types)
+    timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+
+    with tempfile.TemporaryFile(suffix=".zip") as artifact:
+        with zipfile.ZipFile(artifact, "w", zipfile.ZIP_DEFLATED) as archive:
+            for index, report_type in enumerate(job.report_types, start=1):
+                try:
+                    write_report(archive, f"{report_type}_{timestamp}.csv", report_type, job.filters)
+                except Exception as e:
+                    logger.error(f"Error generating {report_type} report: {e}", exc_info=True)
+                    archive.writestr(
+                        f"ERROR_{report_type}.txt",
+                        f"Error generating {report_type}: {str(e)[:200]}",
+                    )
+
+                ExportJob.objects.filter(pk=job.pk).update(
+                    reports_done=index, progress=int(index * 100 / total)
+                )
+
+        job.file_size = artifact.tell()
+        artifact.seek(0)
+        job.file.save(f"reports_export_{timestamp}.zip", File(artifact), save=False)
+
+    now = timezone.now()
+    job.status = "completed"
+    job.progress = 100
+    job.reports_done = total
+    job.completed_at = now
+    job.expires_at = now + timedelta(hours=settings.EXPORT_ARTIFACT_TTL)
+    job.save(update_fields=[
+        "file", "file_size", "status", "progress", "reports_done",
+        "completed_at", "expires_at",
+    ])
+
+
+def write_report(archive, filename, report_type, filters):
+    """Stream the rows of one report into a new entry of `archive`"""
+    with io.TextIOWrapper(archive.open(filename, "w"), encoding="utf-8", newline="") as entry:
+        writer = csv.writer(entry)
+        for row in report_rows(report_type, filters):
+            writer.writerow(row)
+
+
+def _in_period(queryset, filters, date_field="created_at"):
+    start_date = filters.get("start_date")
+    end_date = filters.get("end_date")
+    if start_date:
+        queryset = queryset.filter(**{f"{date_field}__gte": datetime.strptime(start_date, '%Y-%m-%d')})
+    if end_date:
+        # Include the whole end day
+        end_dt = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
+        queryset = queryset.filter(**{f"{date_field}__lte": end_dt})
+    return queryset
+
+
+def report_rows(report_type, filters=None):
+    """Yield the CSV rows of a batch report"""
+    filters = filters or {}
+    User = get_user_model()
+    generated = f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'
+
+    if report_type == 'user_report' or report_type == 'users':
+        users = _in_period(User.objects.all(), filters)
+        yield ['User Report', generated]
+        yield ['Metric', 'Value']
+        yield ['Total Users', users.count()]
+        yield ['Active Users', users.filter(is_active=True).count()]
+        yield ['Verified Users', users.filter(is_verified=True).count()]
+        yield ['Premium Users', users.filter(is_premium=True).count()]
+
+    elif report_type == 'property_report' or report_type == 'properties':
+        from real_estate.models import Property
+
+        properties = _in_period(Property.objects.all(), filters)
+        yield ['Property Report', generated]
+        yield ['Metric', 'Value']
+        yield ['Total Properties', properties.count()]
+        yield ['Active Properties', properties.filter(is_active=True).count()]
+        yield ['Featured Properties', properties.filter(is_featured=True).count()]
+        yield ['Verified Properties', properties.filter(is_verified=True).count()]
+
+    elif report_type == 'inquiry_report' or report_type == 'inquiries':
+        from real_estate.models import Inquiry
+
+        inquiries = _in_period(Inquiry.objects.all(), filters)
+        yield ['Inquiry Report', generated]
+        yield ['Metric', 'Value']
+        yield ['Total Inquiries', inquiries.count()]
+        yield ['Pending Inquiries', inquiries.filter(status='pending').count()]
+        yield ['Closed Inquiries', inquiries.filter(status='closed').count()]
+        yield ['Assigned Inquiries', inquiries.filter(assigned_to__isnull=False).count()]
+
+    elif report_type == 'audit-logs':
+        from .models import AuditLog
+
+        yield ['Audit Logs Report', generated]
+        yield ['Metric', 'Value']
+        logs = _in_period(AuditLog.objects.all(), filters)
+        yield ['Total Audit Logs', logs.count()]
+        yield ['Logs Today', logs.filter(created_at__date=timezone.now().date()).count()]
+        yield ['Logs This Week', logs.filter(created_at__gte=timezone.now() - timedelta(days=7)).count()]
+
+    elif report_type == 'transactions':
+        yield ['Transactions Report', generated]
+        yield ['Metric', 'Value']
+        try:
+            from subscriptions.models import Payment
+        except ImportError:
+            yield ['Transactions', 'Not available']
+            return
+
+        payments = _in_period(Payment.objects.all(), filters)
+        completed = payments.filter(status='completed')
+        yield ['Total Transactions', payments.count()]
+        yield ['Completed Transactions', completed.count()]
+        yield ['Pending Transactions', payments.filter(status='pending').count()]
+        yield ['Total Revenue', completed.aggregate(Sum('amount_etb'))['amount_etb__sum'] or 0]
+
+    elif report_type in ('revenue_report', 'performance_report', 'market_report', 'activity_report'):
+        name = report_type.replace('_report', '').title()
+        yield [f'{name} Report', generated]
+        yield ['Metric', 'Value']
+        yield ['Report Type', f'{name} Analytics']
+        yield ['Status', 'Generated successfully']
+
+    elif report_type == 'comprehensive_report':
+        yield ['Comprehensive Report', generated]
+        yield ['Metric', 'Value']
+        yield ['Total Users', _in_period(User.objects.all(), filters).count()]
+        yield ['Total Properties', 'See property report for details']
+        yield ['Total Inquiries', 'See inquiry report for details']
+        yield ['Report Type', 'Comprehensive Analytics']
+
+    else:
+        # Default for other report types
+        yield [f'{report_type.replace("_", " ").title()} Report']
+        yield [generated]
+        yield ['Status', 'Generated successfully']
+
+
+def cleanup_expired_exports():
+    """Delete the artifacts of expired jobs; returns the number removed"""
+    from .models import ExportJob
+
+    removed = 0
+    expired = ExportJob.objects.filter(expires_at__lte=timezone.now()).exclude(file="")
+    for job in expired.iterator():
+        try:
+            job.file.delete(save=False)
+        except Exception as e:
+            logger.warning(f"Could not delete export artifact {job.file.name}: {e}")
+            continue
+        ExportJob.objects.filter(pk=job.pk).update(file="", file_size=0)
+        removed += 1
+    return removed
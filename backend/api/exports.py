@@ -0,0 +1,148 @@
+"""
+Streaming CSV exports.
+
+Exports used to render the whole file into an HttpResponse from model
+instances, keeping every row and its related objects in memory until the
+last one was written. The helpers below stream the file instead: rows are
+read as values_list tuples, with the related columns joined in the same
+query, in chunks of EXPORT_CHUNK_SIZE, and each CSV line is sent as soon
+as it is written.
+
+Chunks are fetched by keyset (newest first, then by pk) rather than with
+QuerySet.iterator(), because the MySQL driver loads the whole result set
+into the client before iterating over it.
+
+file_download_response serves finished export artifacts (see
+api/export_jobs.py) the same way, with support for resumed downloads.
+"""
+import csv
+import re
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+FILE_CHUNK_SIZE = 64 * 1024
+
+# A single byte range; multi-range requests get the whole file
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class Echo:
+    """File-like object whose write() returns the value instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, fields, order_field="created_at", chunk_size=None):
+    """
+    Yield one dict per row of `queryset` holding the given `fields`.
+
+    Fields can follow relations ("property__title"). Rows come newest
+    `order_field` first; `order_field` must not be nullable.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    queryset = queryset.prefetch_related(None).order_by(f"-{order_field}", "-pk")
+
+    last = None
+    while True:
+        chunk = queryset
+        if last is not None:
+            last_pk, last_value = last
+            chunk = chunk.filter(
+                Q(**{f"{order_field}__lt": last_value})
+                | Q(**{order_field: last_value, "pk__lt": last_pk})
+            )
+
+        rows = list(chunk.values_list("pk", order_field, *fields)[:chunk_size])
+        for row in rows:
+            yield dict(zip(fields, row[2:]))
+
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][0], rows[-1][1]
+
+
+def choice_labels(model, field_name):
+    """Display labels of a choices field keyed by stored value"""
+    field = model._meta.get_field(field_name)
+    return {value: str(label) for value, label in field.flatchoices}
+
+
+def format_datetime(value, fmt=DATETIME_FORMAT, default=""):
+    return value.strftime(fmt) if value else default
+
+
+def full_name(first_name, last_name):
+    return f"{first_name or ''} {last_name or ''}".strip()
+
+
+def streaming_csv_response(filename, header, rows):
+    """Stream `header` and then every row of `rows` as a CSV attachment"""
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _read_range(handle, start, length):
+    try:
+        handle.seek(start)
+        while length > 0:
+            data = handle.read(min(FILE_CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        handle.close()
+
+
+def file_download_response(request, field_file, filename, content_type="application/octet-stream"):
+    """
+    Stream a stored file as an attachment.
+
+    Honours a single "Range: bytes=start-end" header with a 206 response so
+    interrupted downloads of large artifacts can be resumed.
+    """
+    size = field_file.size
+    start, end = 0, size - 1
+    partial = False
+
+    match = RANGE_RE.match(request.META.get("HTTP_RANGE", "").strip())
+    if match and any(match.groups()):
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(last), 0)
+        if start > end:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        partial = True
+
+    handle = field_file.storage.open(field_file.name, "rb")
+    length = end - start + 1
+    response = StreamingHttpResponse(
+        _read_range(handle, start, length),
+        status=206 if partial else 200,
+        content_type=content_type,
+    )
+    response["Content-Length"] = str(length)
+    response["Accept-Ranges"] = "bytes"
+    if partial:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
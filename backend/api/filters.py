@@ -1,6 +1,8 @@
 import django_filters
 from django.db.models import Q
+from rest_framework import filters
 from real_estate.models import Property
+from real_estate.search import SEARCH_RANK, search_properties
 
 class PropertyFilter(django_filters.FilterSet):
     search = django_filters.CharFilter(method='filter_search')
@@ -40,13 +42,33 @@ class PropertyFilter(django_filters.FilterSet):
     
     def filter_search(self, queryset, name, value):
         if value:
-            return queryset.filter(
-                Q(title__icontains=value) |
-                Q(title_amharic__icontains=value) |
-                Q(description__icontains=value) |
-                Q(description_amharic__icontains=value) |
-                Q(specific_location__icontains=value) |
-                Q(city__name__icontains=value) |
-                Q(sub_city__name__icontains=value)
-            )
-        return queryset
\ No newline at end of file
+            return search_properties(queryset, value)
+        return queryset
+
+
+class PropertySearchFilter(filters.SearchFilter):
+    """
+    ?search= backed by the property search index instead of icontains
+    lookups over search_fields. Results are annotated with their relevance
+    (see RelevanceOrderingFilter).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get(self.search_param, "").strip()
+        if not value:
+            return queryset
+        return search_properties(queryset, value)
+
+
+class RelevanceOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that sorts keyword search results by relevance when the
+    client doesn't ask for an ordering. Views can set `search_ordering` to
+    keep other sort keys (e.g. promotion) ahead of relevance.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if SEARCH_RANK in queryset.query.annotations and not request.query_params.get(self.ordering_param):
+            ordering = getattr(view, "search_ordering", None) or ["-" + SEARCH_RANK]
+            return queryset.order_by(*ordering)
+        return super().filter_queryset(request, queryset, view)
\ No newline at end of file
@@ -5,6 +5,7 @@ from django.utils import timezone
 from analytics.models import PlatformAnalytics
 from users.models import CustomUser
 from real_estate.models import Message
+from . import counters
 
 # Logger for API analytics/debug
 logger = logging.getLogger('api')
@@ -47,10 +48,11 @@ class MessageReadMiddleware(MiddlewareMixin):
         )
         
         if unread_messages.exists():
-            unread_messages.update(
+            updated = unread_messages.update(
                 is_read=True,
                 read_at=timezone.now()
             )
+            counters.adjust_unread_count(counters.MESSAGES, user.id, -updated)
             
 class AnalyticsMiddleware(MiddlewareMixin):
     """
@@ -6,6 +6,7 @@ from django.dispatch import receiver
 from django.utils import timezone
 import uuid
 import json
+from functools import lru_cache
 
 User = get_user_model()
 
@@ -329,7 +330,12 @@ class AuditLog(models.Model):
     @classmethod
     def log_action(cls, user, action_type, model_name, object_id="", object_repr="", 
                    changes=None, old_values=None, new_values=None, request=None):
-        """Helper method to create audit logs"""
+        """
+        Helper method to create audit logs.
+
+        The entry is written asynchronously in batches (see api/audit.py),
+        so the returned instance has no primary key yet.
+        """
         if changes is None:
             changes = {}
         if old_values is None:
@@ -362,7 +368,8 @@ class AuditLog(models.Model):
             log.os = cls.parse_user_agent(log.user_agent, 'os')[:100]
             log.device = cls.parse_user_agent(log.user_agent, 'device')[:100]
         
-        log.save()
+        from .audit import audit_buffer
+        audit_buffer.enqueue(log)
         return log
     
     @staticmethod
@@ -374,8 +381,9 @@ class AuditLog(models.Model):
         return request.META.get('REMOTE_ADDR')
     
     @staticmethod
+    @lru_cache(maxsize=512)
     def parse_user_agent(user_agent, info_type='browser'):
-        """Simple user agent parser"""
+        """Simple user agent parser (memoized, agents repeat a lot)"""
         user_agent = (user_agent or '').lower()
         
         if info_type == 'browser':
@@ -414,6 +422,66 @@ class AuditLog(models.Model):
         return 'Unknown'
 
 
+class ExportJob(models.Model):
+    """A batch export built in the background into a ZIP artifact"""
+
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    requested_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="export_jobs"
+    )
+    report_types = models.JSONField(default=list)
+    filters = models.JSONField(default=dict, blank=True)
+    format = models.CharField(max_length=10, default="csv")
+
+    # Hash of (report_types, filters, date); finished jobs are reused by it
+    cache_key = models.CharField(max_length=64, db_index=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    progress = models.PositiveSmallIntegerField(default=0)  # Percent
+    reports_done = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    file = models.FileField(upload_to="exports/%Y/%m/%d/", blank=True)
+    file_size = models.BigIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("export job")
+        verbose_name_plural = _("export jobs")
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["cache_key", "status"]),
+            models.Index(fields=["status", "expires_at"]),
+        ]
+
+    def __str__(self):
+        return f"Export {str(self.id)[:8]} ({self.get_status_display()})"
+
+    @property
+    def total_reports(self):
+        return len(self.report_types)
+
+    @property
+    def is_available(self):
+        """Whether the finished artifact can still be downloaded"""
+        return (
+            self.status == "completed"
+            and bool(self.file)
+            and (self.expires_at is None or self.expires_at > timezone.now())
+        )
+
+
 # Signal receivers for comprehensive audit logging
 @receiver(post_save, sender=User)
 def log_user_activity(sender, instance, created, **kwargs):
@@ -675,4 +743,62 @@ def log_bulk_activity(sender, instance, action, model, pk_set, **kwargs):
                 object_repr=f'Bulk delete {len(pk_set)} users',
                 changes=changes,
                 request=None
-            )
\ No newline at end of file
+            )
+
+# Signals for lookup cache invalidation
+@receiver(post_save, sender='real_estate.City')
+@receiver(post_delete, sender='real_estate.City')
+def invalidate_city_cache(sender, instance, **kwargs):
+    """Cities are nested in sub-city payloads, so both namespaces go stale"""
+    from . import cache as api_cache
+    api_cache.bump_cache_version(api_cache.CITIES, api_cache.SUB_CITIES)
+
+
+@receiver(post_save, sender='real_estate.SubCity')
+@receiver(post_delete, sender='real_estate.SubCity')
+def invalidate_sub_city_cache(sender, instance, **kwargs):
+    from . import cache as api_cache
+    api_cache.bump_cache_version(api_cache.SUB_CITIES)
+
+
+@receiver(post_save, sender='real_estate.Amenity')
+@receiver(post_delete, sender='real_estate.Amenity')
+def invalidate_amenity_cache(sender, instance, **kwargs):
+    from . import cache as api_cache
+    api_cache.bump_cache_version(api_cache.AMENITIES)
+
+
+@receiver(post_save, sender='subscriptions.PropertyPromotionTier')
+@receiver(post_delete, sender='subscriptions.PropertyPromotionTier')
+def invalidate_promotion_tier_cache(sender, instance, **kwargs):
+    from . import cache as api_cache
+    api_cache.bump_cache_version(api_cache.PROMOTION_TIERS)
+
+
+# Signals for unread counters
+@receiver(post_save, sender='real_estate.Message')
+def count_new_unread_message(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        from . import counters
+        counters.adjust_unread_count(counters.MESSAGES, instance.receiver_id, 1)
+
+
+@receiver(post_delete, sender='real_estate.Message')
+def uncount_deleted_unread_message(sender, instance, **kwargs):
+    if not instance.is_read:
+        from . import counters
+        counters.adjust_unread_count(counters.MESSAGES, instance.receiver_id, -1)
+
+
+@receiver(post_save, sender='api.Notification')
+def count_new_unread_notification(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        from . import counters
+        counters.adjust_unread_count(counters.NOTIFICATIONS, instance.user_id, 1)
+
+
+@receiver(post_delete, sender='api.Notification')
+def uncount_deleted_unread_notification(sender, instance, **kwargs):
+    if not instance.is_read:
+        from . import counters
+        counters.adjust_unread_count(counters.NOTIFICATIONS, instance.user_id, -1)
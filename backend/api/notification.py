@@ -1,5 +1,6 @@
 from django.utils import timezone
 from .models import Notification
+from . import counters
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.utils import timezone
@@ -170,6 +171,7 @@ class NotificationService:
                 notification.is_read = True
                 notification.read_at = timezone.now()
                 notification.save()
+                counters.adjust_unread_count(counters.NOTIFICATIONS, user.id, -1)
             return True
         except Notification.DoesNotExist:
             return False
@@ -184,12 +186,13 @@ class NotificationService:
             is_read=True,
             read_at=timezone.now()
         )
+        counters.adjust_unread_count(counters.NOTIFICATIONS, user.id, -updated)
         return updated
     
     @staticmethod
     def get_unread_count(user):
         """Get count of unread notifications for a user"""
-        return Notification.objects.filter(user=user, is_read=False).count()
+        return counters.get_unread_count(counters.NOTIFICATIONS, user.id)
     
     @staticmethod
     def get_user_notifications(user, limit=50, unread_only=False):
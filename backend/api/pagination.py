@@ -1,34 +1,277 @@
+import base64
+import datetime
+import decimal
+import json
+import uuid
+from collections import namedtuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import EmptyPage, Paginator
+from django.db.models import Model, Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .counting import count_queryset
+
+KeysetPage = namedtuple("KeysetPage", ["items", "next_cursor", "previous_cursor"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose count comes from count_queryset: exact for small
+    results, estimated for large ones (count_is_estimate). With an
+    estimate, pages past the estimated last page are still served.
+    """
+
+    @cached_property
+    def _counted(self):
+        if hasattr(self.object_list, "query"):
+            return count_queryset(self.object_list)
+        return len(self.object_list), False
+
+    @cached_property
+    def count(self):
+        return self._counted[0]
+
+    @property
+    def count_is_estimate(self):
+        return self._counted[1]
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not self.count_is_estimate or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        if not self.count_is_estimate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+def _json_default(value):
+    # Full precision: DjangoJSONEncoder drops microseconds, which would
+    # make a cursor skip or repeat rows created in the same millisecond
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
 
-class CustomPagination(PageNumberPagination):
+def _encode_cursor(values, reverse=False):
+    payload = json.dumps({"v": values, "r": int(reverse)}, default=_json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return list(payload["v"]), bool(payload.get("r"))
+    except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+        raise NotFound("Invalid cursor")
+
+
+def _flip(field):
+    return field[1:] if field.startswith("-") else f"-{field}"
+
+
+def keyset_ordering(queryset):
+    """
+    Ordering used to page `queryset` by keyset: its active ordering (or the
+    model's default), falling back to newest first, with the primary key
+    appended as a tie-breaker so every row has a unique position.
+    """
+    ordering = list(queryset.query.order_by or queryset.model._meta.ordering or [])
+    if any(not isinstance(field, str) or field == "?" for field in ordering):
+        # Expressions and random order can't be resumed from a row
+        ordering = []
+    if not ordering and any(f.name == "created_at" for f in queryset.model._meta.fields):
+        ordering = ["-created_at"]
+
+    pk_names = {"pk", queryset.model._meta.pk.name, queryset.model._meta.pk.attname}
+    if not any(field.lstrip("-") in pk_names for field in ordering):
+        descending = bool(ordering) and ordering[-1].startswith("-")
+        ordering.append("-pk" if descending else "pk")
+    return ordering
+
+
+def _nullable(model, name):
+    """Whether an ordering column can be NULL; unknown (annotated) columns may be"""
+    if name == "pk":
+        return False
+    try:
+        for part in name.split("__"):
+            field = model._meta.get_field(part)
+            if field.null:
+                return True
+            model = field.related_model
+    except (FieldDoesNotExist, AttributeError):
+        return True
+    return False
+
+
+def _after(model, ordering, values):
+    """
+    Q for rows that come after a row with `values` in `ordering`.
+
+    NULLs sort lowest, as they do in MySQL (and SQLite): first when
+    ascending, last when descending.
+    """
+    condition = None
+    for field, value in reversed(list(zip(ordering, values))):
+        name = field.lstrip("-")
+        descending = field.startswith("-")
+        if value is None:
+            beyond = Q(pk__in=[]) if descending else Q(**{f"{name}__isnull": False})
+            equal = Q(**{f"{name}__isnull": True})
+        else:
+            beyond = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+            if descending and _nullable(model, name):
+                beyond |= Q(**{f"{name}__isnull": True})
+            equal = Q(**{name: value})
+        condition = beyond if condition is None else beyond | (equal & condition)
+    return condition
+
+
+def _row_values(obj, ordering):
+    values = []
+    for field in ordering:
+        value = obj
+        for part in field.lstrip("-").split("__"):
+            value = getattr(value, part, None)
+        if isinstance(value, Model):
+            value = value.pk
+        values.append(value)
+    return values
+
+
+def keyset_page(queryset, cursor, page_size):
+    """
+    Fetch one page of `queryset` after (or, for a previous-page cursor,
+    before) the row encoded in `cursor`, with a WHERE on the ordering
+    columns instead of an OFFSET.
+    """
+    ordering = keyset_ordering(queryset)
+    values, reverse = _decode_cursor(cursor) if cursor else (None, False)
+    if values is not None and len(values) != len(ordering):
+        raise NotFound("Cursor does not match the current ordering")
+
+    scan = [_flip(field) for field in ordering] if reverse else ordering
+    queryset = queryset.order_by(*scan)
+    if values is not None:
+        queryset = queryset.filter(_after(queryset.model, scan, values))
+
+    rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+
+    has_next, has_previous = (values is not None, has_more) if reverse else (has_more, values is not None)
+    next_cursor = previous_cursor = None
+    if rows and has_next:
+        next_cursor = _encode_cursor(_row_values(rows[-1], ordering))
+    if rows and has_previous:
+        previous_cursor = _encode_cursor(_row_values(rows[0], ordering), reverse=True)
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    Opt-in keyset ("cursor") pagination for the page-number paginators.
+
+    A request with ?pagination=cursor, or with a ?cursor= from a previous
+    response, is paged by keyset on the active ordering (see keyset_page)
+    so deep pages cost the same as the first one. No COUNT(*) is run in
+    this mode unless ?include_count=true.
+    """
+    django_paginator_class = EstimatedCountPaginator
+    cursor_query_param = 'cursor'
+    pagination_query_param = 'pagination'
+    include_count_query_param = 'include_count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = (
+            request.query_params.get(self.pagination_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.keyset_count = None
+        if request.query_params.get(self.include_count_query_param, '').lower() == 'true':
+            self.keyset_count = count_queryset(queryset)
+
+        page_size = self.get_page_size(request) or self.page_size
+        self.keyset_page = keyset_page(
+            queryset, request.query_params.get(self.cursor_query_param), page_size
+        )
+        return self.keyset_page.items
+
+    def _cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_keyset_paginated_response(self, data):
+        body = {
+            'next': self._cursor_link(self.keyset_page.next_cursor),
+            'previous': self._cursor_link(self.keyset_page.previous_cursor),
+            'results': data,
+        }
+        if self.keyset_count is not None:
+            body['count'], body['count_is_estimate'] = self.keyset_count
+        return Response(body)
+
+    @property
+    def count_is_estimate(self):
+        return self.page.paginator.count_is_estimate
+
+
+class CustomPagination(KeysetPaginationMixin, PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
-    
+
     def get_paginated_response(self, data):
+        if self.keyset:
+            return self.get_keyset_paginated_response(data)
         return Response({
             'links': {
                 'next': self.get_next_link(),
                 'previous': self.get_previous_link(),
             },
             'count': self.page.paginator.count,
+            'count_is_estimate': self.count_is_estimate,
             'total_pages': self.page.paginator.num_pages,
             'current_page': self.page.number,
             'results': data,
         })
 
-class MessagePagination(PageNumberPagination):
+class MessagePagination(KeysetPaginationMixin, PageNumberPagination):
     """
     Custom pagination for messages and threads.
     """
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
-    
+
     def get_paginated_response(self, data):
+        if self.keyset:
+            return self.get_keyset_paginated_response(data)
         return Response({
             'count': self.page.paginator.count,
+            'count_is_estimate': self.count_is_estimate,
             'next': self.get_next_link(),
             'previous': self.get_previous_link(),
             'total_pages': self.page.paginator.num_pages,
@@ -37,17 +280,20 @@ class MessagePagination(PageNumberPagination):
         })
 
 
-class ThreadPagination(PageNumberPagination):
+class ThreadPagination(KeysetPaginationMixin, PageNumberPagination):
     """
     Custom pagination for message threads.
     """
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 50
-    
+
     def get_paginated_response(self, data):
+        if self.keyset:
+            return self.get_keyset_paginated_response(data)
         return Response({
             'count': self.page.paginator.count,
+            'count_is_estimate': self.count_is_estimate,
             'next': self.get_next_link(),
             'previous': self.get_previous_link(),
             'total_pages': self.page.paginator.num_pages,
@@ -62,4 +308,4 @@ class QuickContactsPagination(PageNumberPagination):
     """
     page_size = 8
     page_size_query_param = 'page_size'
-    max_page_size = 20
\ No newline at end of file
+    max_page_size = 20
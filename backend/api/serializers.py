@@ -2,6 +2,8 @@
 from rest_framework import serializers
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db.models import F, Func, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.contrib.auth import get_user_model
@@ -19,31 +21,62 @@ from real_estate.models import (
     Inquiry,
     PropertyView,
     PropertyComparison,
+    ComparisonReport,
     ComparisonSession,
     Message,
     MessageThread,
 )
-from api.models import MarketStats, PropertyValuation, Notification, NotificationPreference, AuditLog
+from api.models import MarketStats, PropertyValuation, Notification, NotificationPreference, AuditLog, ExportJob
 
 User = get_user_model()
 
 
+def split_param(value):
+    """Names of a comma separated query parameter, or None if it is absent"""
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
 class DynamicFieldsModelSerializer(serializers.ModelSerializer):
     """
-    A ModelSerializer that takes an additional `fields` argument that
-    controls which fields should be displayed.
+    A ModelSerializer that takes additional `fields` and `expand` arguments.
+
+    `fields` controls which fields should be displayed. `expand` replaces
+    the compact representation of the relations listed in
+    Meta.expandable_fields ({name: (serializer_class, kwargs)}) with the
+    full nested one; expanded fields are always displayed. Views pass
+    them from the ?fields=a,b and ?expand=c,d query parameters with
+    query_param_kwargs.
     """
 
     def __init__(self, *args, **kwargs):
         fields = kwargs.pop("fields", None)
+        expand = kwargs.pop("expand", None)
         super().__init__(*args, **kwargs)
 
+        expandable = getattr(self.Meta, "expandable_fields", {})
+        expanded = [name for name in expand or [] if name in expandable]
+        for name in expanded:
+            serializer_class, options = expandable[name]
+            self.fields[name] = serializer_class(read_only=True, **options)
+
         if fields is not None:
-            allowed = set(fields)
+            allowed = set(fields) | set(expanded)
             existing = set(self.fields)
             for field_name in existing - allowed:
                 self.fields.pop(field_name)
 
+    @staticmethod
+    def query_param_kwargs(request):
+        """`fields` and `expand` arguments given by the request's query string"""
+        kwargs = {}
+        for name in ("fields", "expand"):
+            value = split_param(request.query_params.get(name))
+            if value is not None:
+                kwargs[name] = value
+        return kwargs
+
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
@@ -270,6 +303,135 @@ class PropertySerializer(DynamicFieldsModelSerializer):
         return obj.approval_status == "approved"
 
 
+class PropertyListSerializer(DynamicFieldsModelSerializer):
+    """
+    Card representation of a property for list pages: the card's columns,
+    compact city and sub city, owner and agent ids and the primary image
+    only. ?expand=owner,agent,images,amenities nests them in full.
+
+    Use setup_eager_loading on the queryset so only the columns of the
+    displayed fields are read.
+    """
+    city = CitySerializer(read_only=True, fields=["id", "name", "name_amharic"])
+    sub_city = SubCitySerializer(read_only=True, fields=["id", "name", "name_amharic"])
+    images = serializers.SerializerMethodField()
+    price_per_sqm = serializers.DecimalField(
+        max_digits=15, decimal_places=2, read_only=True
+    )
+    days_on_market = serializers.IntegerField(read_only=True)
+    is_approved = serializers.SerializerMethodField()
+
+    # Columns behind the computed fields
+    COMPUTED_COLUMNS = {
+        "price_per_sqm": ["price_etb", "total_area"],
+        "days_on_market": ["listed_date"],
+        "is_approved": ["approval_status"],
+    }
+    # Always loaded: Property.__init__ reads approval_status and is_promoted,
+    # deferring them would cost a query per row
+    REQUIRED_COLUMNS = ["id", "approval_status", "is_promoted"]
+
+    class Meta:
+        model = Property
+        fields = [
+            "id",
+            "property_id",
+            "title",
+            "title_amharic",
+            "description",
+            "property_type",
+            "listing_type",
+            "property_status",
+            "city",
+            "sub_city",
+            "specific_location",
+            "bedrooms",
+            "bathrooms",
+            "total_area",
+            "price_etb",
+            "price_usd",
+            "monthly_rent",
+            "price_negotiable",
+            "price_per_sqm",
+            "images",
+            "owner",
+            "agent",
+            "is_featured",
+            "is_verified",
+            "is_premium",
+            "is_promoted",
+            "promotion_tier",
+            "promotion_end",
+            "is_active",
+            "approval_status",
+            "is_approved",
+            "views_count",
+            "inquiry_count",
+            "save_count",
+            "listed_date",
+            "days_on_market",
+            "created_at",
+        ]
+        read_only_fields = fields
+        expandable_fields = {
+            "owner": (UserSerializer, {}),
+            "agent": (UserSerializer, {}),
+            "images": (PropertyImageSerializer, {"many": True}),
+            "amenities": (AmenitySerializer, {"many": True}),
+        }
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None, expand=None):
+        """
+        Restrict `queryset` to the columns and relations the serializer will
+        read for the given `fields` and `expand` (as passed to __init__).
+        """
+        expand = [name for name in expand or [] if name in cls.Meta.expandable_fields]
+        displayed = set(cls.Meta.fields if fields is None else fields) | set(expand)
+
+        columns = list(cls.REQUIRED_COLUMNS)
+        for name in displayed:
+            if name in cls.COMPUTED_COLUMNS:
+                columns.extend(cls.COMPUTED_COLUMNS[name])
+            elif name in cls.Meta.fields and name not in ("city", "sub_city", "images"):
+                columns.append(name)
+
+        # Compact city and sub city: just the columns they display
+        related = [name for name in ("city", "sub_city") if name in displayed]
+        for name in related:
+            columns.extend(f"{name}__{column}" for column in ("id", "name", "name_amharic"))
+        related += [name for name in ("owner", "agent") if name in expand]
+
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        queryset = queryset.only(*dict.fromkeys(columns))
+
+        if "images" in expand:
+            queryset = queryset.prefetch_related("images")
+        elif "images" in displayed:
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "images",
+                    queryset=PropertyImage.objects.order_by("-is_primary", "order")[:1],
+                    to_attr="primary_images",
+                )
+            )
+        if "amenities" in expand:
+            queryset = queryset.prefetch_related("amenities")
+        return queryset
+
+    def get_images(self, obj):
+        # Prefetched by setup_eager_loading: primary image first, else by order
+        images = getattr(obj, "primary_images", None)
+        if images is None:
+            images = obj.images.order_by("-is_primary", "order")[:1]
+        return PropertyImageSerializer(images, many=True, context=self.context).data
+
+    def get_is_approved(self, obj):
+        return obj.approval_status == "approved"
+
+
 # api/serializers.py - UPDATED PropertyCreateSerializer
 class PropertyCreateSerializer(DynamicFieldsModelSerializer):
     images = serializers.ListField(
@@ -597,6 +759,55 @@ class MessageThreadSerializer(serializers.ModelSerializer):
             'updated_at',
         ]
     
+    @staticmethod
+    def setup_eager_loading(queryset, user):
+        """
+        Load everything the serializer reads in a fixed number of queries:
+        the unread count as a subquery, related rows with joins, and
+        participants and the primary image of each property with prefetches.
+        """
+        unread = (
+            Message.objects.filter(
+                thread_last_message=OuterRef('pk'),
+                receiver=user,
+                is_read=False
+            )
+            .order_by()
+            .annotate(count=Func(F('id'), function='COUNT'))
+            .values('count')
+        )
+        primary_image = Prefetch(
+            'property__images',
+            queryset=PropertyImage.objects.order_by('-is_primary', 'order')[:1],
+            to_attr='primary_images'
+        )
+        return (
+            queryset
+            .select_related(
+                'inquiry',
+                'property__city',
+                'property__sub_city',
+                'last_message__sender',
+                'last_message__receiver',
+                'last_message__property__city',
+                'last_message__property__sub_city',
+            )
+            .prefetch_related('participants', primary_image)
+            .annotate(
+                unread_messages=Coalesce(
+                    Subquery(unread, output_field=IntegerField()), 0
+                )
+            )
+        )
+    
+    def _get_other_participant(self, obj, user):
+        """Other participant with the lowest id, from the prefetched set"""
+        others = [
+            participant for participant in obj.participants.all()
+            if participant.id != user.id
+        ]
+        return min(others, key=lambda participant: participant.id) if others else None
+    
     def get_participants(self, obj):
         return [
             {
@@ -625,6 +836,16 @@ class MessageThreadSerializer(serializers.ModelSerializer):
     
     def _get_property_image(self, property_obj):
         """Get primary property image URL"""
+        # Prefetched by setup_eager_loading: primary image first, else by order
+        if hasattr(property_obj, 'primary_images'):
+            image = property_obj.primary_images[0] if property_obj.primary_images else None
+            if image:
+                request = self.context.get('request')
+                if request:
+                    return request.build_absolute_uri(image.image.url)
+                return image.image.url
+            return None
+        
         primary_image = property_obj.images.filter(is_primary=True).first()
         if primary_image:
             request = self.context.get('request')
@@ -648,6 +869,9 @@ class MessageThreadSerializer(serializers.ModelSerializer):
         return None
     
     def get_unread_count(self, obj):
+        if hasattr(obj, 'unread_messages'):
+            return obj.unread_messages
+        
         request = self.context.get('request')
         if request and request.user:
             return Message.objects.filter(
@@ -663,11 +887,10 @@ class MessageThreadSerializer(serializers.ModelSerializer):
             return None
         
         # Find the other participant
-        other_participants = obj.participants.exclude(id=request.user.id)
-        if not other_participants.exists():
+        other_user = self._get_other_participant(obj, request.user)
+        if other_user is None:
             return None
         
-        other_user = other_participants.first()
         return {
             'id': other_user.id,
             'name': f"{other_user.first_name} {other_user.last_name}",
@@ -1106,6 +1329,29 @@ class AuditLogSerializer(DynamicFieldsModelSerializer):
         read_only_fields = ["created_at"]
 
 
+class ExportJobSerializer(serializers.ModelSerializer):
+    total_reports = serializers.IntegerField(read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            "id", "report_types", "filters", "format", "status", "progress",
+            "reports_done", "total_reports", "error", "file_size", "download_url",
+            "created_at", "started_at", "completed_at", "expires_at",
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if not obj.is_available:
+            return None
+        from django.urls import reverse
+
+        url = reverse("export-job-download", kwargs={"pk": obj.pk})
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
+
+
 # Dashboard serializers
 class DashboardStatsSerializer(serializers.Serializer):
     total_properties = serializers.IntegerField()
@@ -1225,6 +1471,28 @@ class ComparisonMatrixSerializer(serializers.Serializer):
     matrix = serializers.DictField()
 
 
+class ComparisonReportSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ComparisonReport
+        fields = [
+            "id", "comparison", "property_ids", "format", "status", "error",
+            "file_size", "download_url", "created_at", "started_at",
+            "completed_at", "expires_at",
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if not obj.is_available:
+            return None
+        from django.urls import reverse
+
+        url = reverse("comparison-report-download", kwargs={"report_id": obj.pk})
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
+
+
 class AddToComparisonSerializer(serializers.Serializer):
     property_ids = serializers.ListField(
         child=serializers.IntegerField(), min_length=1, max_length=10
@@ -0,0 +1,40 @@
+"""
+Small statistics helpers that run in the database.
+"""
+from decimal import Decimal
+
+
+def percentile(queryset, field, fraction, count=None):
+    """
+    Get a percentile of `field` over `queryset` with linear interpolation.
+
+    MySQL has no PERCENTILE_CONT, so this sorts on the column and fetches
+    only the one or two rows around the requested rank with LIMIT/OFFSET.
+    Pass `count` (of non-null values) when the caller already knows it to
+    save a COUNT query.
+    """
+    values = queryset.exclude(**{f"{field}__isnull": True})
+    if count is None:
+        count = values.count()
+    if not count:
+        return None
+
+    position = (count - 1) * fraction
+    lower = int(position)
+    neighbours = list(
+        values.order_by(field).values_list(field, flat=True)[lower:lower + 2]
+    )
+    if not neighbours:
+        return None
+    if len(neighbours) == 1 or position == lower:
+        return neighbours[0]
+
+    weight = position - lower
+    if isinstance(neighbours[0], Decimal):
+        weight = Decimal(str(weight))
+    return neighbours[0] + (neighbours[1] - neighbours[0]) * weight
+
+
+def median(queryset, field, count=None):
+    """Median of `field` over `queryset`"""
+    return percentile(queryset, field, 0.5, count=count)
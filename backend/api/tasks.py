@@ -1,4 +1,14 @@
+import threading
+
 from django.conf import settings
+from django.db import connection
+
+def _in_own_connection(func, *args):
+    """Thread target: run func, then close the connection the thread opened"""
+    try:
+        return func(*args)
+    finally:
+        connection.close()
 
 def _sync_send_email(subject, message, from_email, recipient_list, fail_silently=True):
     from django.core.mail import send_mail
@@ -12,7 +22,43 @@ try:
     def send_email_task(subject, message, from_email, recipient_list, fail_silently=True):
         from django.core.mail import send_mail
         return send_mail(subject, message, from_email, recipient_list, fail_silently=fail_silently)
+
+    @app.task(ignore_result=True)
+    def reconcile_unread_counters_task(user_ids=None):
+        from .counters import reconcile_unread_counters
+        return reconcile_unread_counters(user_ids)
+
+    @app.task(ignore_result=True)
+    def run_export_job_task(job_id):
+        from .export_jobs import run_export_job
+        return run_export_job(job_id)
+
+    @app.task(ignore_result=True)
+    def cleanup_export_artifacts_task():
+        from .export_jobs import cleanup_expired_exports
+        return cleanup_expired_exports()
+
+    def enqueue_export_job(job_id):
+        run_export_job_task.delay(str(job_id))
 except Exception:
     def send_email_task(subject, message, from_email, recipient_list, fail_silently=True):
         return _sync_send_email(subject, message, from_email, recipient_list, fail_silently)
 
+    def reconcile_unread_counters_task(user_ids=None):
+        from .counters import reconcile_unread_counters
+        return reconcile_unread_counters(user_ids)
+
+    def run_export_job_task(job_id):
+        from .export_jobs import run_export_job
+        return run_export_job(job_id)
+
+    def cleanup_export_artifacts_task():
+        from .export_jobs import cleanup_expired_exports
+        return cleanup_expired_exports()
+
+    def enqueue_export_job(job_id):
+        # No worker available: build in a background thread so the request isn't held
+        threading.Thread(
+            target=_in_own_connection, args=(run_export_job_task, str(job_id)),
+            name="export-job", daemon=True,
+        ).start()
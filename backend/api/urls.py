@@ -48,6 +48,11 @@ urlpatterns = [
         views.PropertyValuationView.as_view(),
         name="property-valuation",
     ),
+    path(
+        "property-valuation/batch/",
+        views.PropertyValuationBatchView.as_view(),
+        name="property-valuation-batch",
+    ),
     # Dashboard
     path(
         "admin/dashboard/", views.AdminDashboardView.as_view(), name="admin-dashboard"
@@ -113,6 +118,16 @@ urlpatterns = [
         name="admin-export-format",
     ),
     path("admin/exports/batch/", views.BatchExportView.as_view(), name="batch-export"),
+    path(
+        "admin/exports/jobs/<uuid:pk>/",
+        views.ExportJobDetailView.as_view(),
+        name="export-job-detail",
+    ),
+    path(
+        "admin/exports/jobs/<uuid:pk>/download/",
+        views.ExportJobDownloadView.as_view(),
+        name="export-job-download",
+    ),
     path("admin/settings/", views.AdminSettingsView.as_view(), name="admin-settings"),
     path(
         "admin/listings/pending/",
@@ -0,0 +1,79 @@
+"""
+Write-behind history of property valuations.
+
+Every valuation requested by a signed-in user is kept as a
+PropertyValuation row. The view used to INSERT it before answering, one
+row at a time, and a batch valuation would have run an INSERT per
+property. Rows are now built in memory and handed to the buffer below,
+which writes them with bulk_create in the background, the same way as
+the audit log (see api/audit.py): every VALUATION_HISTORY_FLUSH_INTERVAL
+seconds or as soon as VALUATION_HISTORY_BATCH_SIZE rows are waiting,
+bounded by VALUATION_HISTORY_MAX_BUFFER.
+
+Specs come from real_estate.valuation.parse_spec, which checks the city
+and sub city; rows whose values still don't fit their columns are
+skipped here rather than left for the flush to reject.
+
+Set VALUATION_HISTORY_SYNC to write every row immediately (tests, shell).
+"""
+import logging
+
+from .audit import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+# Bounds of the PropertyValuation columns
+MAX_PROPERTY_TYPE_LENGTH = 20
+MAX_TOTAL_AREA = 99999999.99
+MAX_VALUE = 9999999999999.99
+MAX_TREND = 999.99
+
+
+class ValuationHistoryBuffer(WriteBehindBuffer):
+    """Thread-safe bounded buffer of unsaved PropertyValuation instances"""
+    setting_prefix = "VALUATION_HISTORY"
+    label = "valuation history"
+    thread_name = "valuation-history-flusher"
+
+    def get_model(self):
+        from .models import PropertyValuation
+
+        return PropertyValuation
+
+
+valuation_buffer = ValuationHistoryBuffer()
+
+
+def record_valuation(user, spec, result):
+    """Queue the history row of a valuation (see real_estate.valuation.estimate)"""
+    from .models import PropertyValuation
+
+    if (
+        len(spec["property_type"]) > MAX_PROPERTY_TYPE_LENGTH
+        or spec["total_area"] > MAX_TOTAL_AREA
+        or result["value_range"]["high"] > MAX_VALUE
+    ):
+        logger.warning(f"Valuation of {spec['total_area']} m² {spec['property_type'][:20]} not recorded: out of range")
+        return
+
+    valuation_buffer.enqueue(
+        PropertyValuation(
+            user=user,
+            city_id=spec["city"],
+            sub_city_id=spec["sub_city"],
+            property_type=spec["property_type"],
+            bedrooms=spec["bedrooms"],
+            total_area=spec["total_area"],
+            built_year=spec["built_year"],
+            estimated_value_low=result["value_range"]["low"],
+            estimated_value_mid=result["estimated_value"],
+            estimated_value_high=result["value_range"]["high"],
+            confidence_level=result["confidence"],
+            price_per_sqm=result["price_per_sqm"],
+            comparables_count=result["comparables_count"],
+            comparables_ids=[item["id"] for item in result.get("comparables", [])],
+            market_trend=result["market_trend"],
+            trend_strength=max(min(result["trend_strength"], MAX_TREND), -MAX_TREND),
+            notes=result["notes"],
+        )
+    )
@@ -9,10 +9,12 @@ from rest_framework.permissions import (
     IsAuthenticatedOrReadOnly,
 )
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.throttling import ScopedRateThrottle, UserRateThrottle
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth import get_user_model
@@ -45,11 +47,29 @@ import json
 from uuid import UUID
 from io import StringIO
 from .serializers import *
-from .filters import PropertyFilter
+from .filters import PropertyFilter, RelevanceOrderingFilter
 from .permissions import *
-from .pagination import CustomPagination, MessagePagination
+from .pagination import CustomPagination, MessagePagination, keyset_page
+from . import cache as api_cache
+from . import counters
+from . import export_jobs
+from . import exports
+from .audit import audit_buffer
+from .valuation_history import record_valuation, valuation_buffer
+from .statistics import median
 from real_estate.models import Property, Inquiry
 from real_estate.comparison import PropertyComparisonService
+from real_estate import comparison_engine
+from real_estate import comparison_reports
+from real_estate import comparison_sessions
+from real_estate.view_tracking import view_buffer
+from real_estate import geo
+from real_estate.facets import property_facets
+from real_estate.recommendations import recommended_properties
+from real_estate.search_cache import SearchResultCacheMixin
+from real_estate.similarity import similar_properties
+from real_estate import valuation
+from real_estate.visibility import visible_to
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -138,13 +158,12 @@ class UserViewSet(viewsets.ModelViewSet):
 
 
 # Property Views
-class PropertyViewSet(viewsets.ModelViewSet):
+class PropertyViewSet(SearchResultCacheMixin, viewsets.ModelViewSet):
     serializer_class = PropertySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
-        filters.OrderingFilter,
+        RelevanceOrderingFilter,
     ]
 
     def get_queryset(self):
@@ -163,6 +182,10 @@ class PropertyViewSet(viewsets.ModelViewSet):
 
         # Admin bypass
         if user.is_authenticated and getattr(user, 'is_admin_user', False):
+            if self.action == "list":
+                return PropertyListSerializer.setup_eager_loading(
+                    queryset, **PropertyListSerializer.query_param_kwargs(self.request)
+                )
             return queryset
 
         # Define management actions
@@ -173,17 +196,16 @@ class PropertyViewSet(viewsets.ModelViewSet):
             # The permission_classes (IsOwnerOrReadOnly) will then ensure only the owner can modify it.
             return queryset
 
-        # For standard list and retrieve actions
-        if user.is_authenticated:
-            # Include active properties OR properties where user is owner/agent
-            return queryset.filter(
-                Q(is_active=True) | Q(owner=user) | Q(agent=user)
-            ).distinct()
-        
-        # Anonymous users only see active properties
-        return queryset.filter(is_active=True)
-    filterset_class = PropertyFilter
-    search_fields = ["title", "title_amharic", "description", "specific_location"]
+        # For standard list and retrieve actions: active properties, plus
+        # the user's own inactive ones (owner or agent) when signed in
+        queryset = visible_to(queryset, user)
+        if self.action == "list":
+            # Card columns only, for the fields the request displays
+            queryset = PropertyListSerializer.setup_eager_loading(
+                queryset, **PropertyListSerializer.query_param_kwargs(self.request)
+            )
+        return queryset
+    filterset_class = PropertyFilter  # ?search= is handled by PropertyFilter.filter_search
     ordering_fields = [
         "price_etb",
         "created_at",
@@ -198,8 +220,17 @@ class PropertyViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action in ["create", "update", "partial_update"]:
             return PropertyCreateSerializer
+        if self.action == "list":
+            return PropertyListSerializer
         return PropertySerializer
 
+    def get_serializer(self, *args, **kwargs):
+        # ?fields= and ?expand= shape list and detail responses
+        if self.action in ["list", "retrieve"]:
+            for name, value in DynamicFieldsModelSerializer.query_param_kwargs(self.request).items():
+                kwargs.setdefault(name, value)
+        return super().get_serializer(*args, **kwargs)
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context["request"] = self.request
@@ -234,16 +265,26 @@ class PropertyViewSet(viewsets.ModelViewSet):
             user_agent=self.request.META.get("HTTP_USER_AGENT", ""),
         )
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # ?facets=true: sidebar counts for the same filters
+        if request.query_params.get("facets", "").lower() in ("1", "true"):
+            response.data["facets"] = property_facets(
+                self.filter_queryset(self.get_queryset()), request, self
+            )
+        return response
+
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
 
-        # Log view
-        PropertyView.objects.create(
-            property=instance,
-            user=request.user if request.user.is_authenticated else None,
+        # Log view (buffered; written in batches by the view flusher)
+        view_buffer.record(
+            instance.id,
+            user_id=request.user.id if request.user.is_authenticated else None,
             ip_address=request.META.get("REMOTE_ADDR"),
             user_agent=request.META.get("HTTP_USER_AGENT", ""),
             session_id=request.session.session_key or "",
+            count=False,
         )
 
         serializer = self.get_serializer(instance)
@@ -278,6 +319,71 @@ class PropertyViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(featured_properties, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"])
+    def map(self, request):
+        """
+        Markers for the map view, filtered on the server.
+
+        ?bbox=south,west,north,east limits them to the visible area and
+        ?lat=&lng=&radius_km= to a circle (nearest first, with distance_km).
+        Below MAP_CLUSTER_MAX_ZOOM, ?zoom= returns clusters per geohash cell
+        instead of markers. The PropertyFilter parameters apply as well.
+        """
+        params = request.query_params
+        try:
+            bbox = [float(value) for value in params["bbox"].split(",")] if params.get("bbox") else None
+            center = (float(params["lat"]), float(params["lng"])) if params.get("lat") or params.get("lng") else None
+            radius_km = float(params.get("radius_km", 5))
+            zoom = int(params["zoom"]) if params.get("zoom") else None
+        except (KeyError, ValueError):
+            return Response({"error": "Invalid bbox, lat, lng, radius_km or zoom"}, status=400)
+
+        if bbox is not None and (len(bbox) != 4 or not -90 <= bbox[0] <= bbox[2] <= 90):
+            return Response({"error": "bbox must be south,west,north,east"}, status=400)
+        if center is not None and not (-90 <= center[0] <= 90 and -180 <= center[1] <= 180):
+            return Response({"error": "Invalid lat or lng"}, status=400)
+        if not 0 < radius_km <= settings.MAP_MAX_RADIUS_KM:
+            return Response(
+                {"error": f"radius_km must be between 0 and {settings.MAP_MAX_RADIUS_KM}"},
+                status=400,
+            )
+
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .select_related(None)
+            .prefetch_related(None)
+            .filter(latitude__isnull=False, longitude__isnull=False)
+        )
+        if bbox is not None:
+            queryset = geo.within_box(queryset, *bbox)
+        if center is not None:
+            queryset = geo.within_radius(queryset, center[0], center[1], radius_km)
+
+        precision = geo.cluster_precision(zoom) if zoom is not None else None
+        if precision is not None:
+            clusters = geo.clusters(queryset, precision)
+            return Response({
+                "clustered": True,
+                "precision": precision,
+                "count": sum(cluster["count"] for cluster in clusters),
+                "clusters": clusters,
+            })
+
+        fields = [
+            "id", "title", "property_type", "listing_type",
+            "price_etb", "monthly_rent", "latitude", "longitude",
+        ]
+        if center is not None:
+            fields.append("distance_km")
+        limit = settings.MAP_MAX_MARKERS
+        markers = list(queryset.values(*fields)[:limit + 1])
+        return Response({
+            "clustered": False,
+            "truncated": len(markers) > limit,
+            "count": min(len(markers), limit),
+            "markers": markers[:limit],
+        })
+
     @action(detail=False, methods=["get"])
     def similar(self, request):
         property_id = request.query_params.get("property_id")
@@ -286,29 +392,43 @@ class PropertyViewSet(viewsets.ModelViewSet):
 
         try:
             current_property = Property.objects.get(id=property_id)
+        except (Property.DoesNotExist, ValueError):
+            return Response({"error": "Property not found"}, status=404)
 
+        # Precomputed neighbours (see real_estate/similarity.py)
+        similar = similar_properties(current_property.id, limit=8).select_related(
+            "city", "sub_city", "owner", "agent"
+        ).prefetch_related("images", "amenities")
+        if not similar:
+            # Not indexed yet: newest listings of the same kind nearby
             similar = (
                 Property.objects.filter(
-                    Q(city=current_property.city)
-                    | Q(sub_city=current_property.sub_city)
-                    | Q(property_type=current_property.property_type),
                     is_active=True,
                     listing_type=current_property.listing_type,
+                    property_type=current_property.property_type,
+                    city=current_property.city,
                 )
-                .exclude(id=property_id)
-                .order_by("?")[:8]
+                .exclude(id=current_property.id)
+                .select_related("city", "sub_city", "owner", "agent")
+                .prefetch_related("images", "amenities")
+                .order_by("-created_at")[:8]
             )
 
-            serializer = self.get_serializer(similar, many=True)
-            return Response(serializer.data)
-        except Property.DoesNotExist:
-            return Response({"error": "Property not found"}, status=404)
+        serializer = self.get_serializer(similar, many=True)
+        return Response(serializer.data)
 
     @action(detail=False, methods=["get"])
     def recommendations(self, request):
         user = request.user
 
-        # Get user preferences from profile
+        # Precomputed by the nightly job, minus listings gone since
+        if user.is_authenticated:
+            recommended = recommended_properties(user, limit=12)
+            if recommended:
+                serializer = self.get_serializer(recommended, many=True)
+                return Response(serializer.data)
+
+        # No stored recommendations yet: get user preferences from profile
         preferences = []
         if hasattr(user, "user_profile") and user.user_profile:
             preferences = user.user_profile.preferred_property_types or []
@@ -340,31 +460,20 @@ class PropertyViewSet(viewsets.ModelViewSet):
             request.session.create()
             session_key = request.session.session_key
 
-        comparison_session, created = ComparisonSession.objects.get_or_create(
-            session_id=session_key
-        )
-
-        # Check if property already in comparison
-        if property in comparison_session.properties.all():
-            comparison_session.properties.remove(property)
-            action = "removed"
-        else:
-            # Check limit
-            if comparison_session.properties.count() >= 10:
-                return Response(
-                    {"error": "Cannot compare more than 10 properties"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            comparison_session.properties.add(property)
-            action = "added"
-
-        comparison_session.save()
+        # The basket lives in the cache (see real_estate/comparison_sessions.py)
+        try:
+            action, property_ids = comparison_sessions.toggle_property(session_key, property.id)
+        except comparison_sessions.ComparisonFull:
+            return Response(
+                {"error": f"Cannot compare more than {comparison_sessions.MAX_PROPERTIES} properties"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         return Response(
             {
                 "action": action,
                 "property_id": property.id,
-                "session_properties_count": comparison_session.properties.count(),
+                "session_properties_count": len(property_ids),
                 "session_id": session_key,
             }
         )
@@ -374,28 +483,47 @@ class PropertyViewSet(viewsets.ModelViewSet):
         """Get current comparison session"""
         session_key = request.session.session_key
 
-        if not session_key:
+        property_ids = comparison_sessions.get_property_ids(session_key)
+        if not property_ids:
             return Response({"properties": [], "count": 0})
 
-        try:
-            comparison_session = ComparisonSession.objects.get(session_id=session_key)
-            properties = comparison_session.properties.filter(is_active=True)
+        # In the order they were added
+        position = {property_id: index for index, property_id in enumerate(property_ids)}
+        properties = sorted(
+            Property.objects.filter(id__in=property_ids, is_active=True)
+            .select_related("city", "sub_city", "owner", "agent")
+            .prefetch_related("images", "amenities"),
+            key=lambda prop: position[prop.id],
+        )
 
-            return Response(
-                {
-                    "properties": PropertySerializer(properties, many=True).data,
-                    "count": properties.count(),
-                    "session_id": session_key,
-                }
-            )
-        except ComparisonSession.DoesNotExist:
-            return Response({"properties": [], "count": 0})
+        return Response(
+            {
+                "properties": PropertySerializer(properties, many=True).data,
+                "count": len(properties),
+                "session_id": session_key,
+            }
+        )
+
+    @action(detail=False, methods=["post"])
+    def clear_comparison(self, request):
+        """Empty the comparison session"""
+        comparison_sessions.clear(request.session.session_key)
+        return Response({"properties": [], "count": 0})
 
 
 # Market Views
 class MarketStatsView(generics.GenericAPIView):
     permission_classes = [AllowAny]
 
+    # (label, lower bound inclusive, upper bound exclusive)
+    PRICE_RANGES = [
+        ("Under 1M", None, 1000000),
+        ("1M - 3M", 1000000, 3000000),
+        ("3M - 5M", 3000000, 5000000),
+        ("5M - 10M", 5000000, 10000000),
+        ("10M+", 10000000, None),
+    ]
+
     def get(self, request):
         city_id = request.query_params.get("city")
         sub_city_id = request.query_params.get("sub_city")
@@ -414,30 +542,44 @@ class MarketStatsView(generics.GenericAPIView):
         filters["is_active"] = True
         filters["property_status"] = "available"
 
+        cache_key = api_cache.make_cache_key(
+            api_cache.MARKET_STATS, city_id, sub_city_id, property_type
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return Response(cached)
+
         # Get properties
         properties = Property.objects.filter(**filters)
 
-        # Calculate statistics
-        if properties.exists():
-            stats = properties.aggregate(
-                avg_price=Avg("price_etb"),
-                median_price=Avg("price_etb"),  # Simplified median
-                min_price=Min("price_etb"),
-                max_price=Max("price_etb"),
-                total_listings=Count("id"),
-                avg_bedrooms=Avg("bedrooms"),
-                avg_area=Avg("total_area"),
-                avg_price_per_sqm=Avg(F("price_etb") / F("total_area")),
-            )
-
-            # Calculate price changes
-            thirty_days_ago = timezone.now() - timedelta(days=30)
-            recent_properties = properties.filter(created_at__gte=thirty_days_ago)
-            older_properties = properties.filter(created_at__lt=thirty_days_ago)
+        # Summary, 30-day change and price range buckets in a single query
+        thirty_days_ago = timezone.now() - timedelta(days=30)
+        recent = Q(created_at__gte=thirty_days_ago)
+        price_buckets = {
+            f"price_range_{index}": Count("id", filter=self._price_range_q(low, high))
+            for index, (_, low, high) in enumerate(self.PRICE_RANGES)
+        }
+        stats = properties.aggregate(
+            avg_price=Avg("price_etb"),
+            min_price=Min("price_etb"),
+            max_price=Max("price_etb"),
+            total_listings=Count("id"),
+            avg_bedrooms=Avg("bedrooms"),
+            avg_area=Avg("total_area"),
+            avg_price_per_sqm=Avg(F("price_etb") / F("total_area")),
+            recent_avg=Avg("price_etb", filter=recent),
+            older_avg=Avg("price_etb", filter=~recent),
+            new_listings_30d=Count("id", filter=recent),
+            **price_buckets,
+        )
 
-            recent_avg = recent_properties.aggregate(avg=Avg("price_etb"))["avg"] or 0
-            older_avg = older_properties.aggregate(avg=Avg("price_etb"))["avg"] or 0
+        if stats["total_listings"]:
+            stats["median_price"] = median(
+                properties, "price_etb", count=stats["total_listings"]
+            )
 
+            recent_avg = stats["recent_avg"] or 0
+            older_avg = stats["older_avg"] or 0
             if older_avg > 0:
                 price_change = ((recent_avg - older_avg) / older_avg) * 100
             else:
@@ -459,50 +601,16 @@ class MarketStatsView(generics.GenericAPIView):
 
             # Price ranges
             price_ranges = [
-                {
-                    "range": "Under 1M",
-                    "count": properties.filter(price_etb__lt=1000000).count(),
-                },
-                {
-                    "range": "1M - 3M",
-                    "count": properties.filter(
-                        price_etb__gte=1000000, price_etb__lt=3000000
-                    ).count(),
-                },
-                {
-                    "range": "3M - 5M",
-                    "count": properties.filter(
-                        price_etb__gte=3000000, price_etb__lt=5000000
-                    ).count(),
-                },
-                {
-                    "range": "5M - 10M",
-                    "count": properties.filter(
-                        price_etb__gte=5000000, price_etb__lt=10000000
-                    ).count(),
-                },
-                {
-                    "range": "10M+",
-                    "count": properties.filter(price_etb__gte=10000000).count(),
-                },
+                {"range": label, "count": stats[f"price_range_{index}"]}
+                for index, (label, _, _) in enumerate(self.PRICE_RANGES)
             ]
         else:
             # Default values for no data
-            stats = {
-                "avg_price": 0,
-                "median_price": 0,
-                "min_price": 0,
-                "max_price": 0,
-                "total_listings": 0,
-                "avg_bedrooms": 0,
-                "avg_area": 0,
-                "avg_price_per_sqm": 0,
-            }
+            stats["median_price"] = 0
             price_change = 0
             type_distribution = []
             popular_areas = []
             price_ranges = []
-            recent_properties = Property.objects.none()
 
         response_data = {
             "summary": {
@@ -519,7 +627,7 @@ class MarketStatsView(generics.GenericAPIView):
             },
             "trends": {
                 "price_change_30d": round(price_change, 2),
-                "new_listings_30d": recent_properties.count(),
+                "new_listings_30d": stats["new_listings_30d"] or 0,
                 "average_days_on_market": 45,  # Would calculate from actual data
                 "inventory_months": 3.2,  # Would calculate from actual data
             },
@@ -535,243 +643,111 @@ class MarketStatsView(generics.GenericAPIView):
             },
         }
 
+        cache.set(cache_key, response_data, settings.MARKET_STATS_CACHE_TTL)
         return Response(response_data)
 
+    @staticmethod
+    def _price_range_q(low, high):
+        q = Q()
+        if low is not None:
+            q &= Q(price_etb__gte=low)
+        if high is not None:
+            q &= Q(price_etb__lt=high)
+        return q
+
 
 class PropertyValuationView(APIView):
+    """
+    Estimate the value of a property from its features, using the models
+    fitted offline in real_estate/valuation.py; no queries are run to
+    value it. Pass include_comparables=true for the nearest listings.
+    """
     permission_classes = [AllowAny]
 
     def post(self, request):
         try:
             data = request.data
-            logger.info(f"Valuation request received: {data}")
-
-            # Import Property model
-            from real_estate.models import Property
-
-            # Extract and validate parameters
-            property_type = data.get("property_type")
-            bedrooms = data.get("bedrooms")
-            total_area = data.get("total_area")
-            built_year = data.get("built_year")
-            condition = data.get("condition", "good")
-            city_id = data.get("city")
-            sub_city_id = data.get("sub_city")
-
-            # Validate required fields
-            if not property_type:
-                return Response(
-                    {"error": "Property type is required"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            if not total_area:
-                return Response(
-                    {"error": "Total area is required"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
 
-            # Convert to appropriate types
             try:
-                total_area = float(total_area)
-                if bedrooms:
-                    bedrooms = int(bedrooms)
-                if built_year:
-                    built_year = int(built_year)
-                if city_id:
-                    city_id = int(city_id)
-                if sub_city_id:
-                    sub_city_id = int(sub_city_id)
-            except (ValueError, TypeError) as e:
-                return Response(
-                    {"error": "Invalid data type in request"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+                spec = valuation.parse_spec(data)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Build query for similar properties
-            similar_properties = Property.objects.filter(
-                is_active=True, property_status="available"
+            valuation_result = valuation.estimate(
+                spec, include_comparables=str(data.get("include_comparables", "")).lower() == "true"
             )
 
-            # Apply filters
-            if property_type:
-                similar_properties = similar_properties.filter(
-                    property_type=property_type
-                )
-
-            if city_id:
-                similar_properties = similar_properties.filter(city_id=city_id)
-
-            if sub_city_id:
-                similar_properties = similar_properties.filter(sub_city_id=sub_city_id)
-
-            if bedrooms:
-                # Allow ±1 bedroom difference
-                similar_properties = similar_properties.filter(
-                    bedrooms__gte=bedrooms - 1, bedrooms__lte=bedrooms + 1
-                )
-
-            if built_year:
-                # Filter properties within ±5 years
-                similar_properties = similar_properties.filter(
-                    built_year__gte=built_year - 5, built_year__lte=built_year + 5
-                )
-
-            comparable_count = similar_properties.count()
-
-            # Calculate valuation
-            if comparable_count > 0:
-                # Get statistics for sale properties
-                sale_properties = similar_properties.filter(
-                    Q(price_etb__gt=0) | Q(price_etb__isnull=False)
-                )
-
-                # Get statistics for rent properties
-                rent_properties = similar_properties.filter(
-                    Q(monthly_rent__gt=0) | Q(monthly_rent__isnull=False)
-                )
-
-                sale_count = sale_properties.count()
-                rent_count = rent_properties.count()
-
-                if sale_count > 0:
-                    # Use sale prices for valuation
-                    stats = sale_properties.aggregate(
-                        avg_price=Avg("price_etb"),
-                        min_price=Min("price_etb"),
-                        max_price=Max("price_etb"),
-                        avg_area=Avg("total_area"),
-                    )
-
-                    avg_price = stats["avg_price"] or 0
-                    avg_area = stats["avg_area"] or 100
-
-                    # Calculate price per sqm
-                    if avg_area > 0:
-                        price_per_sqm = avg_price / avg_area
-                    else:
-                        price_per_sqm = avg_price / 100
-
-                    # Adjust for requested area
-                    base_value = price_per_sqm * total_area
-                    valuation_type = "sale"
-
-                elif rent_count > 0:
-                    # Use rent prices for valuation
-                    stats = rent_properties.aggregate(
-                        avg_rent=Avg("monthly_rent"), avg_area=Avg("total_area")
-                    )
-
-                    avg_rent = stats["avg_rent"] or 0
-                    avg_area = stats["avg_area"] or 100
-
-                    # Calculate rent per sqm
-                    if avg_area > 0:
-                        rent_per_sqm = avg_rent / avg_area
-                    else:
-                        rent_per_sqm = avg_rent / 100
-
-                    # Adjust for requested area and convert to sale value (approx 200 months)
-                    monthly_rent = rent_per_sqm * total_area
-                    base_value = monthly_rent * 200
-                    valuation_type = "rent"
-
-                else:
-                    # No price data, use defaults
-                    base_value = 5000000
-                    valuation_type = "default"
+            # Save valuation if user is authenticated
+            if request.user.is_authenticated:
+                try:
+                    record_valuation(request.user, spec, valuation_result)
+                except Exception as e:
+                    logger.error(f"Error saving valuation: {e}")
+                    # Continue even if saving fails
 
-            else:
-                # No similar properties found, use defaults
-                base_value = 5000000
-                valuation_type = "default"
-                comparable_count = 0
-
-            # Condition multipliers
-            condition_multipliers = {
-                "excellent": 1.2,
-                "good": 1.0,
-                "average": 0.9,
-                "needs_work": 0.7,
-            }
+            return Response(valuation_result)
 
-            condition_multiplier = condition_multipliers.get(condition, 1.0)
-
-            # Feature adjustments (ETB)
-            feature_adjustments = 0
-            if data.get("has_parking"):
-                feature_adjustments += 50000
-            if data.get("has_security"):
-                feature_adjustments += 30000
-            if data.get("has_garden"):
-                feature_adjustments += 100000
-            if data.get("has_furniture"):
-                feature_adjustments += 150000
-
-            # Final valuation
-            final_valuation = (
-                float(base_value * Decimal(condition_multiplier)) + feature_adjustments
+        except Exception as e:
+            logger.error(f"Valuation error: {str(e)}", exc_info=True)
+            return Response(
+                {"error": "Internal server error", "detail": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-            # Confidence level
-            if comparable_count > 10:
-                confidence = "high"
-            elif comparable_count > 5:
-                confidence = "medium"
-            else:
-                confidence = "low"
 
-            # Price per sqm for the valuation
-            price_per_sqm_val = final_valuation / total_area if total_area > 0 else 0
+class PropertyValuationBatchView(APIView):
+    """
+    Value up to VALUATION_BATCH_MAX properties in one call, e.g. an agent
+    pricing a portfolio. Body: {"properties": [<valuation inputs>, ...],
+    "include_comparables": bool}. Each item gets its valuation or the
+    error of its inputs, in the order given; the cache is read once for
+    the whole batch, and the history rows are written in bulk.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [UserRateThrottle, ScopedRateThrottle]
+    throttle_scope = "valuation_batch"
 
-            # Prepare response
-            valuation_result = {
-                "estimated_value": round(final_valuation, 2),
-                "value_range": {
-                    "low": round(final_valuation * 0.85, 2),
-                    "high": round(final_valuation * 1.15, 2),
-                },
-                "confidence": confidence,
-                "comparables_count": comparable_count,
-                "price_per_sqm": round(price_per_sqm_val, 2),
-                "valuation_type": valuation_type,
-                "market_trend": "rising",
-                "trend_strength": 8.2,
-                "valuation_date": timezone.now().date().isoformat(),
-                "notes": f"Based on {comparable_count} similar properties. Condition: {condition}.",
-            }
+    def post(self, request):
+        items = request.data.get("properties")
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"error": "properties must be a non-empty list"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > settings.VALUATION_BATCH_MAX:
+            return Response(
+                {"error": f"At most {settings.VALUATION_BATCH_MAX} properties can be valued at once"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-            # Save valuation if user is authenticated
-            if request.user.is_authenticated:
+        try:
+            results = [None] * len(items)
+            specs = []
+            for index, item in enumerate(items):
                 try:
-                    from api.models import PropertyValuation
-
-                    PropertyValuation.objects.create(
-                        user=request.user,
-                        city_id=city_id,
-                        sub_city_id=sub_city_id,
-                        property_type=property_type,
-                        bedrooms=bedrooms,
-                        total_area=total_area,
-                        built_year=built_year,
-                        estimated_value_low=valuation_result["value_range"]["low"],
-                        estimated_value_mid=valuation_result["estimated_value"],
-                        estimated_value_high=valuation_result["value_range"]["high"],
-                        confidence_level=confidence,
-                        price_per_sqm=valuation_result["price_per_sqm"],
-                        comparables_count=comparable_count,
-                        market_trend="rising",
-                        trend_strength=8.2,
-                        notes=valuation_result["notes"],
-                    )
+                    if not isinstance(item, dict):
+                        raise ValueError("Invalid data type in request")
+                    specs.append((index, valuation.parse_spec(item)))
+                except ValueError as e:
+                    results[index] = {"index": index, "error": str(e)}
+
+            include_comparables = str(request.data.get("include_comparables", "")).lower() == "true"
+            estimates = valuation.estimate_many([spec for _, spec in specs], include_comparables)
+            for (index, spec), valuation_result in zip(specs, estimates):
+                results[index] = dict(valuation_result, index=index)
+                try:
+                    record_valuation(request.user, spec, valuation_result)
                 except Exception as e:
                     logger.error(f"Error saving valuation: {e}")
-                    # Continue even if saving fails
 
-            return Response(valuation_result)
+            return Response({
+                "count": len(items),
+                "valued": len(specs),
+                "results": results,
+            })
 
         except Exception as e:
-            logger.error(f"Valuation error: {str(e)}", exc_info=True)
+            logger.error(f"Batch valuation error: {str(e)}", exc_info=True)
             return Response(
                 {"error": "Internal server error", "detail": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -786,14 +762,30 @@ class CityViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [filters.SearchFilter]
     search_fields = ["name", "name_amharic"]
 
+    @api_cache.cache_response(api_cache.CITIES)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @api_cache.cache_response(api_cache.CITIES)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class SubCityViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = SubCity.objects.all()
+    queryset = SubCity.objects.select_related("city")
     serializer_class = SubCitySerializer
     permission_classes = [AllowAny]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["city"]
 
+    @api_cache.cache_response(api_cache.SUB_CITIES)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @api_cache.cache_response(api_cache.SUB_CITIES)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class SavedSearchViewSet(viewsets.ModelViewSet):
     serializer_class = SavedSearchSerializer
@@ -1046,6 +1038,7 @@ class MessageViewSet(viewsets.ModelViewSet):
 
         if not message.is_read:
             message.mark_as_read()
+            counters.adjust_unread_count(counters.MESSAGES, request.user.id, -1)
             return Response({"status": "Message marked as read"})
 
         return Response({"status": "Message already read"})
@@ -1053,7 +1046,7 @@ class MessageViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"])
     def unread_count(self, request):
         """Get count of unread messages for current user"""
-        count = Message.objects.filter(receiver=request.user, is_read=False).count()
+        count = counters.get_unread_count(counters.MESSAGES, request.user.id)
 
         return Response({"unread_count": count})
 
@@ -1129,12 +1122,9 @@ class MessageThreadViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
 
-        queryset = (
-            MessageThread.objects.filter(participants=user)
-            .select_related("property", "inquiry", "last_message")
-            .prefetch_related("participants")
-            .order_by("-updated_at")
-        )
+        queryset = MessageThreadSerializer.setup_eager_loading(
+            MessageThread.objects.filter(participants=user), user
+        ).order_by("-updated_at")
 
         # Filter by property
         property_id = self.request.query_params.get("property")
@@ -1164,35 +1154,33 @@ class MessageThreadViewSet(viewsets.ModelViewSet):
         """Get quick contacts for the user (recent message participants)"""
         user = request.user
 
-        # Get threads with recent activity
-        recent_threads = (
+        # Get threads with recent activity, unread counts annotated
+        recent_threads = MessageThreadSerializer.setup_eager_loading(
             MessageThread.objects.filter(
                 participants=user, updated_at__gte=timezone.now() - timedelta(days=30)
-            )
-            .select_related("last_message", "property")
-            .prefetch_related("participants")
-            .order_by("-updated_at")[:10]
-        )
+            ),
+            user,
+        ).order_by("-updated_at")[:10]
 
         contacts = []
         contact_ids = set()
 
         for thread in recent_threads:
-            # Find the other participant
-            other_participants = thread.participants.exclude(id=user.id)
-            if not other_participants.exists():
+            # Find the other participant among the prefetched ones
+            other_participants = sorted(
+                (p for p in thread.participants.all() if p.id != user.id),
+                key=lambda p: p.id,
+            )
+            if not other_participants:
                 continue
 
-            other_user = other_participants.first()
+            other_user = other_participants[0]
 
             # Skip if already added
             if other_user.id in contact_ids:
                 continue
 
-            # Get unread count for this contact
-            unread_count = Message.objects.filter(
-                thread_last_message=thread, receiver=user, is_read=False
-            ).count()
+            unread_count = thread.unread_messages
 
             contact_data = {
                 "id": other_user.id,
@@ -1242,7 +1230,10 @@ class MessageThreadViewSet(viewsets.ModelViewSet):
         unread_messages = messages.filter(receiver=request.user, is_read=False)
 
         if unread_messages.exists():
-            unread_messages.update(is_read=True, read_at=timezone.now())
+            updated_count = unread_messages.update(is_read=True, read_at=timezone.now())
+            counters.adjust_unread_count(
+                counters.MESSAGES, request.user.id, -updated_count
+            )
 
         page = self.paginate_queryset(messages)
         if page is not None:
@@ -1323,6 +1314,7 @@ class MessageThreadViewSet(viewsets.ModelViewSet):
         )
 
         updated_count = messages.update(is_read=True, read_at=timezone.now())
+        counters.adjust_unread_count(counters.MESSAGES, request.user.id, -updated_count)
 
         return Response(
             {
@@ -1579,6 +1571,9 @@ class BulkMessageView(generics.GenericAPIView):
             )
 
             updated_count = messages.update(is_read=True, read_at=timezone.now())
+            counters.adjust_unread_count(
+                counters.MESSAGES, request.user.id, -updated_count
+            )
 
             return Response(
                 {
@@ -2108,14 +2103,61 @@ class InquiryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        queryset = self.get_queryset()
+        fields = [
+            'id', 'property__title', 'property__property_type', 'property__listing_type',
+            'user_id', 'user__first_name', 'user__last_name', 'user__email',
+            'full_name', 'email', 'phone',
+            'inquiry_type', 'status', 'priority', 'assigned_to__email',
+            'created_at', 'responded_at', 'contact_preference', 'message',
+            'scheduled_viewing', 'follow_up_date', 'category', 'source', 'tags',
+        ]
+        property_types = exports.choice_labels(Property, 'property_type')
+        listing_types = exports.choice_labels(Property, 'listing_type')
+        labels = {
+            name: exports.choice_labels(Inquiry, name)
+            for name in ('inquiry_type', 'status', 'priority', 'contact_preference', 'category', 'source')
+        }
         
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="inquiries_export_{today}.csv"'
+        def display(row, name):
+            return labels[name].get(row[name], row[name])
         
-        writer = csv.writer(response)
+        def rows():
+            for row in exports.iter_rows(self.get_queryset(), fields):
+                if row['user_id']:
+                    user_name = f"{row['user__first_name']} {row['user__last_name']}"
+                    user_email = row['user__email']
+                else:
+                    user_name = row['full_name'] or 'Anonymous'
+                    user_email = row['email']
+                
+                response_time = 'N/A'
+                if row['responded_at']:
+                    response_time = (row['responded_at'] - row['created_at']).total_seconds() / 3600 or 'N/A'
+                
+                yield [
+                    str(row['id'])[:8],
+                    (row['property__title'] or '')[:50],
+                    property_types.get(row['property__property_type'], row['property__property_type']),
+                    listing_types.get(row['property__listing_type'], row['property__listing_type']),
+                    user_name,
+                    user_email,
+                    row['phone'],
+                    display(row, 'inquiry_type'),
+                    display(row, 'status'),
+                    display(row, 'priority'),
+                    row['assigned_to__email'] or 'Unassigned',
+                    exports.format_datetime(row['created_at']),
+                    exports.format_datetime(row['responded_at'], default='N/A'),
+                    response_time,
+                    display(row, 'contact_preference'),
+                    row['message'][:100],
+                    exports.format_datetime(row['scheduled_viewing'], '%Y-%m-%d %H:%M', 'N/A'),
+                    exports.format_datetime(row['follow_up_date'], '%Y-%m-%d', 'N/A'),
+                    display(row, 'category'),
+                    display(row, 'source'),
+                    ', '.join(row['tags']) if row['tags'] else ''
+                ]
         
-        # Write headers
         headers = [
             'ID', 'Property', 'Property Type', 'Listing Type',
             'User Name', 'User Email', 'User Phone',
@@ -2125,39 +2167,9 @@ class InquiryViewSet(viewsets.ModelViewSet):
             'Scheduled Viewing', 'Follow Up Date',
             'Category', 'Source', 'Tags'
         ]
-        writer.writerow(headers)
-        
-        # Write data
-        for inquiry in queryset:
-            response_time = inquiry.get_response_time_hours() if inquiry.get_response_time_hours() else 'N/A'
-            viewing_time = inquiry.scheduled_viewing.strftime('%Y-%m-%d %H:%M') if inquiry.scheduled_viewing else 'N/A'
-            follow_up = inquiry.follow_up_date.strftime('%Y-%m-%d') if inquiry.follow_up_date else 'N/A'
-            
-            writer.writerow([
-                str(inquiry.id)[:8],
-                inquiry.property.title[:50],
-                inquiry.property.get_property_type_display(),
-                inquiry.property.get_listing_type_display(),
-                inquiry.get_user_display_name(),
-                inquiry.get_user_email_address(),
-                inquiry.phone,
-                inquiry.get_inquiry_type_display(),
-                inquiry.get_status_display(),
-                inquiry.get_priority_display(),
-                inquiry.assigned_to.email if inquiry.assigned_to else 'Unassigned',
-                inquiry.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                inquiry.responded_at.strftime('%Y-%m-%d %H:%M:%S') if inquiry.responded_at else 'N/A',
-                response_time,
-                inquiry.get_contact_preference_display(),
-                inquiry.message[:100],
-                viewing_time,
-                follow_up,
-                inquiry.get_category_display(),
-                inquiry.get_source_display(),
-                ', '.join(inquiry.tags) if inquiry.tags else ''
-            ])
-        
-        return response
+        return exports.streaming_csv_response(
+            f'inquiries_export_{timezone.localdate()}.csv', headers, rows()
+        )
     
     @action(detail=False, methods=['get'])
     def my_inquiries(self, request):
@@ -2283,366 +2295,21 @@ class ComparisonViewSet(viewsets.ViewSet):
             )
 
         try:
-            # Get properties
-            properties = Property.objects.filter(
-                id__in=property_ids, is_active=True
-            ).select_related("city", "sub_city")
-
-            if properties.count() != len(property_ids):
-                return Response(
-                    {"error": "Some properties not found"},
-                    status=status.HTTP_404_NOT_FOUND,
-                )
-
-            # Group properties by listing type
-            sale_properties = [p for p in properties if p.listing_type == "sale"]
-            rent_properties = [p for p in properties if p.listing_type == "rent"]
-
-            # Check if we're mixing rent and sale properties
-            has_mixed_types = len(sale_properties) > 0 and len(rent_properties) > 0
-
-            # Prepare property data with type-specific fields
-            property_data = []
-            for prop in properties:
-                prop_dict = {
-                    "id": prop.id,
-                    "title": prop.title,
-                    "listing_type": prop.listing_type,
-                    "property_type": prop.property_type,
-                    "city": prop.city.name if prop.city else None,
-                    "sub_city": prop.sub_city.name if prop.sub_city else None,
-                    "total_area": prop.total_area,
-                    "bedrooms": prop.bedrooms,
-                    "bathrooms": prop.bathrooms,
-                    "built_year": prop.built_year,
-                    "has_parking": prop.has_parking,
-                    "has_garden": prop.has_garden,
-                    "has_security": prop.has_security,
-                    "has_furniture": prop.has_furniture,
-                    "has_air_conditioning": prop.has_air_conditioning,
-                    "has_elevator": prop.has_elevator,
-                    "is_pet_friendly": prop.is_pet_friendly,
-                    "is_verified": prop.is_verified,
-                    "is_featured": prop.is_featured,
-                    "days_on_market": prop.days_on_market,
-                    "views_count": prop.views_count,
-                }
-
-                # Price fields based on listing type
-                if prop.listing_type == "sale":
-                    prop_dict["price_etb"] = prop.price_etb
-                    prop_dict["monthly_rent"] = None
-                    # Calculate price per sqm for sale
-                    if prop.price_etb and prop.total_area and prop.total_area > 0:
-                        prop_dict["price_per_sqm"] = float(
-                            prop.price_etb / prop.total_area
-                        )
-                    else:
-                        prop_dict["price_per_sqm"] = None
-
-                elif prop.listing_type == "rent":
-                    prop_dict["price_etb"] = None
-                    prop_dict["monthly_rent"] = prop.monthly_rent
-                    # Calculate rent per sqm for rent
-                    if prop.monthly_rent and prop.total_area and prop.total_area > 0:
-                        prop_dict["rent_per_sqm"] = float(
-                            prop.monthly_rent / prop.total_area
-                        )
-                    else:
-                        prop_dict["rent_per_sqm"] = None
-                    # Calculate approximate sale value (annual rent * 15 years)
-                    if prop.monthly_rent:
-                        prop_dict["estimated_sale_value"] = float(
-                            prop.monthly_rent * 12 * 15
-                        )
-                    else:
-                        prop_dict["estimated_sale_value"] = None
-
-                property_data.append(prop_dict)
-
-            # Calculate comparison matrix with type-specific fields
-            # Common fields for all properties
-            common_fields = [
-                "total_area",
-                "bedrooms",
-                "bathrooms",
-                "property_type",
-                "has_parking",
-                "has_garden",
-                "has_security",
-                "has_furniture",
-                "has_air_conditioning",
-                "has_elevator",
-                "is_pet_friendly",
-                "is_verified",
-                "is_featured",
-                "days_on_market",
-            ]
-
-            # Type-specific fields
-            sale_fields = ["price_etb", "price_per_sqm"]
-            rent_fields = ["monthly_rent", "rent_per_sqm", "estimated_sale_value"]
-
-            matrix = {}
-
-            # Add common fields
-            for field in common_fields:
-                matrix[field] = []
-                for prop in properties:
-                    value = getattr(prop, field, None)
-                    matrix[field].append(value)
-
-            # Add location fields
-            matrix["city"] = [
-                prop.city.name if prop.city else None for prop in properties
-            ]
-            matrix["sub_city"] = [
-                prop.sub_city.name if prop.sub_city else None for prop in properties
-            ]
-
-            # Add listing type
-            matrix["listing_type"] = [prop.listing_type for prop in properties]
-
-            # Add sale-specific fields
-            for field in sale_fields:
-                matrix[field] = []
-                for prop in properties:
-                    if prop.listing_type == "sale":
-                        if field == "price_per_sqm":
-                            if (
-                                prop.price_etb
-                                and prop.total_area
-                                and prop.total_area > 0
-                            ):
-                                value = float(prop.price_etb / prop.total_area)
-                            else:
-                                value = None
-                        else:
-                            value = getattr(prop, field, None)
-                    else:
-                        value = None
-                    matrix[field].append(value)
-
-            # Add rent-specific fields
-            for field in rent_fields:
-                matrix[field] = []
-                for prop in properties:
-                    if prop.listing_type == "rent":
-                        if field == "rent_per_sqm":
-                            if (
-                                prop.monthly_rent
-                                and prop.total_area
-                                and prop.total_area > 0
-                            ):
-                                value = float(prop.monthly_rent / prop.total_area)
-                            else:
-                                value = None
-                        elif field == "estimated_sale_value":
-                            if prop.monthly_rent:
-                                value = float(prop.monthly_rent * 12 * 15)
-                            else:
-                                value = None
-                        else:
-                            value = getattr(prop, field, None)
-                    else:
-                        value = None
-                    matrix[field].append(value)
-
-            # Calculate statistics by listing type
-            sale_prices = [p.price_etb for p in sale_properties if p.price_etb]
-            rent_prices = [p.monthly_rent for p in rent_properties if p.monthly_rent]
-            all_areas = [p.total_area for p in properties if p.total_area]
-
-            result = {
-                "properties": property_data,
-                "matrix": matrix,
-                "has_mixed_types": has_mixed_types,
-                "summary": {
-                    "total_properties": len(properties),
-                    "sale_properties_count": len(sale_properties),
-                    "rent_properties_count": len(rent_properties),
-                    "common_stats": {
-                        "area_range": {
-                            "min": min(all_areas) if all_areas else 0,
-                            "max": max(all_areas) if all_areas else 0,
-                            "avg": sum(all_areas) / len(all_areas) if all_areas else 0,
-                        },
-                        "bedroom_range": {
-                            "min": (
-                                min(
-                                    p.bedrooms
-                                    for p in properties
-                                    if p.bedrooms is not None
-                                )
-                                if any(p.bedrooms for p in properties)
-                                else 0
-                            ),
-                            "max": (
-                                max(
-                                    p.bedrooms
-                                    for p in properties
-                                    if p.bedrooms is not None
-                                )
-                                if any(p.bedrooms for p in properties)
-                                else 0
-                            ),
-                            "avg": (
-                                sum(
-                                    p.bedrooms
-                                    for p in properties
-                                    if p.bedrooms is not None
-                                )
-                                / len([p for p in properties if p.bedrooms is not None])
-                                if any(p.bedrooms for p in properties)
-                                else 0
-                            ),
-                        },
-                    },
-                },
-                "comparison_date": timezone.now().isoformat(),
-                "status": "success",
-            }
-
-            # Add sale-specific statistics
-            if sale_prices:
-                result["summary"]["sale_stats"] = {
-                    "price_range": {
-                        "min": min(sale_prices),
-                        "max": max(sale_prices),
-                        "avg": sum(sale_prices) / len(sale_prices),
-                    }
-                }
-
-                # Calculate price per sqm for sale properties
-                sale_price_per_sqm = []
-                for prop in sale_properties:
-                    if prop.price_etb and prop.total_area and prop.total_area > 0:
-                        sale_price_per_sqm.append(
-                            float(prop.price_etb / prop.total_area)
-                        )
-
-                if sale_price_per_sqm:
-                    result["summary"]["sale_stats"]["price_per_sqm_range"] = {
-                        "min": min(sale_price_per_sqm),
-                        "max": max(sale_price_per_sqm),
-                        "avg": sum(sale_price_per_sqm) / len(sale_price_per_sqm),
-                        "best_value": (
-                            min(sale_price_per_sqm) if sale_price_per_sqm else None
-                        ),
-                    }
-
-            # Add rent-specific statistics
-            if rent_prices:
-                result["summary"]["rent_stats"] = {
-                    "rent_range": {
-                        "min": min(rent_prices),
-                        "max": max(rent_prices),
-                        "avg": sum(rent_prices) / len(rent_prices),
-                    }
-                }
-
-                # Calculate rent per sqm for rent properties
-                rent_per_sqm = []
-                for prop in rent_properties:
-                    if prop.monthly_rent and prop.total_area and prop.total_area > 0:
-                        rent_per_sqm.append(float(prop.monthly_rent / prop.total_area))
-
-                if rent_per_sqm:
-                    result["summary"]["rent_stats"]["rent_per_sqm_range"] = {
-                        "min": min(rent_per_sqm),
-                        "max": max(rent_per_sqm),
-                        "avg": sum(rent_per_sqm) / len(rent_per_sqm),
-                    }
-
-                # Calculate yield for rent properties
-                estimated_values = []
-                for prop in rent_properties:
-                    if prop.monthly_rent:
-                        estimated_value = float(prop.monthly_rent * 12 * 15)
-                        estimated_values.append(estimated_value)
-
-                if estimated_values:
-                    result["summary"]["rent_stats"]["estimated_sale_value_range"] = {
-                        "min": min(estimated_values),
-                        "max": max(estimated_values),
-                        "avg": sum(estimated_values) / len(estimated_values),
-                    }
-
-            # Find best values for each type
-            if sale_properties:
-                # Best value for sale (lowest price per sqm)
-                sale_with_price = [
-                    p for p in sale_properties if p.price_etb and p.total_area
-                ]
-                if sale_with_price:
-                    best_sale_value = min(
-                        sale_with_price, key=lambda p: p.price_etb / p.total_area
-                    )
-                    result["summary"]["best_sale_value"] = {
-                        "id": best_sale_value.id,
-                        "title": best_sale_value.title,
-                        "price_per_sqm": float(
-                            best_sale_value.price_etb / best_sale_value.total_area
-                        ),
-                        "total_price": best_sale_value.price_etb,
-                        "area": best_sale_value.total_area,
-                    }
-
-            if rent_properties:
-                # Best value for rent (lowest rent per sqm)
-                rent_with_price = [
-                    p for p in rent_properties if p.monthly_rent and p.total_area
-                ]
-                if rent_with_price:
-                    best_rent_value = min(
-                        rent_with_price, key=lambda p: p.monthly_rent / p.total_area
-                    )
-                    result["summary"]["best_rent_value"] = {
-                        "id": best_rent_value.id,
-                        "title": best_rent_value.title,
-                        "rent_per_sqm": float(
-                            best_rent_value.monthly_rent / best_rent_value.total_area
-                        ),
-                        "monthly_rent": best_rent_value.monthly_rent,
-                        "area": best_rent_value.total_area,
-                    }
+            frame = comparison_engine.load_frame(property_ids)
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "property_ids must be a list of property ids"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-            # Property with most features
-            feature_counts = []
-            for prop in properties:
-                feature_count = sum(
-                    [
-                        1
-                        for field in [
-                            "has_parking",
-                            "has_garden",
-                            "has_security",
-                            "has_furniture",
-                            "has_air_conditioning",
-                            "has_elevator",
-                            "is_pet_friendly",
-                            "is_verified",
-                            "is_featured",
-                        ]
-                        if getattr(prop, field, False)
-                    ]
-                )
-                feature_counts.append((prop, feature_count))
-
-            if feature_counts:
-                most_features_property = max(feature_counts, key=lambda x: x[1])[0]
-                result["summary"]["most_features"] = {
-                    "id": most_features_property.id,
-                    "title": most_features_property.title,
-                    "listing_type": most_features_property.listing_type,
-                    "feature_count": feature_counts[0][1] if feature_counts else 0,
-                }
+        if frame is None:
+            return Response(
+                {"error": "Some properties not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
 
-            # Add warning if mixing rent and sale
-            if has_mixed_types:
-                result["warning"] = (
-                    "You are comparing properties with different listing types (rent vs sale). Some metrics may not be directly comparable."
-                )
+        try:
+            result = comparison_engine.compare_properties(frame)
 
             # Save comparison if user is authenticated
             if request.user.is_authenticated:
@@ -2651,7 +2318,7 @@ class ComparisonViewSet(viewsets.ViewSet):
                         user=request.user,
                         name=f"Comparison {timezone.now().strftime('%Y-%m-%d %H:%M')}",
                     )
-                    comparison.properties.set(properties)
+                    comparison.properties.set(frame.columns["id"])
                     result["comparison_id"] = comparison.id
                     result["save_url"] = f"/api/comparisons/{comparison.id}/"
                 except Exception as save_error:
@@ -2674,13 +2341,20 @@ class ComparisonViewSet(viewsets.ViewSet):
     def find_similar(self, request):
         """Find similar properties for comparison"""
         property_id = request.data.get("property_id")
-        limit = request.data.get("limit", 5)
 
         if not property_id:
             return Response(
                 {"error": "property_id is required"}, status=status.HTTP_400_BAD_REQUEST
             )
 
+        try:
+            limit = int(request.data.get("limit", 5))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = min(max(limit, 1), 50)
+
         try:
             property = Property.objects.get(id=property_id, is_active=True)
         except Property.DoesNotExist:
@@ -2688,17 +2362,17 @@ class ComparisonViewSet(viewsets.ViewSet):
                 {"error": "Property not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
-        similar_properties = EnhancedPropertyComparisonService.find_similar_properties(
+        similar = PropertyComparisonService.find_similar_properties(
             property, limit=limit
         )
 
-        serializer = PropertySerializer(similar_properties, many=True)
+        serializer = PropertySerializer(similar, many=True)
 
         return Response(
             {
                 "base_property": PropertySerializer(property).data,
                 "similar_properties": serializer.data,
-                "count": similar_properties.count(),
+                "count": len(serializer.data),
                 "similarity_criteria": {
                     "property_type": property.property_type,
                     "city": property.city.name if property.city else None,
@@ -2722,7 +2396,10 @@ class ComparisonViewSet(viewsets.ViewSet):
                 status=status.HTTP_401_UNAUTHORIZED
             )
             
-        property_ids = request.data.get("property_ids", [])
+        # Without property_ids, the comparison session is saved
+        property_ids = request.data.get("property_ids") or comparison_sessions.get_property_ids(
+            request.session.session_key
+        )
         name = request.data.get(
             "name", f'Comparison {timezone.now().strftime("%Y-%m-%d")}'
         )
@@ -2810,32 +2487,136 @@ class ComparisonViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=["post"])
     def generate_export(self, request):
-        """Generate exportable comparison data"""
+        """
+        Queue an exportable comparison report, of `property_ids` or of a
+        saved `comparison_id`, and return it right away. Poll report_status
+        and download it once it is completed; an unchanged comparison
+        reuses the report already built.
+        """
         property_ids = request.data.get("property_ids", [])
+        comparison_id = request.data.get("comparison_id")
         format = request.data.get("format", "csv")
 
+        comparison = None
+        if comparison_id:
+            try:
+                comparison = PropertyComparison.objects.get(id=comparison_id, user=request.user)
+            except (PropertyComparison.DoesNotExist, TypeError, ValueError):
+                return Response(
+                    {"error": "Comparison not found"}, status=status.HTTP_404_NOT_FOUND
+                )
+            property_ids = list(comparison.properties.values_list("id", flat=True))
+
         if len(property_ids) < 2:
             return Response(
                 {"error": "At least 2 properties required for export"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        properties = Property.objects.filter(
-            id__in=property_ids, is_active=True
-        ).select_related("city", "sub_city")
+        if format not in comparison_reports.FORMATS:
+            return Response(
+                {"error": f"Unsupported format: {format}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            report, created = comparison_reports.request_report(
+                request.user, property_ids, format, comparison
+            )
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "property_ids must be a list of property ids"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        if format == "csv":
-            return EnhancedPropertyComparisonService.export_to_csv(properties)
-        elif format == "json":
-            return EnhancedPropertyComparisonService.export_to_json(properties)
-        elif format == "pdf":
-            return EnhancedPropertyComparisonService.export_to_pdf(properties)
-        else:
+        if report is None:
+            return Response(
+                {"error": "Some properties not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        serializer = ComparisonReportSerializer(report, context={"request": request})
+        return Response(
+            serializer.data,
+            status=status.HTTP_200_OK if report.status == "completed" else status.HTTP_202_ACCEPTED,
+        )
+
+    @action(detail=True, methods=["get"])
+    def report(self, request, pk=None):
+        """
+        Download the report of a saved comparison (?format=csv|json). The
+        first request queues it and returns the pending report with a 202.
+        """
+        format = request.query_params.get("format", "csv")
+        if format not in comparison_reports.FORMATS:
             return Response(
                 {"error": f"Unsupported format: {format}"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        try:
+            comparison = PropertyComparison.objects.get(id=pk, user=request.user)
+        except (PropertyComparison.DoesNotExist, ValueError):
+            return Response(
+                {"error": "Comparison not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        property_ids = list(comparison.properties.values_list("id", flat=True))
+        report, created = comparison_reports.request_report(
+            request.user, property_ids, format, comparison
+        )
+        if report is None:
+            return Response(
+                {"error": "Some properties of this comparison are no longer available"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        if report.is_available:
+            return self._report_download(request, report)
+
+        serializer = ComparisonReportSerializer(report, context={"request": request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"reports/(?P<report_id>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})",
+        url_name="report-detail",
+    )
+    def report_status(self, request, report_id=None):
+        """Status of a comparison report"""
+        report = get_object_or_404(ComparisonReport, pk=report_id)
+        serializer = ComparisonReportSerializer(report, context={"request": request})
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"reports/(?P<report_id>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})/download",
+        url_name="report-download",
+    )
+    def download_report(self, request, report_id=None):
+        """Download a finished comparison report; supports Range requests"""
+        report = get_object_or_404(ComparisonReport, pk=report_id)
+
+        if not report.is_available:
+            return Response(
+                {
+                    "error": "Report is not available for download",
+                    "status": report.status,
+                },
+                status=status.HTTP_409_CONFLICT if report.status in ("pending", "running") else status.HTTP_404_NOT_FOUND,
+            )
+        return self._report_download(request, report)
+
+    def _report_download(self, request, report):
+        filename = f"comparison_report_{report.created_at.strftime('%Y%m%d_%H%M%S')}.{report.format}"
+        response = exports.file_download_response(
+            request, report.file, filename, comparison_reports.CONTENT_TYPES[report.format]
+        )
+        response["Access-Control-Expose-Headers"] = "Content-Disposition, Content-Range, Accept-Ranges"
+        return response
+
     @action(detail=True, methods=["get"])
     def comparison_history(self, request, pk=None):
         """Get comparison history for a property"""
@@ -2886,17 +2667,21 @@ class ComparisonViewSet(viewsets.ViewSet):
         """Get comparison insights"""
         property_ids = request.data.get("property_ids", [])
 
-        properties = Property.objects.filter(id__in=property_ids)
+        try:
+            frame = comparison_engine.load_frame(property_ids)
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "property_ids must be a list of property ids"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        # Calculate insights
-        insights = {
-            "best_value": self._find_best_value(properties),
-            "price_trends": self._calculate_price_trends(properties),
-            "feature_comparison": self._compare_features(properties),
-            "recommendations": self._generate_recommendations(properties),
-        }
+        if frame is None:
+            return Response(
+                {"error": "Some properties not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
 
-        return Response(insights)
+        return Response(comparison_engine.comparison_insights(frame))
 
     @action(detail=False, methods=["post"])
     def bulk_add(self, request):
@@ -2908,21 +2693,19 @@ class ComparisonViewSet(viewsets.ViewSet):
             request.session.create()
             session_key = request.session.session_key
 
-        comparison_session, created = ComparisonSession.objects.get_or_create(
-            session_id=session_key
+        # Add all properties, up to MAX_PROPERTIES in the session
+        valid_ids = set(
+            Property.objects.filter(id__in=property_ids, is_active=True).values_list("id", flat=True)
+        )
+        before = len(comparison_sessions.get_property_ids(session_key))
+        session_ids = comparison_sessions.add_properties(
+            session_key, [pk for pk in dict.fromkeys(map(int, property_ids)) if pk in valid_ids]
         )
-
-        # Add all properties
-        properties = Property.objects.filter(id__in=property_ids, is_active=True)
-
-        for property in properties:
-            if comparison_session.properties.count() < 10:
-                comparison_session.properties.add(property)
 
         return Response(
             {
-                "added_count": properties.count(),
-                "session_count": comparison_session.properties.count(),
+                "added_count": len(session_ids) - before,
+                "session_count": len(session_ids),
             }
         )
 
@@ -4034,11 +3817,28 @@ class ExportDataView(generics.GenericAPIView):
             )
 
     def export_users(self, request):
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = 'attachment; filename="users_export.csv"'
+        users = self.apply_date_filter(User.objects.all(), request)
+        fields = [
+            "id", "email", "first_name", "last_name", "user_type",
+            "phone_number", "is_active", "is_verified", "created_at",
+        ]
 
-        writer = csv.writer(response)
-        writer.writerow(
+        def rows():
+            for user in exports.iter_rows(users, fields):
+                yield [
+                    user["id"],
+                    user["email"],
+                    user["first_name"],
+                    user["last_name"],
+                    user["user_type"],
+                    user["phone_number"],
+                    "Active" if user["is_active"] else "Inactive",
+                    "Yes" if user["is_verified"] else "No",
+                    exports.format_datetime(user["created_at"]),
+                ]
+
+        return exports.streaming_csv_response(
+            "users_export.csv",
             [
                 "ID",
                 "Email",
@@ -4049,34 +3849,46 @@ class ExportDataView(generics.GenericAPIView):
                 "Status",
                 "Verified",
                 "Created At",
-            ]
+            ],
+            rows(),
         )
 
-        users = User.objects.all().order_by("-created_at")
-        users = self.apply_date_filter(users, request)
-        for user in users:
-            writer.writerow(
-                [
-                    user.id,
-                    user.email,
-                    user.first_name,
-                    user.last_name,
-                    user.user_type,
-                    user.phone_number,
-                    "Active" if user.is_active else "Inactive",
-                    "Yes" if user.is_verified else "No",
-                    user.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                ]
-            )
-
-        return response
-
     def export_properties(self, request):
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = 'attachment; filename="properties_export.csv"'
+        properties = self.apply_date_filter(Property.objects.all(), request)
+        fields = [
+            "id", "title", "property_type", "listing_type", "property_status",
+            "city__name", "sub_city__name", "price_etb", "bedrooms", "bathrooms",
+            "total_area", "is_active", "is_verified", "is_featured",
+            "views_count", "inquiry_count", "created_at",
+        ]
+        property_types = exports.choice_labels(Property, "property_type")
+        listing_types = exports.choice_labels(Property, "listing_type")
+        statuses = exports.choice_labels(Property, "property_status")
+
+        def rows():
+            for prop in exports.iter_rows(properties, fields):
+                yield [
+                    prop["id"],
+                    prop["title"],
+                    property_types.get(prop["property_type"], prop["property_type"]),
+                    listing_types.get(prop["listing_type"], prop["listing_type"]),
+                    statuses.get(prop["property_status"], prop["property_status"]),
+                    prop["city__name"] or "",
+                    prop["sub_city__name"] or "",
+                    prop["price_etb"],
+                    prop["bedrooms"],
+                    prop["bathrooms"],
+                    prop["total_area"],
+                    "Yes" if prop["is_active"] else "No",
+                    "Yes" if prop["is_verified"] else "No",
+                    "Yes" if prop["is_featured"] else "No",
+                    prop["views_count"],
+                    prop["inquiry_count"],
+                    exports.format_datetime(prop["created_at"]),
+                ]
 
-        writer = csv.writer(response)
-        writer.writerow(
+        return exports.streaming_csv_response(
+            "properties_export.csv",
             [
                 "ID",
                 "Title",
@@ -4095,46 +3907,37 @@ class ExportDataView(generics.GenericAPIView):
                 "Views",
                 "Inquiries",
                 "Created At",
-            ]
-        )
-
-        properties = (
-            Property.objects.all()
-            .select_related("city", "sub_city")
-            .order_by("-created_at")
+            ],
+            rows(),
         )
-        properties = self.apply_date_filter(properties, request)
-        for prop in properties:
-            writer.writerow(
-                [
-                    prop.id,
-                    prop.title,
-                    prop.get_property_type_display(),
-                    prop.get_listing_type_display(),
-                    prop.get_property_status_display(),
-                    prop.city.name if prop.city else "",
-                    prop.sub_city.name if prop.sub_city else "",
-                    prop.price_etb,
-                    prop.bedrooms,
-                    prop.bathrooms,
-                    prop.total_area,
-                    "Yes" if prop.is_active else "No",
-                    "Yes" if prop.is_verified else "No",
-                    "Yes" if prop.is_featured else "No",
-                    prop.views_count,
-                    prop.inquiry_count,
-                    prop.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                ]
-            )
-
-        return response
 
     def export_inquiries(self, request):
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = 'attachment; filename="inquiries_export.csv"'
+        inquiries = self.apply_date_filter(Inquiry.objects.all(), request)
+        fields = [
+            "id", "property__title", "user__email", "email", "inquiry_type",
+            "status", "priority", "message", "created_at", "updated_at",
+        ]
+        inquiry_types = exports.choice_labels(Inquiry, "inquiry_type")
+        statuses = exports.choice_labels(Inquiry, "status")
+        priorities = exports.choice_labels(Inquiry, "priority")
+
+        def rows():
+            for inquiry in exports.iter_rows(inquiries, fields):
+                message = inquiry["message"]
+                yield [
+                    inquiry["id"],
+                    inquiry["property__title"] or "",
+                    inquiry["user__email"] or inquiry["email"],
+                    inquiry_types.get(inquiry["inquiry_type"], inquiry["inquiry_type"]),
+                    statuses.get(inquiry["status"], inquiry["status"]),
+                    priorities.get(inquiry["priority"], inquiry["priority"]),
+                    message[:100] + "..." if len(message) > 100 else message,
+                    exports.format_datetime(inquiry["created_at"]),
+                    exports.format_datetime(inquiry["updated_at"]),
+                ]
 
-        writer = csv.writer(response)
-        writer.writerow(
+        return exports.streaming_csv_response(
+            "inquiries_export.csv",
             [
                 "ID",
                 "Property",
@@ -4145,90 +3948,102 @@ class ExportDataView(generics.GenericAPIView):
                 "Message",
                 "Created At",
                 "Last Updated",
-            ]
-        )
-
-        inquiries = (
-            Inquiry.objects.all()
-            .select_related("property", "user")
-            .order_by("-created_at")
+            ],
+            rows(),
         )
-        inquiries = self.apply_date_filter(inquiries, request)
-        for inquiry in inquiries:
-            writer.writerow(
-                [
-                    inquiry.id,
-                    inquiry.property.title if inquiry.property else "",
-                    inquiry.user.email if inquiry.user else inquiry.email,
-                    inquiry.get_inquiry_type_display(),
-                    inquiry.get_status_display(),
-                    inquiry.get_priority_display(),
-                    (
-                        inquiry.message[:100] + "..."
-                        if len(inquiry.message) > 100
-                        else inquiry.message
-                    ),
-                    inquiry.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    (
-                        inquiry.updated_at.strftime("%Y-%m-%d %H:%M:%S")
-                        if inquiry.updated_at
-                        else ""
-                    ),
-                ]
-            )
-
-        return response
 
     def export_audit_logs(self, request):
         """Export audit logs based on your AuditLog model"""
-        response = HttpResponse(content_type="text/csv")
-        response['Content-Disposition'] = 'attachment; filename="audit_logs_export.csv"'
-
-        writer = csv.writer(response)
-        writer.writerow([
-            "ID",
-            "User Email",
-            "User Name",
-            "Action Type",
-            "Model Name",
-            "Object ID",
-            "Object Representation",
-            "IP Address",
-            "User Agent",
-            "Timestamp"
-        ])
-
-    # Get all audit logs
         from .models import AuditLog
-        logs = AuditLog.objects.all().select_related('user').order_by('-created_at')
-        logs = self.apply_date_filter(logs, request)
-    
-        for log in logs:
-            writer.writerow([
-                log.id,
-                log.user.email if log.user else 'System',
-                f"{log.user.first_name} {log.user.last_name}".strip() if log.user else 'System',
-                log.get_action_type_display(),
-                log.model_name,
-                log.object_id,
-                log.object_repr[:100],  # Limit length
-                log.ip_address or '',
-                log.user_agent[:200] if log.user_agent else '',  # Limit length
-                log.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            ])
 
-        return response
+        logs = self.apply_date_filter(AuditLog.objects.all(), request)
+        fields = [
+            "id", "user_id", "user__email", "user__first_name", "user__last_name",
+            "action_type", "model_name", "object_id", "object_repr",
+            "ip_address", "user_agent", "created_at",
+        ]
+        action_types = exports.choice_labels(AuditLog, "action_type")
+
+        def rows():
+            for log in exports.iter_rows(logs, fields):
+                has_user = log["user_id"] is not None
+                yield [
+                    log["id"],
+                    log["user__email"] if has_user else 'System',
+                    exports.full_name(log["user__first_name"], log["user__last_name"]) if has_user else 'System',
+                    action_types.get(log["action_type"], log["action_type"]),
+                    log["model_name"],
+                    log["object_id"],
+                    log["object_repr"][:100],  # Limit length
+                    log["ip_address"] or '',
+                    log["user_agent"][:200] if log["user_agent"] else '',  # Limit length
+                    exports.format_datetime(log["created_at"]),
+                ]
+
+        return exports.streaming_csv_response(
+            "audit_logs_export.csv",
+            [
+                "ID",
+                "User Email",
+                "User Name",
+                "Action Type",
+                "Model Name",
+                "Object ID",
+                "Object Representation",
+                "IP Address",
+                "User Agent",
+                "Timestamp"
+            ],
+            rows(),
+        )
 
     def export_transactions(self, request):
         """Export payment transactions based on your Payment model"""
         try:
-            from subscriptions.models import Payment, PropertyPromotion
-        
+            from subscriptions.models import Payment
+        except ImportError:
             response = HttpResponse(content_type="text/csv")
             response['Content-Disposition'] = 'attachment; filename="transactions_export.csv"'
 
             writer = csv.writer(response)
-            writer.writerow([
+            writer.writerow(['Payment system not available. Install subscriptions app.'])
+        
+            return response
+
+        payments = self.apply_date_filter(Payment.objects.all(), request)
+        fields = [
+            "id", "user_id", "user__email", "user__first_name", "user__last_name",
+            "promotion_id", "promotion__listed_property_id", "promotion__listed_property__title",
+            "promotion__tier__tier_type", "promotion__duration_days",
+            "amount_etb", "payment_method", "status", "transaction_id",
+            "chapa_reference", "paid_at", "created_at",
+        ]
+        statuses = exports.choice_labels(Payment, "status")
+
+        def rows():
+            for payment in exports.iter_rows(payments, fields):
+                has_user = payment["user_id"] is not None
+                has_promotion = payment["promotion_id"] is not None
+                yield [
+                    str(payment["id"]),
+                    payment["user__email"] if has_user else '',
+                    exports.full_name(payment["user__first_name"], payment["user__last_name"]) if has_user else '',
+                    payment["promotion__listed_property_id"] or '',
+                    payment["promotion__listed_property__title"] or '',
+                    payment["promotion__tier__tier_type"] or '',
+                    payment["promotion__duration_days"] if has_promotion else '',
+                    payment["amount_etb"],
+                    payment["payment_method"],
+                    statuses.get(payment["status"], payment["status"]),
+                    payment["transaction_id"] or '',
+                    payment["chapa_reference"] or '',
+                    exports.format_datetime(payment["paid_at"]),
+                    exports.format_datetime(payment["created_at"]),
+                ]
+
+        return exports.streaming_csv_response(
+            "transactions_export.csv",
+            [
                 "Payment ID",
                 "User Email",
                 "User Name",
@@ -4243,42 +4058,9 @@ class ExportDataView(generics.GenericAPIView):
                 "Chapa Reference",
                 "Paid At",
                 "Created At"
-            ])
-
-        # Get all payments
-            payments = Payment.objects.all().select_related(
-                'user', 'promotion', 'promotion__listed_property', 'promotion__tier'
-            ).order_by('-created_at')
-            payments = self.apply_date_filter(payments, request)
-
-            for payment in payments:
-                writer.writerow([
-                    str(payment.id),
-                    payment.user.email if payment.user else '',
-                    f"{payment.user.first_name} {payment.user.last_name}".strip() if payment.user else '',
-                    payment.promotion.listed_property.id if payment.promotion and payment.promotion.listed_property else '',
-                    payment.promotion.listed_property.title if payment.promotion and payment.promotion.listed_property else '',
-                    payment.promotion.tier.tier_type if payment.promotion and payment.promotion.tier else '',
-                    payment.promotion.duration_days if payment.promotion else '',
-                    payment.amount_etb,
-                    payment.payment_method,
-                    payment.get_status_display(),
-                    payment.transaction_id or '',
-                    payment.chapa_reference or '',
-                    payment.paid_at.strftime('%Y-%m-%d %H:%M:%S') if payment.paid_at else '',
-                    payment.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-
-            return response
-
-        except ImportError:
-            response = HttpResponse(content_type="text/csv")
-            response['Content-Disposition'] = 'attachment; filename="transactions_export.csv"'
-
-            writer = csv.writer(response)
-            writer.writerow(['Payment system not available. Install subscriptions app.'])
-        
-            return response
+            ],
+            rows(),
+        )
 
     def export_full_report(self, request):
         """Export comprehensive system report in CSV format"""
@@ -4461,103 +4243,119 @@ class ExportDataView(generics.GenericAPIView):
         """Export property report - SIMPLE WORKING VERSION"""
         from real_estate.models import Property
     
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="property_report.csv"'
-    
-        writer = csv.writer(response)
-    
-    # Write headers
-        writer.writerow([
-        'ID', 'Title', 'Type', 'Listing Type', 'Status',
-        'City', 'Sub City', 'Price (ETB)', 'Monthly Rent (ETB)',
-        'Bedrooms', 'Bathrooms', 'Area (m²)', 'Built Year',
-        'Active', 'Verified', 'Featured', 'Promoted',
-        'Views', 'Inquiries', 'Days on Market',
-        'Owner Email', 'Owner Name', 'Created At', 'Updated At'
-       ])
+        properties = self.apply_date_filter(Property.objects.all(), request)
+        fields = [
+            'id', 'title', 'property_type', 'listing_type', 'property_status',
+            'city__name', 'sub_city__name', 'price_etb', 'monthly_rent',
+            'bedrooms', 'bathrooms', 'total_area', 'built_year',
+            'is_active', 'is_verified', 'is_featured', 'is_promoted',
+            'views_count', 'inquiry_count', 'listed_date',
+            'owner_id', 'owner__email', 'owner__first_name', 'owner__last_name',
+            'created_at', 'updated_at',
+        ]
+        property_types = exports.choice_labels(Property, 'property_type')
+        listing_types = exports.choice_labels(Property, 'listing_type')
+        statuses = exports.choice_labels(Property, 'property_status')
+        now = timezone.now()
     
-    # Write data
-        properties = Property.objects.all().select_related('city', 'sub_city', 'owner').order_by('-created_at')
-        properties = self.apply_date_filter(properties, request)
-        for prop in properties:
-            writer.writerow([
-                prop.id,
-                prop.title,
-                prop.get_property_type_display(),
-                prop.get_listing_type_display(),
-                prop.get_property_status_display(),
-                prop.city.name if prop.city else '',
-                prop.sub_city.name if prop.sub_city else '',
-                prop.price_etb or '',
-                prop.monthly_rent or '',
-                prop.bedrooms or '',
-                prop.bathrooms or '',
-                prop.total_area or '',
-                prop.built_year or '',
-                'Yes' if prop.is_active else 'No',
-                'Yes' if prop.is_verified else 'No',
-                'Yes' if prop.is_featured else 'No',
-                'Yes' if prop.is_promoted else 'No',
-                prop.views_count,
-                prop.inquiry_count,
-                prop.days_on_market,
-                prop.owner.email if prop.owner else '',
-                f"{prop.owner.first_name} {prop.owner.last_name}".strip() if prop.owner else '',
-                prop.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                prop.updated_at.strftime('%Y-%m-%d %H:%M:%S') if prop.updated_at else ''
-            ])
+        def rows():
+            for prop in exports.iter_rows(properties, fields):
+                has_owner = prop['owner_id'] is not None
+                yield [
+                    prop['id'],
+                    prop['title'],
+                    property_types.get(prop['property_type'], prop['property_type']),
+                    listing_types.get(prop['listing_type'], prop['listing_type']),
+                    statuses.get(prop['property_status'], prop['property_status']),
+                    prop['city__name'] or '',
+                    prop['sub_city__name'] or '',
+                    prop['price_etb'] or '',
+                    prop['monthly_rent'] or '',
+                    prop['bedrooms'] or '',
+                    prop['bathrooms'] or '',
+                    prop['total_area'] or '',
+                    prop['built_year'] or '',
+                    'Yes' if prop['is_active'] else 'No',
+                    'Yes' if prop['is_verified'] else 'No',
+                    'Yes' if prop['is_featured'] else 'No',
+                    'Yes' if prop['is_promoted'] else 'No',
+                    prop['views_count'],
+                    prop['inquiry_count'],
+                    (now - prop['listed_date']).days if prop['listed_date'] else 0,
+                    prop['owner__email'] if has_owner else '',
+                    exports.full_name(prop['owner__first_name'], prop['owner__last_name']) if has_owner else '',
+                    exports.format_datetime(prop['created_at']),
+                    exports.format_datetime(prop['updated_at']),
+                ]
     
-        return response
+        return exports.streaming_csv_response('property_report.csv', [
+            'ID', 'Title', 'Type', 'Listing Type', 'Status',
+            'City', 'Sub City', 'Price (ETB)', 'Monthly Rent (ETB)',
+            'Bedrooms', 'Bathrooms', 'Area (m²)', 'Built Year',
+            'Active', 'Verified', 'Featured', 'Promoted',
+            'Views', 'Inquiries', 'Days on Market',
+            'Owner Email', 'Owner Name', 'Created At', 'Updated At'
+        ], rows())
 
     def export_inquiry_report(self, request):
         """Export inquiry report - SIMPLE WORKING VERSION"""
-        from real_estate.models import Inquiry
+        from real_estate.models import Inquiry, Property
     
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="inquiry_report.csv"'
+        inquiries = self.apply_date_filter(Inquiry.objects.all(), request)
+        fields = [
+            'id', 'property_id', 'property__title', 'property__property_type',
+            'user_id', 'user__email', 'user__first_name', 'user__last_name',
+            'inquiry_type', 'status', 'priority', 'full_name', 'email', 'phone',
+            'message', 'assigned_to__email', 'response_sent',
+            'created_at', 'responded_at', 'follow_up_date',
+            'scheduled_viewing', 'viewing_address', 'source', 'category',
+        ]
+        property_types = exports.choice_labels(Property, 'property_type')
+        labels = {
+            name: exports.choice_labels(Inquiry, name)
+            for name in ('inquiry_type', 'status', 'priority', 'source', 'category')
+        }
     
-        writer = csv.writer(response)
+        def display(row, name):
+            return labels[name].get(row[name], row[name])
+    
+        def rows():
+            for inquiry in exports.iter_rows(inquiries, fields):
+                has_user = inquiry['user_id'] is not None
+                message = inquiry['message']
+                yield [
+                    inquiry['id'],
+                    inquiry['property_id'] or '',
+                    inquiry['property__title'] or '',
+                    property_types.get(inquiry['property__property_type'], inquiry['property__property_type'] or ''),
+                    inquiry['user__email'] if has_user else '',
+                    exports.full_name(inquiry['user__first_name'], inquiry['user__last_name']) if has_user else '',
+                    display(inquiry, 'inquiry_type'),
+                    display(inquiry, 'status'),
+                    display(inquiry, 'priority'),
+                    inquiry['full_name'] or '',
+                    inquiry['email'] or '',
+                    inquiry['phone'] or '',
+                    message[:200] + '...' if len(message) > 200 else message,
+                    inquiry['assigned_to__email'] or '',
+                    'Yes' if inquiry['response_sent'] else 'No',
+                    exports.format_datetime(inquiry['created_at']),
+                    exports.format_datetime(inquiry['responded_at']),
+                    exports.format_datetime(inquiry['follow_up_date'], '%Y-%m-%d'),
+                    exports.format_datetime(inquiry['scheduled_viewing'], '%Y-%m-%d %H:%M'),
+                    inquiry['viewing_address'] or '',
+                    display(inquiry, 'source'),
+                    display(inquiry, 'category'),
+                ]
     
-     # Write headers
-        writer.writerow([
+        return exports.streaming_csv_response('inquiry_report.csv', [
             'ID', 'Property ID', 'Property Title', 'Property Type',
             'User Email', 'User Name', 'Inquiry Type', 'Status',
             'Priority', 'Full Name', 'Email', 'Phone',
             'Message', 'Assigned To', 'Response Sent',
             'Created At', 'Responded At', 'Follow Up Date',
             'Scheduled Viewing', 'Viewing Address', 'Source', 'Category'
-        ])
-    
-    # Write data
-        inquiries = Inquiry.objects.all().select_related('property', 'user', 'assigned_to').order_by('-created_at')
-        inquiries = self.apply_date_filter(inquiries, request)
-        for inquiry in inquiries:
-            writer.writerow([
-                inquiry.id,
-                inquiry.property.id if inquiry.property else '',
-                inquiry.property.title if inquiry.property else '',
-                inquiry.property.get_property_type_display() if inquiry.property else '',
-                inquiry.user.email if inquiry.user else '',
-                f"{inquiry.user.first_name} {inquiry.user.last_name}".strip() if inquiry.user else '',
-                inquiry.get_inquiry_type_display(),
-                inquiry.get_status_display(),
-                inquiry.get_priority_display(),
-                inquiry.full_name or '',
-                inquiry.email or '',
-                inquiry.phone or '',
-                inquiry.message[:200] + '...' if len(inquiry.message) > 200 else inquiry.message,
-                inquiry.assigned_to.email if inquiry.assigned_to else '',
-                'Yes' if inquiry.response_sent else 'No',
-                inquiry.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                inquiry.responded_at.strftime('%Y-%m-%d %H:%M:%S') if inquiry.responded_at else '',
-                inquiry.follow_up_date.strftime('%Y-%m-%d') if inquiry.follow_up_date else '',
-                inquiry.scheduled_viewing.strftime('%Y-%m-%d %H:%M') if inquiry.scheduled_viewing else '',
-                inquiry.viewing_address or '',
-                inquiry.get_source_display(),
-                inquiry.get_category_display()
-            ])
-    
-        return response
+        ], rows())
 
     def export_revenue_report(self, request):
         """Export revenue report - SIMPLE WORKING VERSION"""
@@ -5024,225 +4822,70 @@ from rest_framework.views import APIView  # Add this import
 
 class BatchExportView(APIView): 
     """
-    Batch export view that properly handles POST requests
-    Uses APIView instead of GenericAPIView to avoid serializer requirement
+    Batch export of several reports into one ZIP.
+
+    POST records an ExportJob and returns it right away; the ZIP is built in
+    the background (see api/export_jobs.py). Poll ExportJobDetailView for
+    progress and download from ExportJobDownloadView once it is completed.
+    The same export requested again on the same day reuses the existing job.
     """
     permission_classes = [IsAuthenticated, IsAdminUser]
     
     def post(self, request):
-        """Handle batch export POST request"""
-        try:
-            print("=" * 50)
-            print("BATCH EXPORT REQUEST RECEIVED")
-            print("=" * 50)
-            print(f"Request method: {request.method}")
-            print(f"Content-Type: {request.content_type}")
-            print(f"Headers: {dict(request.headers)}")
-            print(f"User: {request.user.email if request.user else 'Anonymous'}")
-            print(f"Data type: {type(request.data)}")
-            print(f"Raw data: {request.data}")
-            print("=" * 50)
-            
-            # Debug: Log the full request
-            import json
-            print("Request body as JSON:", json.dumps(dict(request.data), indent=2))
-            
-            # Get data from request
-            report_types = request.data.get('report_types', [])
-            format_type = request.data.get('format', 'csv')
-            
-            print(f"Extracted report_types: {report_types}")
-            print(f"Extracted format: {format_type}")
-            
-            if not report_types:
-                print("ERROR: No report types specified")
-                return Response(
-                    {"error": "No report types specified"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # If report_types is a string, convert to list
-            if isinstance(report_types, str):
-                print(f"report_types is string, converting: {report_types}")
-                try:
-                    # Try to parse as JSON string
-                    import json
-                    report_types = json.loads(report_types)
-                    print(f"Parsed as JSON: {report_types}")
-                except json.JSONDecodeError:
-                    # If not JSON, split by comma
-                    report_types = [rt.strip() for rt in report_types.split(',')]
-                    print(f"Split by comma: {report_types}")
-            
-            print(f"Final report types list: {report_types}")
-            
-            # Validate report types
-            valid_report_types = [
-                'user_report', 'property_report', 'inquiry_report', 
-                'revenue_report', 'performance_report', 'market_report',
-                'activity_report', 'comprehensive_report',
-                'users', 'properties', 'inquiries', 'audit-logs', 'transactions'
-            ]
-            
-            invalid_types = [rt for rt in report_types if rt not in valid_report_types]
-            if invalid_types:
+        """Queue a batch export"""
+        report_types = request.data.get('report_types', [])
+        format_type = request.data.get('format', 'csv')
+        
+        if not report_types:
+            return Response(
+                {"error": "No report types specified"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # If report_types is a string, convert to list
+        if isinstance(report_types, str):
+            try:
+                report_types = json.loads(report_types)
+            except json.JSONDecodeError:
+                report_types = [rt.strip() for rt in report_types.split(',')]
+        
+        invalid_types = [rt for rt in report_types if rt not in export_jobs.REPORT_TYPES]
+        if invalid_types:
+            return Response(
+                {"error": f"Invalid report types: {', '.join(invalid_types)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        filters = {}
+        for name in export_jobs.FILTER_FIELDS:
+            value = request.data.get(name)
+            if not value:
+                continue
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except (TypeError, ValueError):
                 return Response(
-                    {"error": f"Invalid report types: {', '.join(invalid_types)}"},
+                    {"error": f"Invalid {name}. Use YYYY-MM-DD"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            
-            # Create zip file in memory
-            import zipfile
-            from io import BytesIO
-            
-            zip_buffer = BytesIO()
-            
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                for report_type in report_types:
-                    try:
-                        print(f"Processing report type: {report_type}")
-                        
-                        # Generate CSV content
-                        csv_content = self.generate_csv_for_report(report_type)
-                        
-                        # Add file to zip
-                        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-                        filename = f"{report_type}_{timestamp}.csv"
-                        zip_file.writestr(filename, csv_content)
-                        
-                        print(f"Added {filename} to zip")
-                        
-                    except Exception as e:
-                        print(f"Error generating {report_type} report: {str(e)}")
-                        import traceback
-                        traceback.print_exc()
-                        # Add error file to zip
-                        error_content = f"Error generating {report_type}: {str(e)[:200]}"
-                        zip_file.writestr(f"ERROR_{report_type}.txt", error_content)
-            
-            zip_buffer.seek(0)
-            
-            # Create HTTP response with proper headers
-            response = HttpResponse(
-                zip_buffer.getvalue(), 
-                content_type='application/zip'
+            filters[name] = value
+        
+        try:
+            job, created = export_jobs.create_export_job(
+                request.user, report_types, filters, format_type
             )
-            response['Content-Disposition'] = f'attachment; filename="reports_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.zip"'
-            response['Access-Control-Expose-Headers'] = 'Content-Disposition'
-            
-            print(f"Batch export completed. Zip size: {len(zip_buffer.getvalue())} bytes")
-            
-            return response
-            
         except Exception as e:
-            print(f"Batch export failed: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error(f"Batch export failed: {str(e)}", exc_info=True)
             return Response(
                 {"error": f"Batch export failed: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-    
-    def generate_csv_for_report(self, report_type):
-        """Generate CSV content for different report types"""
-        from io import StringIO
-        import csv
-        from django.contrib.auth import get_user_model
-        
-        csv_buffer = StringIO()
-        writer = csv.writer(csv_buffer)
-        
-        User = get_user_model()
-        
-        # Add headers based on report type
-        if report_type == 'user_report' or report_type == 'users':
-            writer.writerow(['User Report', f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'])
-            writer.writerow(['Metric', 'Value'])
-            writer.writerow(['Total Users', User.objects.count()])
-            writer.writerow(['Active Users', User.objects.filter(is_active=True).count()])
-            writer.writerow(['Verified Users', User.objects.filter(is_verified=True).count()])
-            writer.writerow(['Premium Users', User.objects.filter(is_premium=True).count()])
-            
-        elif report_type == 'property_report' or report_type == 'properties':
-            writer.writerow(['Property Report', f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'])
-            writer.writerow(['Metric', 'Value'])
-            from real_estate.models import Property
-            writer.writerow(['Total Properties', Property.objects.count()])
-            writer.writerow(['Active Properties', Property.objects.filter(is_active=True).count()])
-            writer.writerow(['Featured Properties', Property.objects.filter(is_featured=True).count()])
-            writer.writerow(['Verified Properties', Property.objects.filter(is_verified=True).count()])
-            
-        elif report_type == 'inquiry_report' or report_type == 'inquiries':
-            writer.writerow(['Inquiry Report', f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'])
-            writer.writerow(['Metric', 'Value'])
-            from real_estate.models import Inquiry
-            writer.writerow(['Total Inquiries', Inquiry.objects.count()])
-            writer.writerow(['Pending Inquiries', Inquiry.objects.filter(status='pending').count()])
-            writer.writerow(['Closed Inquiries', Inquiry.objects.filter(status='closed').count()])
-            writer.writerow(['Assigned Inquiries', Inquiry.objects.filter(assigned_to__isnull=False).count()])
-            
-        elif report_type == 'audit-logs':
-            writer.writerow(['Audit Logs Report', f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'])
-            writer.writerow(['Metric', 'Value'])
-            try:
-                from .models import AuditLog
-                writer.writerow(['Total Audit Logs', AuditLog.objects.count()])
-                writer.writerow(['Logs Today', AuditLog.objects.filter(created_at__date=timezone.now().date()).count()])
-                writer.writerow(['Logs This Week', AuditLog.objects.filter(created_at__gte=timezone.now() - timedelta(days=7)).count()])
-            except:
-                writer.writerow(['Audit Logs', 'Not available'])
-            
-        elif report_type == 'transactions':
-            writer.writerow(['Transactions Report', f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'])
-            writer.writerow(['Metric', 'Value'])
-            try:
-                from subscriptions.models import Payment
-                writer.writerow(['Total Transactions', Payment.objects.count()])
-                writer.writerow(['Completed Transactions', Payment.objects.filter(status='completed').count()])
-                writer.writerow(['Pending Transactions', Payment.objects.filter(status='pending').count()])
-                writer.writerow(['Total Revenue', Payment.objects.filter(status='completed').aggregate(Sum('amount_etb'))['amount_etb__sum'] or 0])
-            except:
-                writer.writerow(['Transactions', 'Not available'])
-            
-        elif report_type == 'revenue_report':
-            writer.writerow(['Revenue Report', f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'])
-            writer.writerow(['Metric', 'Value'])
-            writer.writerow(['Report Type', 'Revenue Analytics'])
-            writer.writerow(['Status', 'Generated successfully'])
-            
-        elif report_type == 'performance_report':
-            writer.writerow(['Performance Report', f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'])
-            writer.writerow(['Metric', 'Value'])
-            writer.writerow(['Report Type', 'Performance Analytics'])
-            writer.writerow(['Status', 'Generated successfully'])
-            
-        elif report_type == 'market_report':
-            writer.writerow(['Market Report', f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'])
-            writer.writerow(['Metric', 'Value'])
-            writer.writerow(['Report Type', 'Market Analytics'])
-            writer.writerow(['Status', 'Generated successfully'])
-            
-        elif report_type == 'activity_report':
-            writer.writerow(['Activity Report', f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'])
-            writer.writerow(['Metric', 'Value'])
-            writer.writerow(['Report Type', 'Activity Analytics'])
-            writer.writerow(['Status', 'Generated successfully'])
-            
-        elif report_type == 'comprehensive_report':
-            writer.writerow(['Comprehensive Report', f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'])
-            writer.writerow(['Metric', 'Value'])
-            writer.writerow(['Total Users', User.objects.count()])
-            writer.writerow(['Total Properties', 'See property report for details'])
-            writer.writerow(['Total Inquiries', 'See inquiry report for details'])
-            writer.writerow(['Report Type', 'Comprehensive Analytics'])
-            
-        else:
-            # Default for other report types
-            writer.writerow([f'{report_type.replace("_", " ").title()} Report'])
-            writer.writerow([f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'])
-            writer.writerow(['Status', 'Generated successfully'])
         
-        return csv_buffer.getvalue()
+        serializer = ExportJobSerializer(job, context={'request': request})
+        return Response(
+            serializer.data,
+            status=status.HTTP_200_OK if job.status == 'completed' else status.HTTP_202_ACCEPTED
+        )
     
     def options(self, request, *args, **kwargs):
         """Handle OPTIONS request for CORS"""
@@ -5253,6 +4896,37 @@ class BatchExportView(APIView):
         response['Access-Control-Allow-Origin'] = '*'
         return response
 
+
+class ExportJobDetailView(generics.RetrieveAPIView):
+    """Status and progress of a batch export job"""
+    queryset = ExportJob.objects.all()
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
+class ExportJobDownloadView(APIView):
+    """Download the ZIP of a finished export job; supports Range requests"""
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get(self, request, pk):
+        job = get_object_or_404(ExportJob, pk=pk)
+        
+        if not job.is_available:
+            return Response(
+                {
+                    "error": "Export is not available for download",
+                    "status": job.status,
+                    "progress": job.progress,
+                },
+                status=status.HTTP_409_CONFLICT if job.status in ('pending', 'running') else status.HTTP_404_NOT_FOUND
+            )
+        
+        filename = f"reports_export_{job.created_at.strftime('%Y%m%d_%H%M%S')}.zip"
+        response = exports.file_download_response(request, job.file, filename, 'application/zip')
+        response['Access-Control-Expose-Headers'] = 'Content-Disposition, Content-Range, Accept-Ranges'
+        return response
+
+
 # Update the NotificationViewSet
 class NotificationViewSet(viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
@@ -5289,9 +4963,9 @@ class NotificationViewSet(viewsets.ModelViewSet):
         if not request.user.is_authenticated:
             return Response({"unread_count": 0, "user_id": None})
 
-        unread_count = Notification.objects.filter(
-            user=request.user, is_read=False
-        ).count()
+        unread_count = counters.get_unread_count(
+            counters.NOTIFICATIONS, request.user.id
+        )
         return Response({
             "unread_count": unread_count,
             "user_id": request.user.id,
@@ -5304,6 +4978,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
         updated = Notification.objects.filter(
             user=request.user, is_read=False
         ).update(is_read=True, read_at=timezone.now())
+        counters.adjust_unread_count(counters.NOTIFICATIONS, request.user.id, -updated)
         return Response({
             "marked_read": updated,
             "message": f"Marked {updated} notifications as read"
@@ -5324,6 +4999,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
             notification.is_read = True
             notification.read_at = timezone.now()
             notification.save()
+            counters.adjust_unread_count(counters.NOTIFICATIONS, request.user.id, -1)
             return Response({
                 "status": "success",
                 "message": "Notification marked as read",
@@ -5372,9 +5048,9 @@ class UnreadNotificationCountView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        unread_count = Notification.objects.filter(
-            user=request.user, is_read=False
-        ).count()
+        unread_count = counters.get_unread_count(
+            counters.NOTIFICATIONS, request.user.id
+        )
         return Response({"unread_count": unread_count})
 
 class NotificationPreferenceView(generics.GenericAPIView):
@@ -5812,6 +5488,20 @@ class AuditLogSearchView(APIView):
         order_by = data.get('order_by', '-created_at')
         queryset = queryset.order_by(order_by)
         
+        # Keyset pagination (opt-in): no OFFSET scan and no COUNT(*)
+        if data.get('cursor') or data.get('pagination') == 'cursor':
+            page_size = int(data.get('page_size', 50))
+            page = keyset_page(queryset, data.get('cursor'), page_size)
+            serializer = AuditLogSerializer(page.items, many=True)
+            
+            return Response({
+                'next_cursor': page.next_cursor,
+                'previous_cursor': page.previous_cursor,
+                'page_size': page_size,
+                'results': serializer.data,
+                'filters_applied': data
+            })
+        
         # Pagination
         page = int(data.get('page', 1))
         page_size = int(data.get('page_size', 50))
@@ -5910,6 +5600,8 @@ class AuditLogSystemView(APIView):
                 'ip_distribution': list(ip_distribution),
             },
             'system_health': system_health,
+            'audit_pipeline': audit_buffer.stats(),
+            'valuation_history_pipeline': valuation_buffer.stats(),
             'alerts': self.get_system_alerts(),
         })
     
@@ -6277,10 +5969,7 @@ class SimpleMessageViewSet(viewsets.ModelViewSet):
     def unread_count(self, request):
         """Get count of unread messages"""
         try:
-            count = Message.objects.filter(
-                receiver=request.user,
-                is_read=False
-            ).count()
+            count = counters.get_unread_count(counters.MESSAGES, request.user.id)
             return Response({'unread_count': count})
         except Exception as e:
             logger.error(f"Error getting unread count: {str(e)}")
@@ -6296,6 +5985,7 @@ class SimpleMessageViewSet(viewsets.ModelViewSet):
                 message.is_read = True
                 message.read_at = timezone.now()
                 message.save(update_fields=['is_read', 'read_at'])
+                counters.adjust_unread_count(counters.MESSAGES, request.user.id, -1)
                 return Response({'status': 'Message marked as read'})
             
             return Response({'status': 'Already read or not your message'})
@@ -6358,7 +6048,8 @@ class SimpleThreadViewSet(viewsets.ModelViewSet):
         unread_messages = messages.filter(
             receiver=request.user, is_read=False
         )
-        unread_messages.update(is_read=True, read_at=timezone.now())
+        updated_count = unread_messages.update(is_read=True, read_at=timezone.now())
+        counters.adjust_unread_count(counters.MESSAGES, request.user.id, -updated_count)
         
         serializer = SimpleMessageSerializer(
             messages, many=True, context={'request': request}
@@ -5,7 +5,7 @@ from django.utils.translation import gettext_lazy as _
 from .models import (
     City, SubCity, Amenity, Property, PropertyImage, 
     PropertyDocument, SavedSearch, TrackedProperty, Inquiry, 
-    PropertyView, PropertyComparison, ComparisonSession, Message, MessageThread
+    PropertyView, PropertyComparison, ComparisonReport, ComparisonSession, Message, MessageThread
 )
 
 @admin.register(City)
@@ -309,6 +309,16 @@ class PropertyComparisonAdmin(admin.ModelAdmin):
         }),
     )
 
+@admin.register(ComparisonReport)
+class ComparisonReportAdmin(admin.ModelAdmin):
+    list_display = ('id', 'requested_by', 'comparison', 'format', 'status', 'file_size',
+                   'created_at', 'completed_at', 'expires_at')
+    list_filter = ('status', 'format')
+    search_fields = ('id', 'requested_by__email', 'cache_key')
+    readonly_fields = ('cache_key', 'property_ids', 'file_size', 'started_at',
+                      'completed_at', 'created_at')
+    list_per_page = 50
+
 @admin.register(ComparisonSession)
 class ComparisonSessionAdmin(admin.ModelAdmin):
     list_display = ('session_id', 'property_count', 'created_at', 'last_accessed')
@@ -8,10 +8,35 @@ from django.utils import timezone
 class PropertyComparisonService:
     
     @staticmethod
-    def calculate_comprehensive_score(property, properties_list, criteria=None):
-        """Calculate comprehensive score with multiple factors"""
+    def comparables(properties_list):
+        """
+        Figures of `properties_list` that every score compares against,
+        computed in one pass so scoring the whole list stays linear
+        """
+        price_per_sqm = {}
+        for p in properties_list:
+            if p.price_etb and p.total_area:
+                price_per_sqm[p.pk] = p.price_etb / p.total_area
+        values = list(price_per_sqm.values())
+        return {
+            'price_per_sqm': price_per_sqm,
+            'total': sum(values),
+            'lowest': sorted(price_per_sqm.items(), key=lambda item: item[1])[:2],
+            'max_features': max((len(p.key_features) for p in properties_list), default=0),
+        }
+
+    @staticmethod
+    def calculate_comprehensive_score(property, properties_list, criteria=None, comparables=None):
+        """
+        Calculate comprehensive score with multiple factors.
+
+        Pass the comparables() of `properties_list` when scoring several
+        properties of the same list.
+        """
         if criteria is None:
             criteria = {}
+        if comparables is None:
+            comparables = PropertyComparisonService.comparables(properties_list)
     
         # If no comparison properties, we cannot compute a meaningful score
         if len(properties_list) == 0:
@@ -47,14 +72,15 @@ class PropertyComparisonService:
         # === Price Value (requires comparison) ===
         if property.price_etb and property.total_area:
             price_per_sqm = property.price_etb / property.total_area
-            all_prices = [
-                p.price_etb / p.total_area for p in properties_list
-                if p.price_etb and p.total_area and p != property  # exclude self if included
-            ]
-        
-            if all_prices:  # only if we have valid comparables
-                avg_price_sqm = sum(all_prices) / len(all_prices)
-                min_price_sqm = min(all_prices)
+            # Exclude self if included
+            own = comparables['price_per_sqm'].get(property.pk)
+            others = len(comparables['price_per_sqm']) - (own is not None)
+        
+            if others:  # only if we have valid comparables
+                avg_price_sqm = (comparables['total'] - (own or 0)) / others
+                min_price_sqm = next(
+                    value for pk, value in comparables['lowest'] if pk != property.pk
+                )
             
                 if price_per_sqm <= min_price_sqm:
                     scores['price_value'] = 100
@@ -67,8 +93,7 @@ class PropertyComparisonService:
 
         # === Features ===
         property_features = property.key_features or []
-        all_features = [getattr(p, 'key_features', []) or [] for p in properties_list]
-        max_features = max(len(feats) for feats in all_features) if all_features else 0
+        max_features = comparables['max_features']
     
         if max_features > 0:
             scores['features'] = (len(property_features) / max_features) * 100
@@ -158,10 +183,11 @@ class PropertyComparisonService:
         }
         
         # Calculate scores for each property
+        comparables = PropertyComparisonService.comparables(properties)
         for prop in properties:
             report['property_scores'][prop.id] = {
                 'scores': PropertyComparisonService.calculate_comprehensive_score(
-                    prop, properties, criteria
+                    prop, properties, criteria, comparables
                 ),
                 'key_strengths': [],
                 'key_weaknesses': []
@@ -784,6 +810,13 @@ class PropertyComparisonService:
     def find_similar_properties(property, limit=5, include_current=False):
         """Find similar properties for comparison"""
         from .models import Property
+        from .similarity import similar_properties as indexed_similar
+        
+        if not include_current:
+            # Precomputed neighbours; scored below only until it is indexed
+            indexed = indexed_similar(property.id, limit=limit)
+            if indexed:
+                return indexed
         
         # Build similarity query
         similar_properties = Property.objects.filter(
@@ -0,0 +1,356 @@
+"""
+Columnar property comparison.
+
+ComparisonViewSet.compare used to walk the selected Property instances
+once per matrix field and again for every summary statistic, dividing
+price by area and counting features over and over, and matched listing
+types against "sale"/"rent" so the sale and rent figures were never
+filled in. A comparison is now built from a ComparisonFrame: the selected
+rows are read once with values() and kept column by column, and every
+derived column (price and rent per m², estimated sale value, gross yield,
+feature count, days on market, ranks) is computed once over the whole
+column. The matrix, the summary and the insights are slices of those
+columns.
+
+Frames are cached per sorted id tuple and the updated_at of every
+selected property, so editing one of them gives a fresh comparison while
+repeating the same one (compare, then insights) costs a single small
+query. Counters updated without a save (views) may lag by at most
+COMPARISON_CACHE_TTL.
+
+NumPy is not a dependency, so the columns are plain lists.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from api import cache as api_cache
+
+logger = logging.getLogger(__name__)
+
+SALE = "for_sale"
+RENT = "for_rent"
+
+# Annual rent is worth this many years of a sale price
+YEARS_OF_RENT = 15
+
+# Counted by feature_count (and by "most features")
+FEATURE_FIELDS = (
+    "has_parking", "has_garden", "has_security", "has_furniture",
+    "has_air_conditioning", "has_elevator", "is_pet_friendly",
+    "is_verified", "is_featured",
+)
+# Shown for every property, in this order
+COMMON_FIELDS = (
+    "total_area", "bedrooms", "bathrooms", "property_type",
+    "has_parking", "has_garden", "has_security", "has_furniture",
+    "has_air_conditioning", "has_elevator", "is_pet_friendly",
+    "is_verified", "is_featured", "days_on_market",
+)
+SALE_FIELDS = ("price_etb", "price_per_sqm")
+RENT_FIELDS = ("monthly_rent", "rent_per_sqm", "estimated_sale_value", "gross_yield")
+
+COLUMNS = (
+    "id", "title", "listing_type", "property_type", "city__name",
+    "sub_city__name", "total_area", "bedrooms", "bathrooms", "built_year",
+    "price_etb", "monthly_rent", "listed_date", "views_count",
+) + FEATURE_FIELDS
+
+
+def _ratio(numerator, denominator):
+    if numerator and denominator:
+        return float(numerator) / float(denominator)
+    return None
+
+
+def _rank(values, reverse=False):
+    """1-based rank of every non-None value (ties share a rank), None elsewhere"""
+    ordered = sorted({value for value in values if value is not None}, reverse=reverse)
+    position = {value: rank for rank, value in enumerate(ordered, start=1)}
+    return [position.get(value) for value in values]
+
+
+def _range(values):
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    return {"min": min(values), "max": max(values), "avg": sum(values) / len(values)}
+
+
+class ComparisonFrame:
+    """The selected properties as columns, plus the derived columns"""
+
+    def __init__(self, rows):
+        self.size = len(rows)
+        self.columns = {name: [row[name] for row in rows] for name in COLUMNS}
+        self.columns["city"] = self.columns.pop("city__name")
+        self.columns["sub_city"] = self.columns.pop("sub_city__name")
+        self._derive()
+
+    def _derive(self):
+        now = timezone.now()
+        c = self.columns
+        is_sale = [listing == SALE for listing in c["listing_type"]]
+        is_rent = [listing == RENT for listing in c["listing_type"]]
+        area = [value if value and value > 0 else None for value in c["total_area"]]
+
+        c["is_sale"] = is_sale
+        c["is_rent"] = is_rent
+        c["price_per_sqm"] = [
+            _ratio(price, sqm) if sale else None
+            for price, sqm, sale in zip(c["price_etb"], area, is_sale)
+        ]
+        c["rent_per_sqm"] = [
+            _ratio(rent, sqm) if rental else None
+            for rent, sqm, rental in zip(c["monthly_rent"], area, is_rent)
+        ]
+        c["estimated_sale_value"] = [
+            float(rent) * 12 * YEARS_OF_RENT if rental and rent else None
+            for rent, rental in zip(c["monthly_rent"], is_rent)
+        ]
+        # Annual rent as a percentage of the asking price, when both are set
+        c["gross_yield"] = [
+            round(_ratio(rent * 12, price) * 100, 2) if rental and rent and price else None
+            for rent, price, rental in zip(c["monthly_rent"], c["price_etb"], is_rent)
+        ]
+        c["feature_count"] = [
+            sum(1 for field in FEATURE_FIELDS if c[field][i]) for i in range(self.size)
+        ]
+        c["days_on_market"] = [
+            (now - listed).days if listed else 0 for listed in c["listed_date"]
+        ]
+
+        c["sale_value_rank"] = _rank(c["price_per_sqm"])
+        c["rent_value_rank"] = _rank(c["rent_per_sqm"])
+        c["yield_rank"] = _rank(c["gross_yield"], reverse=True)
+        c["feature_rank"] = _rank(c["feature_count"], reverse=True)
+
+    def where(self, mask):
+        """Indexes of the rows where `mask` is true"""
+        return [i for i, selected in enumerate(mask) if selected]
+
+    def pick(self, name, indexes):
+        column = self.columns[name]
+        return [column[i] for i in indexes]
+
+    def best(self, name, reverse=False):
+        """Index of the row with the lowest (highest) non-None value, or None"""
+        candidates = [(value, i) for i, value in enumerate(self.columns[name]) if value is not None]
+        if not candidates:
+            return None
+        if reverse:
+            return max(candidates, key=lambda candidate: (candidate[0], -candidate[1]))[1]
+        return min(candidates)[1]
+
+
+def load_frame(property_ids):
+    """
+    ComparisonFrame of the active properties in `property_ids`, or None if
+    any of them doesn't exist or is inactive.
+    """
+    from .models import Property
+
+    ids = sorted({int(pk) for pk in property_ids})
+    listed = Property.objects.filter(pk__in=ids, is_active=True)
+    fingerprint = sorted(listed.values_list("pk", "updated_at"))
+    if len(fingerprint) != len(ids):
+        return None
+
+    key = api_cache.make_cache_key(api_cache.COMPARISONS, tuple(ids), tuple(fingerprint))
+    try:
+        frame = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Comparison cache read failed: {e}")
+        frame = None
+    if frame is not None:
+        return frame
+
+    frame = ComparisonFrame(list(listed.values(*COLUMNS)))
+    try:
+        cache.set(key, frame, settings.COMPARISON_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Comparison cache write failed: {e}")
+    return frame
+
+
+def _property_data(frame, i):
+    c = frame.columns
+    data = {field: c[field][i] for field in (
+        "id", "title", "listing_type", "property_type", "city", "sub_city",
+        "total_area", "bedrooms", "bathrooms", "built_year",
+    ) + FEATURE_FIELDS + ("days_on_market", "views_count")}
+    data["feature_count"] = c["feature_count"][i]
+    data["feature_rank"] = c["feature_rank"][i]
+
+    if c["is_sale"][i]:
+        data["price_etb"] = c["price_etb"][i]
+        data["monthly_rent"] = None
+        data["price_per_sqm"] = c["price_per_sqm"][i]
+        data["value_rank"] = c["sale_value_rank"][i]
+    elif c["is_rent"][i]:
+        data["price_etb"] = None
+        data["monthly_rent"] = c["monthly_rent"][i]
+        data["rent_per_sqm"] = c["rent_per_sqm"][i]
+        data["estimated_sale_value"] = c["estimated_sale_value"][i]
+        data["gross_yield"] = c["gross_yield"][i]
+        data["yield_rank"] = c["yield_rank"][i]
+        data["value_rank"] = c["rent_value_rank"][i]
+    return data
+
+
+def _matrix(frame):
+    c = frame.columns
+    matrix = {field: list(c[field]) for field in COMMON_FIELDS}
+    matrix["city"] = list(c["city"])
+    matrix["sub_city"] = list(c["sub_city"])
+    matrix["listing_type"] = list(c["listing_type"])
+    for field in SALE_FIELDS:
+        matrix[field] = [value if sale else None for value, sale in zip(c[field], c["is_sale"])]
+    for field in RENT_FIELDS:
+        matrix[field] = [value if rental else None for value, rental in zip(c[field], c["is_rent"])]
+    return matrix
+
+
+def _summary(frame):
+    c = frame.columns
+    sale = frame.where(c["is_sale"])
+    rent = frame.where(c["is_rent"])
+    areas = [float(area) for area in c["total_area"] if area]
+    bedrooms = [value for value in c["bedrooms"] if value is not None]
+    no_range = {"min": 0, "max": 0, "avg": 0}
+
+    summary = {
+        "total_properties": frame.size,
+        "sale_properties_count": len(sale),
+        "rent_properties_count": len(rent),
+        "common_stats": {
+            "area_range": _range(areas) or no_range,
+            "bedroom_range": _range(bedrooms) if any(bedrooms) else no_range,
+        },
+    }
+
+    sale_prices = _range([float(price) for price in frame.pick("price_etb", sale) if price])
+    if sale_prices:
+        summary["sale_stats"] = {"price_range": sale_prices}
+        per_sqm = _range(frame.pick("price_per_sqm", sale))
+        if per_sqm:
+            summary["sale_stats"]["price_per_sqm_range"] = dict(per_sqm, best_value=per_sqm["min"])
+
+    rents = _range([float(rent) for rent in frame.pick("monthly_rent", rent) if rent])
+    if rents:
+        summary["rent_stats"] = {"rent_range": rents}
+        for name in ("rent_per_sqm", "estimated_sale_value", "gross_yield"):
+            values = _range(frame.pick(name, rent))
+            if values:
+                summary["rent_stats"][f"{name}_range"] = values
+
+    best_sale = frame.best("price_per_sqm")
+    if best_sale is not None:
+        summary["best_sale_value"] = {
+            "id": c["id"][best_sale],
+            "title": c["title"][best_sale],
+            "price_per_sqm": c["price_per_sqm"][best_sale],
+            "total_price": c["price_etb"][best_sale],
+            "area": c["total_area"][best_sale],
+        }
+
+    best_rent = frame.best("rent_per_sqm")
+    if best_rent is not None:
+        summary["best_rent_value"] = {
+            "id": c["id"][best_rent],
+            "title": c["title"][best_rent],
+            "rent_per_sqm": c["rent_per_sqm"][best_rent],
+            "monthly_rent": c["monthly_rent"][best_rent],
+            "area": c["total_area"][best_rent],
+        }
+
+    most = frame.best("feature_count", reverse=True)
+    if most is not None:
+        summary["most_features"] = {
+            "id": c["id"][most],
+            "title": c["title"][most],
+            "listing_type": c["listing_type"][most],
+            "feature_count": c["feature_count"][most],
+        }
+    return summary
+
+
+def compare_properties(frame):
+    """Response body of ComparisonViewSet.compare for a frame"""
+    c = frame.columns
+    has_mixed_types = any(c["is_sale"]) and any(c["is_rent"])
+    result = {
+        "properties": [_property_data(frame, i) for i in range(frame.size)],
+        "matrix": _matrix(frame),
+        "has_mixed_types": has_mixed_types,
+        "summary": _summary(frame),
+        "comparison_date": timezone.now().isoformat(),
+        "status": "success",
+    }
+    if has_mixed_types:
+        result["warning"] = (
+            "You are comparing properties with different listing types (rent vs sale). Some metrics may not be directly comparable."
+        )
+    return result
+
+
+def comparison_insights(frame):
+    """Response body of ComparisonViewSet.insights for a frame"""
+    c = frame.columns
+    summary = _summary(frame)
+
+    coverage = {
+        field: sum(1 for value in c[field] if value) for field in FEATURE_FIELDS
+    }
+    recommendations = []
+    for name, key, message in (
+        ("best_sale_value", "price_per_sqm", "Lowest price per m² among the properties for sale"),
+        ("best_rent_value", "rent_per_sqm", "Lowest rent per m² among the properties for rent"),
+    ):
+        if name in summary:
+            recommendations.append({
+                "type": name,
+                "property_id": summary[name]["id"],
+                "title": summary[name]["title"],
+                "metric": key,
+                "value": summary[name][key],
+                "message": message,
+            })
+
+    best_yield = frame.best("gross_yield", reverse=True)
+    if best_yield is not None:
+        recommendations.append({
+            "type": "best_yield",
+            "property_id": c["id"][best_yield],
+            "title": c["title"][best_yield],
+            "metric": "gross_yield",
+            "value": c["gross_yield"][best_yield],
+            "message": "Highest annual rent relative to its price",
+        })
+    if "most_features" in summary:
+        recommendations.append({
+            "type": "most_features",
+            "property_id": summary["most_features"]["id"],
+            "title": summary["most_features"]["title"],
+            "metric": "feature_count",
+            "value": summary["most_features"]["feature_count"],
+            "message": "Most amenities and verifications",
+        })
+
+    return {
+        "best_value": {
+            name: summary[name] for name in ("best_sale_value", "best_rent_value") if name in summary
+        },
+        "price_trends": {
+            name: summary[name] for name in ("sale_stats", "rent_stats") if name in summary
+        },
+        "feature_comparison": {
+            "feature_counts": dict(zip(c["id"], c["feature_count"])),
+            "feature_ranks": dict(zip(c["id"], c["feature_rank"])),
+            "coverage": coverage,
+            "common_features": [field for field, count in coverage.items() if count == frame.size],
+        },
+        "recommendations": recommendations,
+    }
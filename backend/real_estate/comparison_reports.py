@@ -0,0 +1,237 @@
+"""
+Background comparison reports.
+
+ComparisonViewSet.generate_export used to build its export inside the
+request, and PropertyComparisonService.generate_detailed_report (executive
+summary, analysis, recommendations, insights, risks) was recomputed for
+every download. A report is now a ComparisonReport: asking for one
+records it and returns at once, a worker
+(real_estate.tasks.run_comparison_report_task) writes the artifact on
+local disk and moves it to media storage, and clients poll the report and
+download the file once it is completed.
+
+Reports are keyed by a hash of the sorted property ids, the updated_at of
+each of those properties and the format. Asking again for an unchanged
+comparison, such as downloading a saved PropertyComparison a second time,
+returns the finished (or still running) report and streams the stored
+file without building anything. Editing any of the properties changes the
+key, so the next request builds a fresh report.
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .comparison import PropertyComparisonService
+from .comparison_engine import compare_properties, load_frame
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "json")
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+}
+
+SCORE_CATEGORIES = (
+    "total", "price_value", "features", "location", "condition",
+    "market_position", "documentation",
+)
+
+
+def report_cache_key(property_ids, format_type):
+    """
+    Hash identifying a report of the active properties in `property_ids`
+    as they are now, or None if any of them doesn't exist or is inactive
+    """
+    from .models import Property
+
+    ids = sorted({int(pk) for pk in property_ids})
+    fingerprint = sorted(
+        Property.objects.filter(pk__in=ids, is_active=True).values_list("pk", "updated_at")
+    )
+    if len(fingerprint) != len(ids):
+        return None
+
+    payload = json.dumps(
+        {
+            "properties": [[pk, updated_at.isoformat()] for pk, updated_at in fingerprint],
+            "format": format_type,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def find_reusable_report(cache_key):
+    """Latest report of the same comparison that is finished or still in progress"""
+    from .models import ComparisonReport
+
+    now = timezone.now()
+    in_flight_since = now - timedelta(seconds=settings.COMPARISON_REPORT_TIMEOUT)
+    return (
+        ComparisonReport.objects.filter(cache_key=cache_key)
+        .filter(
+            Q(status="completed", expires_at__gt=now)
+            | Q(status__in=["pending", "running"], created_at__gte=in_flight_since)
+        )
+        .order_by("-created_at")
+        .first()
+    )
+
+
+def request_report(user, property_ids, format_type="csv", comparison=None):
+    """
+    Return (report, created). A new report is queued once the current
+    transaction commits; an equivalent existing one is returned as is.
+    The report is None if some of the properties are not available.
+    """
+    from .models import ComparisonReport
+    from .tasks import enqueue_comparison_report
+
+    cache_key = report_cache_key(property_ids, format_type)
+    if cache_key is None:
+        return None, False
+
+    report = find_reusable_report(cache_key)
+    if report is not None:
+        return report, False
+
+    report = ComparisonReport.objects.create(
+        requested_by=user,
+        comparison=comparison,
+        property_ids=sorted({int(pk) for pk in property_ids}),
+        format=format_type,
+        cache_key=cache_key,
+    )
+    transaction.on_commit(lambda: enqueue_comparison_report(report.pk))
+    return report, True
+
+
+def run_report(report_id):
+    """Build the artifact of a pending report; called by the worker"""
+    from .models import ComparisonReport
+
+    claimed = ComparisonReport.objects.filter(pk=report_id, status="pending").update(
+        status="running", started_at=timezone.now()
+    )
+    if not claimed:
+        # Already picked up by another worker, or gone
+        return
+
+    report = ComparisonReport.objects.get(pk=report_id)
+    try:
+        build_report(report)
+    except Exception as e:
+        logger.error(f"Comparison report {report_id} failed: {e}", exc_info=True)
+        ComparisonReport.objects.filter(pk=report_id).update(
+            status="failed", error=str(e)[:1000], completed_at=timezone.now()
+        )
+
+
+def build_report(report):
+    """Write the comparison and the detailed report into the report's file"""
+    from .models import Property
+
+    frame = load_frame(report.property_ids)
+    if frame is None:
+        raise ValueError("Some of the compared properties are no longer available")
+
+    properties = list(
+        Property.objects.filter(pk__in=report.property_ids, is_active=True)
+        .select_related("city", "sub_city")
+    )
+    comparison = compare_properties(frame)
+    detailed = PropertyComparisonService.generate_detailed_report(properties) or {}
+    timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+
+    with tempfile.TemporaryFile() as artifact:
+        text = io.TextIOWrapper(artifact, encoding="utf-8", newline="")
+        if report.format == "json":
+            json.dump({"comparison": comparison, "report": detailed}, text, cls=DjangoJSONEncoder)
+        else:
+            csv.writer(text).writerows(report_rows(comparison, detailed))
+        text.flush()
+        text.detach()
+
+        report.file_size = artifact.tell()
+        artifact.seek(0)
+        report.file.save(f"comparison_{timestamp}.{report.format}", File(artifact), save=False)
+
+    now = timezone.now()
+    report.status = "completed"
+    report.completed_at = now
+    report.expires_at = now + timedelta(hours=settings.COMPARISON_REPORT_TTL)
+    report.save(update_fields=["file", "file_size", "status", "completed_at", "expires_at"])
+
+
+def report_rows(comparison, detailed):
+    """Yield the CSV rows of a comparison report"""
+    ids = [data["id"] for data in comparison["properties"]]
+    yield ["Property Comparison Report", f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}']
+    yield []
+    yield ["Field"] + [data["title"] for data in comparison["properties"]]
+    for field, values in comparison["matrix"].items():
+        yield [field] + values
+
+    scores = detailed.get("property_scores", {})
+    if scores:
+        yield []
+        yield ["Score"] + ids
+        for category in SCORE_CATEGORIES:
+            yield [category] + [scores[pk]["scores"].get(category) for pk in ids]
+
+    recommendations = detailed.get("recommendations", [])
+    if recommendations:
+        yield []
+        yield ["Priority", "Property", "Title", "Message", "Suggestion"]
+        for item in recommendations:
+            yield [
+                item.get("priority"), item.get("property_id"), item.get("title"),
+                item.get("message"), item.get("suggestion"),
+            ]
+
+    insights = detailed.get("insights", [])
+    if insights:
+        yield []
+        yield ["Insight", "Description", "Implication"]
+        for item in insights:
+            yield [item.get("title"), item.get("description"), item.get("implication")]
+
+    risks = detailed.get("risk_assessment", {})
+    if risks:
+        yield []
+        yield ["Overall Risk Level", risks.get("overall_risk_level")]
+        yield ["Property", "Risk Level", "Risk Score", "Risks"]
+        for pk, risk in risks.get("property_risks", {}).items():
+            yield [
+                pk, risk["risk_level"], risk["risk_score"],
+                "; ".join(item["description"] for item in risk["risks"]),
+            ]
+
+
+def cleanup_expired_reports():
+    """Delete the artifacts of expired reports; returns the number removed"""
+    from .models import ComparisonReport
+
+    removed = 0
+    expired = ComparisonReport.objects.filter(expires_at__lte=timezone.now()).exclude(file="")
+    for report in expired.iterator():
+        try:
+            report.file.delete(save=False)
+        except Exception as e:
+            logger.warning(f"Could not delete comparison report {report.file.name}: {e}")
+            continue
+        ComparisonReport.objects.filter(pk=report.pk).update(file="", file_size=0)
+        removed += 1
+    return removed
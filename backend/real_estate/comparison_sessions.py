@@ -0,0 +1,133 @@
+"""
+Comparison baskets kept in the cache.
+
+Ticking "compare" on a listing used to get_or_create a ComparisonSession
+row and then load, count, add to and save its many-to-many set, about six
+queries per click and mostly for anonymous visitors. The basket of a
+browser session is now an ordered list of property ids stored in the
+cache under its session key, refreshed for COMPARISON_SESSION_TTL on
+every change. Nothing is written to the database until the user saves a
+comparison (ComparisonViewSet.save_comparison), which turns the basket
+into a PropertyComparison.
+
+ComparisonSession rows are no longer written or read by requests, so a
+missing basket (expired, evicted, or unreadable while the cache is down)
+is simply empty. migrate_legacy_sessions copies the baskets still kept in
+those rows into the cache once and deletes the rows; it runs from the
+beat task and `python manage.py migrate_comparison_sessions`.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MAX_PROPERTIES = 10
+
+
+class ComparisonFull(Exception):
+    """The basket already holds MAX_PROPERTIES properties"""
+
+
+def _key(session_key):
+    return f"comparison_session:{session_key}"
+
+
+def get_property_ids(session_key):
+    """Ids in the basket of a session, oldest first"""
+    if not session_key:
+        return []
+    try:
+        ids = cache.get(_key(session_key))
+    except Exception as e:
+        logger.warning(f"Comparison session read failed: {e}")
+        return []
+    return list(ids) if ids is not None else []
+
+
+def _store(session_key, ids):
+    try:
+        cache.set(_key(session_key), list(ids), settings.COMPARISON_SESSION_TTL)
+    except Exception as e:
+        logger.warning(f"Comparison session write failed: {e}")
+
+
+def toggle_property(session_key, property_id):
+    """
+    Add `property_id` to the basket, or remove it if already there.
+    Returns ("added" | "removed", ids); raises ComparisonFull.
+    """
+    ids = get_property_ids(session_key)
+    if property_id in ids:
+        ids.remove(property_id)
+        action = "removed"
+    else:
+        if len(ids) >= MAX_PROPERTIES:
+            raise ComparisonFull()
+        ids.append(property_id)
+        action = "added"
+    _store(session_key, ids)
+    return action, ids
+
+
+def add_properties(session_key, property_ids):
+    """Add the ids not in the basket yet, as far as room allows; returns the basket"""
+    ids = get_property_ids(session_key)
+    for property_id in property_ids:
+        if len(ids) >= MAX_PROPERTIES:
+            break
+        if property_id not in ids:
+            ids.append(property_id)
+    _store(session_key, ids)
+    return ids
+
+
+def clear(session_key):
+    if not session_key:
+        return
+    try:
+        cache.delete(_key(session_key))
+    except Exception as e:
+        logger.warning(f"Comparison session delete failed: {e}")
+
+
+def migrate_legacy_sessions():
+    """
+    Copy the baskets of ComparisonSession rows accessed within the TTL
+    into the cache, unless the session already has one there, then delete
+    every row. Returns the number of baskets copied.
+    """
+    from .models import ComparisonSession
+
+    cutoff = timezone.now() - timedelta(seconds=settings.COMPARISON_SESSION_TTL)
+    last_pk = ComparisonSession.objects.order_by("-pk").values_list("pk", flat=True).first()
+    if last_pk is None:
+        return 0
+
+    baskets = {}
+    rows = (
+        ComparisonSession.objects.filter(
+            pk__lte=last_pk, last_accessed__gte=cutoff, properties__isnull=False
+        )
+        .order_by("session_id", "properties__id")
+        .values_list("session_id", "properties__id")
+    )
+    for session_key, property_id in rows.iterator():
+        ids = baskets.setdefault(session_key, [])
+        if len(ids) < MAX_PROPERTIES and property_id not in ids:
+            ids.append(property_id)
+
+    copied = 0
+    for session_key, ids in baskets.items():
+        try:
+            copied += bool(cache.add(_key(session_key), ids, settings.COMPARISON_SESSION_TTL))
+        except Exception as e:
+            logger.warning(f"Comparison session write failed: {e}")
+            # Keep the rows for the next run
+            return copied
+
+    ComparisonSession.objects.filter(pk__lte=last_pk).delete()
+    return copied
@@ -0,0 +1,146 @@
+"""
+Facet counts for the property filter sidebar.
+
+The sidebar used to call the list endpoint once per facet value to get
+its counts. A list request with ?facets=true now returns them all for the
+current filters: the choice fields and the bedroom, sale price and rent
+bands come from one query with a conditional COUNT per value, and cities
+and sub cities from one grouped query.
+
+Results are cached for FACET_CACHE_TTL seconds under the view and the
+normalised filter parameters (see api.cache.normalized_params), per user
+when signed in, since the listing then includes the user's own pending
+properties. The view is part of the key because the list endpoints
+filter different querysets for the same parameters.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from api import cache as api_cache
+
+from .models import Property
+
+logger = logging.getLogger(__name__)
+
+# (label, lower bound, upper bound); bounds are inclusive, None is open
+BEDROOM_BANDS = (
+    ("studio", None, 0),
+    ("1", 1, 1),
+    ("2", 2, 2),
+    ("3", 3, 3),
+    ("4", 4, 4),
+    ("5+", 5, None),
+)
+# Sale prices (price_etb) of for_sale listings
+PRICE_BANDS = (
+    ("under_1m", None, 999_999),
+    ("1m_3m", 1_000_000, 2_999_999),
+    ("3m_5m", 3_000_000, 4_999_999),
+    ("5m_10m", 5_000_000, 9_999_999),
+    ("10m_plus", 10_000_000, None),
+)
+# Monthly rents (monthly_rent) of for_rent listings
+RENT_BANDS = (
+    ("under_10k", None, 9_999),
+    ("10k_25k", 10_000, 24_999),
+    ("25k_50k", 25_000, 49_999),
+    ("50k_100k", 50_000, 99_999),
+    ("100k_plus", 100_000, None),
+)
+
+# Parameters that don't change which properties match
+IGNORED_PARAMS = (
+    "page", "page_size", "ordering", "cursor", "pagination",
+    "include_count", "facets", "fields", "expand",
+)
+
+
+def _band(field, low, high):
+    condition = Q()
+    if low is not None:
+        condition &= Q(**{f"{field}__gte": low})
+    if high is not None:
+        condition &= Q(**{f"{field}__lte": high})
+    return condition
+
+
+def compute_facets(queryset):
+    """Facet counts of a filtered Property queryset"""
+    queryset = queryset.order_by()
+
+    counts = {}
+    for value, _ in Property.PROPERTY_TYPES:
+        counts[f"property_type:{value}"] = Count("pk", filter=Q(property_type=value))
+    for value, _ in Property.LISTING_TYPES:
+        counts[f"listing_type:{value}"] = Count("pk", filter=Q(listing_type=value))
+    for label, low, high in BEDROOM_BANDS:
+        counts[f"bedrooms:{label}"] = Count("pk", filter=_band("bedrooms", low, high))
+    for label, low, high in PRICE_BANDS:
+        counts[f"price:{label}"] = Count(
+            "pk", filter=Q(listing_type="for_sale") & _band("price_etb", low, high)
+        )
+    for label, low, high in RENT_BANDS:
+        counts[f"rent:{label}"] = Count(
+            "pk", filter=Q(listing_type="for_rent") & _band("monthly_rent", low, high)
+        )
+    totals = queryset.aggregate(total=Count("pk"), **counts)
+
+    facets = {
+        "total": totals.pop("total"),
+        "property_type": {},
+        "listing_type": {},
+        "bedrooms": {},
+        "price": {},
+        "rent": {},
+        "city": [],
+        "sub_city": [],
+    }
+    for key, count in totals.items():
+        facet, value = key.split(":", 1)
+        facets[facet][value] = count
+
+    cities = {}
+    locations = (
+        queryset.values("city", "city__name", "sub_city", "sub_city__name")
+        .annotate(count=Count("pk"))
+        .order_by()
+    )
+    for row in locations:
+        city = cities.setdefault(row["city"], {"id": row["city"], "name": row["city__name"], "count": 0})
+        city["count"] += row["count"]
+        facets["sub_city"].append(
+            {"id": row["sub_city"], "name": row["sub_city__name"], "city": row["city"], "count": row["count"]}
+        )
+    facets["city"] = sorted(cities.values(), key=lambda city: -city["count"])
+    facets["sub_city"].sort(key=lambda sub_city: -sub_city["count"])
+    return facets
+
+
+def property_facets(queryset, request, view):
+    """Facet counts for a list request of `view`, cached on its normalised filters"""
+    user = request.user
+    signature = api_cache.normalized_params(request.query_params, exclude=IGNORED_PARAMS)
+    try:
+        key = api_cache.make_cache_key(
+            api_cache.FACETS,
+            type(view).__name__,
+            user.pk if user.is_authenticated else "anonymous",
+            signature,
+        )
+        cached = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Facet cache read failed: {e}")
+        return compute_facets(queryset)
+
+    if cached is not None:
+        return cached
+
+    facets = compute_facets(queryset)
+    try:
+        cache.set(key, facets, settings.FACET_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Facet cache write failed: {e}")
+    return facets
@@ -0,0 +1,178 @@
+"""
+Map search over property coordinates.
+
+A radius search is a bounding-box prefilter on the indexed (latitude,
+longitude) pair, which MySQL can range-scan, followed by the exact
+haversine distance computed in SQL for the rows inside the box only.
+A box search (the visible map area) is just the prefilter.
+
+Every property also stores the geohash of its coordinates, kept up to
+date by Property.save(). Properties in the same cell share a geohash
+prefix, so markers are clustered per zoom level with a GROUP BY on a
+prefix whose length grows with the zoom, instead of sending every
+listing to the browser.
+
+Run `python manage.py backfill_geohashes` after bulk imports or raw
+updates of coordinates.
+"""
+import math
+
+from django.conf import settings
+from django.db.models import Avg, Count, FloatField, Min, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt, Substr
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+GEOHASH_PRECISION = 12
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Geohash prefix length used to cluster markers at each map zoom level:
+# (highest zoom, precision), a cell is roughly a few screen tiles wide
+CLUSTER_PRECISIONS = (
+    (2, 1),
+    (4, 2),
+    (7, 3),
+    (9, 4),
+    (12, 5),
+    (14, 6),
+)
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Geohash of a point, or "" when it has no coordinates"""
+    if latitude is None or longitude is None:
+        return ""
+    latitude, longitude = float(latitude), float(longitude)
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, bit_count, even = 0, 0, True
+    while len(chars) < precision:
+        # Bits alternate between longitude and latitude, longitude first
+        value, bounds = (longitude, lng_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres"""
+    lat1, lng1, lat2, lng2 = map(math.radians, map(float, (lat1, lng1, lat2, lng2)))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(south, west, north, east) around a point; west/east are None near a pole"""
+    latitude, longitude = float(latitude), float(longitude)
+    delta_lat = radius_km / KM_PER_DEGREE_LAT
+    south, north = max(latitude - delta_lat, -90.0), min(latitude + delta_lat, 90.0)
+
+    cos_lat = math.cos(math.radians(latitude))
+    if cos_lat < 1e-6 or radius_km / (KM_PER_DEGREE_LAT * cos_lat) >= 180:
+        return south, None, north, None
+    delta_lng = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+    return south, longitude - delta_lng, north, longitude + delta_lng
+
+
+def within_box(queryset, south, west, north, east):
+    """Properties inside a box; a box with west > east crosses the antimeridian"""
+    queryset = queryset.filter(latitude__gte=south, latitude__lte=north)
+    if west is None or east is None:
+        return queryset
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    if west <= east:
+        return queryset.filter(longitude__gte=west, longitude__lte=east)
+    return queryset.filter(Q(longitude__gte=west) | Q(longitude__lte=east))
+
+
+def distance_expression(latitude, longitude):
+    """SQL haversine distance in km from a point to each property"""
+    lat0 = math.radians(float(latitude))
+    lng0 = math.radians(float(longitude))
+    # Coordinates are decimals; the trigonometry is done in floats
+    lat = Radians(Cast("latitude", FloatField()))
+    lng = Radians(Cast("longitude", FloatField()))
+    half_dlat = (lat - Value(lat0)) / Value(2.0)
+    half_dlng = (lng - Value(lng0)) / Value(2.0)
+    a = Power(Sin(half_dlat), 2) + Value(math.cos(lat0)) * Cos(lat) * Power(Sin(half_dlng), 2)
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a))
+
+
+def within_radius(queryset, latitude, longitude, radius_km):
+    """
+    Properties within `radius_km` of a point, annotated with their
+    `distance_km` and ordered nearest first.
+    """
+    south, west, north, east = bounding_box(latitude, longitude, radius_km)
+    queryset = within_box(queryset, south, west, north, east)
+    return (
+        queryset.annotate(distance_km=distance_expression(latitude, longitude))
+        .filter(distance_km__lte=radius_km)
+        .order_by("distance_km")
+    )
+
+
+def cluster_precision(zoom):
+    """Geohash prefix length for a zoom level, None when markers aren't clustered"""
+    if zoom >= settings.MAP_CLUSTER_MAX_ZOOM:
+        return None
+    for max_zoom, precision in CLUSTER_PRECISIONS:
+        if zoom <= max_zoom:
+            return precision
+    return CLUSTER_PRECISIONS[-1][1]
+
+
+def clusters(queryset, precision):
+    """Marker clusters of a queryset: one row per geohash cell"""
+    return list(
+        queryset.exclude(geohash="")
+        .order_by()
+        .annotate(cell=Substr("geohash", 1, precision))
+        .values("cell")
+        .annotate(
+            count=Count("id"),
+            latitude=Avg("latitude", output_field=FloatField()),
+            longitude=Avg("longitude", output_field=FloatField()),
+            min_price=Min("price_etb"),
+        )
+        .order_by("-count")
+    )
+
+
+def backfill_geohashes(batch_size=500):
+    """Recompute every stored geohash; returns the number changed"""
+    from .models import Property
+
+    changed = 0
+    last_id = 0
+    while True:
+        rows = list(
+            Property.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", "latitude", "longitude", "geohash")[:batch_size]
+        )
+        if not rows:
+            return changed
+        for pk, latitude, longitude, current in rows:
+            geohash = encode_geohash(latitude, longitude)
+            if geohash != current:
+                Property.objects.filter(pk=pk).update(geohash=geohash)
+                changed += 1
+        last_id = rows[-1][0]
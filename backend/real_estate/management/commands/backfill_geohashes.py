@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from real_estate.geo import backfill_geohashes
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the geohash of every property from its coordinates. "
+        "Needed once after deploying map search, and after bulk imports "
+        "or raw coordinate updates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        changed = backfill_geohashes(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Updated {changed} geohashes"))
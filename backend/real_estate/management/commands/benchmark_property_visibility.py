@@ -0,0 +1,92 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from real_estate.models import Property
+from real_estate.visibility import listing_queryset, visible_to
+
+
+def legacy_listing(user):
+    # PropertyListView before real_estate.visibility
+    queryset = Property.objects.filter(approval_status="approved", is_active=True, property_status="available")
+    if user.is_authenticated:
+        queryset = queryset | Property.objects.filter(owner=user).filter(approval_status="pending", is_active=True)
+    return queryset.order_by("-created_at").distinct()
+
+
+def legacy_visible(user):
+    # PropertyViewSet before real_estate.visibility
+    if user.is_authenticated:
+        return Property.objects.filter(Q(is_active=True) | Q(owner=user) | Q(agent=user)).order_by("-created_at").distinct()
+    return Property.objects.filter(is_active=True).order_by("-created_at")
+
+
+def current_listing(user):
+    return listing_queryset(user, is_active=True, property_status="available").order_by("-created_at")
+
+
+def current_visible(user):
+    return visible_to(Property.objects.all(), user).order_by("-created_at")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare query plans and timings of the property visibility filters "
+        "before and after real_estate.visibility, for anonymous users and "
+        "optionally for one signed-in user."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Email or id of a user to benchmark as")
+        parser.add_argument("--runs", type=int, default=20)
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--no-explain", action="store_true")
+
+    def handle(self, *args, **options):
+        users = [AnonymousUser()]
+        if options["user"]:
+            users.append(self._get_user(options["user"]))
+
+        cases = (
+            ("listing", legacy_listing, current_listing),
+            ("viewset", legacy_visible, current_visible),
+        )
+        for user in users:
+            label = user.email if user.is_authenticated else "anonymous"
+            for name, legacy, current in cases:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{name} as {label}"))
+                for version, build in (("legacy", legacy), ("current", current)):
+                    self._report(version, lambda: build(user), options)
+
+    def _get_user(self, value):
+        User = get_user_model()
+        lookup = {"pk": value} if value.isdigit() else {"email": value}
+        try:
+            return User.objects.get(**lookup)
+        except User.DoesNotExist:
+            raise CommandError(f"User {value} not found")
+
+    def _report(self, version, build, options):
+        page_size = options["page_size"]
+        if not options["no_explain"]:
+            self.stdout.write(f"-- {version} plan")
+            self.stdout.write(build()[:page_size].explain())
+
+        timings = []
+        for _ in range(options["runs"]):
+            started = time.perf_counter()
+            # Building is timed too: it includes the own-ids lookups
+            queryset = build()
+            list(queryset[:page_size])
+            count = queryset.count()
+            timings.append(time.perf_counter() - started)
+
+        timings.sort()
+        median = timings[len(timings) // 2] * 1000
+        self.stdout.write(
+            f"{version}: {count} rows, median {median:.1f} ms, "
+            f"best {timings[0] * 1000:.1f} ms over {len(timings)} runs"
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from real_estate.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the stored property recommendations of every active user, "
+        "or of the given user ids. Runs nightly from the beat schedule."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("user_ids", nargs="*", type=int)
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        built = build_recommendations(options["user_ids"] or None, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Built recommendations for {built} users"))
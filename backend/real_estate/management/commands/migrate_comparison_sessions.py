@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from real_estate.comparison_sessions import migrate_legacy_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the comparison baskets still stored in ComparisonSession rows "
+        "into the cache and delete the rows. Also runs from the beat schedule."
+    )
+
+    def handle(self, *args, **options):
+        copied = migrate_legacy_sessions()
+        self.stdout.write(self.style.SUCCESS(f"Copied {copied} comparison baskets to the cache"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from real_estate.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the property keyword search index. Needed once after "
+        "deploying it, and after bulk imports or renaming cities."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} properties"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from real_estate.similarity import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the similar properties of every listed property. Runs "
+        "nightly from the beat schedule; needed once after deploying it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        built = rebuild_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed neighbours of {built} properties"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from real_estate.valuation import train_models
+
+
+class Command(BaseCommand):
+    help = (
+        "Fit the valuation models of every city segment. Runs nightly from "
+        "the beat schedule; needed once after deploying it."
+    )
+
+    def handle(self, *args, **options):
+        trained = train_models()
+        self.stdout.write(self.style.SUCCESS(f"Fitted {trained} valuation models"))
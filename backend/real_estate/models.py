@@ -1,5 +1,5 @@
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
 from django.db.models import F, Q, Count, Avg, Max, Min  
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
@@ -12,6 +12,8 @@ import decimal
 from django.utils.text import slugify
 import uuid
 
+from .geo import encode_geohash
+
 User = get_user_model()
 
 
@@ -208,6 +210,8 @@ class Property(models.Model):
     longitude = models.DecimalField(
         max_digits=18, decimal_places=15, null=True, blank=True
     )
+    # Derived from latitude/longitude on save, used to cluster map markers
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
     address_line_1 = models.CharField(max_length=200, blank=True)
     address_line_2 = models.CharField(max_length=200, blank=True)
 
@@ -335,8 +339,11 @@ class Property(models.Model):
             models.Index(fields=["created_at"]),
             models.Index(fields=["is_promoted", "promotion_end"]),
             models.Index(fields=["promotion_tier", "created_at"]),
-            models.Index(fields=['approval_status', 'is_active']),
+            # Public listing filter + default ordering (see visibility.py)
+            models.Index(fields=['approval_status', 'is_active', 'property_status', 'created_at']),
             models.Index(fields=['approved_at']),
+            # Bounding-box prefilter of map searches (see geo.py)
+            models.Index(fields=['latitude', 'longitude']),
         ]
 
     def __str__(self):
@@ -404,6 +411,11 @@ class Property(models.Model):
     
         if self.is_promoted and not self.promotion_tier:
             self.promotion_tier = 'standard'  
+
+        self.geohash = encode_geohash(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
     
         super().save(*args, **kwargs)
 
@@ -1183,6 +1195,91 @@ class PropertyView(models.Model):
         return f"View of {self.property.title} at {self.viewed_at}"
 
 
+class PropertySearchTerm(models.Model):
+    """Inverted index entry: a search term of a property and its weight (see search.py)"""
+    property = models.ForeignKey(
+        Property, on_delete=models.CASCADE, related_name="search_terms"
+    )
+    term = models.CharField(max_length=64)
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        verbose_name = _("property search term")
+        verbose_name_plural = _("property search terms")
+        unique_together = ["term", "property"]
+
+    def __str__(self):
+        return f"{self.term} ({self.weight}) -> {self.property_id}"
+
+
+class PropertySimilarity(models.Model):
+    """A precomputed neighbour of a property and its rank (see similarity.py)"""
+    property = models.ForeignKey(
+        Property, on_delete=models.CASCADE, related_name="similarities"
+    )
+    similar = models.ForeignKey(
+        Property, on_delete=models.CASCADE, related_name="similar_of"
+    )
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    computed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = _("property similarity")
+        verbose_name_plural = _("property similarities")
+        unique_together = ["property", "rank"]
+        indexes = [
+            models.Index(fields=["similar", "property"]),
+            models.Index(fields=["rank", "score"]),
+        ]
+
+    def __str__(self):
+        return f"{self.property_id} ~ {self.similar_id} ({self.score})"
+
+
+class RecommendationList(models.Model):
+    """Precomputed recommendations of a user: [[property_id, score], ...] (see recommendations.py)"""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name="recommendation_list"
+    )
+    items = models.JSONField(default=list)
+    computed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = _("recommendation list")
+        verbose_name_plural = _("recommendation lists")
+
+    def __str__(self):
+        return f"Recommendations for {self.user_id} ({len(self.items)})"
+
+
+class ValuationModel(models.Model):
+    """Regression model of log price per m² for one segment (see valuation.py)"""
+    segment = models.CharField(max_length=50, unique=True)  # "<listing_type>:<city id or all>"
+    city = models.ForeignKey(
+        City, on_delete=models.CASCADE, null=True, blank=True, related_name="valuation_models"
+    )
+    listing_type = models.CharField(max_length=20)
+
+    layout = models.JSONField(default=dict)  # Feature columns, see valuation.Layout
+    coefficients = models.JSONField(default=list)
+    covariance = models.JSONField(default=list)
+    residual_std = models.FloatField()
+    r_squared = models.FloatField()
+    sample_size = models.PositiveIntegerField()
+    trend_per_year = models.FloatField(default=0)  # Percent
+    # Recent listings for comparable lookups: [[id, area, bedrooms, built_year, sub_city_id, property_type, price_per_sqm], ...]
+    comparables = models.JSONField(default=list)
+    trained_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = _("valuation model")
+        verbose_name_plural = _("valuation models")
+
+    def __str__(self):
+        return f"Valuation model {self.segment} (n={self.sample_size})"
+
+
 class PropertyComparison(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="property_comparisons"
@@ -1201,7 +1298,72 @@ class PropertyComparison(models.Model):
         return f"Comparison by {self.user.email} ({self.properties.count()} properties)"
 
 
+class ComparisonReport(models.Model):
+    """A comparison report built in the background into a CSV or JSON artifact"""
+
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    )
+    FORMAT_CHOICES = (
+        ("csv", "CSV"),
+        ("json", "JSON"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    requested_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="comparison_reports"
+    )
+    comparison = models.ForeignKey(
+        PropertyComparison, on_delete=models.SET_NULL, null=True, blank=True, related_name="reports"
+    )
+    property_ids = models.JSONField(default=list)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default="csv")
+
+    # Hash of (property ids, their updated_at, format); finished reports are reused by it
+    cache_key = models.CharField(max_length=64, db_index=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    error = models.TextField(blank=True)
+
+    file = models.FileField(upload_to="comparison_reports/%Y/%m/%d/", blank=True)
+    file_size = models.BigIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("comparison report")
+        verbose_name_plural = _("comparison reports")
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["cache_key", "status"]),
+            models.Index(fields=["status", "expires_at"]),
+        ]
+
+    def __str__(self):
+        return f"Comparison report {str(self.id)[:8]} ({self.get_status_display()})"
+
+    @property
+    def is_available(self):
+        """Whether the finished artifact can still be downloaded"""
+        return (
+            self.status == "completed"
+            and bool(self.file)
+            and (self.expires_at is None or self.expires_at > timezone.now())
+        )
+
+
 class ComparisonSession(models.Model):
+    """
+    Comparison basket of a browser session, no longer written: baskets are
+    kept in the cache (see real_estate/comparison_sessions.py). Remaining
+    rows are copied there once and deleted by migrate_legacy_sessions.
+    """
     session_id = models.CharField(max_length=100)
     properties = models.ManyToManyField(Property)
     created_at = models.DateTimeField(default=timezone.now)
@@ -1690,6 +1852,44 @@ class SearchHistory(models.Model):
             ip = request.META.get('REMOTE_ADDR')
         return ip
 
+@receiver(post_save, sender=Property)
+def update_property_search_index(sender, instance, created, update_fields=None, **kwargs):
+    from .search import INDEXED_FIELDS, index_property
+
+    if update_fields and not INDEXED_FIELDS.intersection(
+        field[:-3] if field.endswith("_id") else field for field in update_fields
+    ):
+        # Counter and status updates don't change the indexed text
+        return
+    property_id = instance.pk
+    transaction.on_commit(lambda: index_property(property_id))
+
+@receiver(post_save, sender=Property)
+def refresh_property_similarity(sender, instance, created, update_fields=None, **kwargs):
+    from .similarity import TRACKED_FIELDS
+    from .tasks import enqueue_similarity_refresh
+
+    if update_fields and not TRACKED_FIELDS.intersection(
+        field[:-3] if field.endswith("_id") else field for field in update_fields
+    ):
+        return
+    property_id = instance.pk
+    transaction.on_commit(lambda: enqueue_similarity_refresh(property_id))
+
+# Counters and timestamps written by save(update_fields=...) don't change search results
+UNLISTED_FIELDS = {
+    "views_count", "inquiry_count", "save_count", "updated_at",
+}
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_property_search_results(sender, instance, update_fields=None, **kwargs):
+    from .search_cache import invalidate_search_results
+
+    if update_fields and set(update_fields) <= UNLISTED_FIELDS:
+        return
+    transaction.on_commit(invalidate_search_results)
+
 @receiver(post_save, sender=Inquiry)
 def update_property_inquiry_count(sender, instance, created, **kwargs):
     if created:
@@ -0,0 +1,433 @@
+"""
+Precomputed property recommendations.
+
+PropertyViewSet.recommendations used to return the newest listings of the
+profile's preferred types and city. Recommendations are now built offline
+by a batch job from what each user actually did in the last
+RECOMMENDATION_LOOKBACK_DAYS: properties viewed, saved and inquired about,
+and the filters of their searches, plus their profile preferences.
+
+For each user these signals become a preference profile: weighted shares
+of listing type, property type, city and sub city, and the weighted mean
+and spread of log price and bedrooms. Candidates are the newest listings
+of the user's top types and cities, plus the precomputed neighbours
+(see similarity.py) of the properties they interacted with. They are
+scored against the profile, and the best RECOMMENDATION_SIZE are stored
+in one RecommendationList row per user, so serving them is a single read.
+
+Properties the user saved or inquired about are not recommended. At
+serving time the stored list is re-ranked online: sold, inactive or
+unapproved listings, the user's own properties and those saved since the
+build are dropped.
+"""
+import heapq
+import logging
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# How much one occurrence of each signal says about a user's interests
+SIGNAL_WEIGHTS = {
+    "view": 1.0,
+    "search": 2.0,
+    "save": 3.0,
+    "inquiry": 5.0,
+    "profile": 2.0,
+}
+
+# Share of the score of each part of the profile; they add up to 1
+SCORE_WEIGHTS = {
+    "property_type": 0.25,
+    "city": 0.15,
+    "sub_city": 0.15,
+    "listing_type": 0.10,
+    "price": 0.15,
+    "bedrooms": 0.05,
+    "neighbour": 0.10,
+    "freshness": 0.05,
+}
+
+CANDIDATE_FIELDS = (
+    "pk", "listing_type", "property_type", "city_id", "sub_city_id",
+    "price_etb", "monthly_rent", "bedrooms", "owner_id", "created_at",
+)
+
+# Top preferences expanded into candidate buckets
+TOP_PREFERENCES = 3
+# Freshness halves every this many days
+FRESHNESS_HALF_LIFE = 30
+
+
+class Candidate:
+    """A property as seen by the scorer"""
+    __slots__ = ("pk", "listing_type", "property_type", "city", "sub_city", "log_price", "bedrooms", "owner", "created_at")
+
+    def __init__(self, row):
+        pk, listing_type, property_type, city, sub_city, price_etb, monthly_rent, bedrooms, owner, created_at = row
+        price = monthly_rent if listing_type == "for_rent" else price_etb
+        self.pk = pk
+        self.listing_type = listing_type
+        self.property_type = property_type
+        self.city = city
+        self.sub_city = sub_city
+        self.log_price = math.log(float(price)) if price and price > 0 else None
+        self.bedrooms = bedrooms
+        self.owner = owner
+        self.created_at = created_at
+
+
+class Preferences:
+    """Weighted interests of one user"""
+
+    def __init__(self):
+        self.listing_types = Counter()
+        self.property_types = Counter()
+        self.cities = Counter()
+        self.sub_cities = Counter()
+        self.log_prices = []
+        self.bedrooms = []
+        self.interacted = Counter()
+        self.excluded = set()
+
+    def add_property(self, candidate, weight):
+        self.interacted[candidate.pk] += weight
+        self.listing_types[candidate.listing_type] += weight
+        self.property_types[candidate.property_type] += weight
+        self.cities[candidate.city] += weight
+        self.sub_cities[candidate.sub_city] += weight
+        if candidate.log_price is not None:
+            self.log_prices.append((candidate.log_price, weight))
+        if candidate.bedrooms:
+            self.bedrooms.append((candidate.bedrooms, weight))
+
+    def add_filters(self, filters, weight):
+        """Interests expressed by search filters (PropertyFilter parameters)"""
+        if not isinstance(filters, dict):
+            return
+        for key, counter in (
+            ("listing_type", self.listing_types),
+            ("property_type", self.property_types),
+            ("city", self.cities),
+            ("sub_city", self.sub_cities),
+        ):
+            values = filters.get(key)
+            for value in values if isinstance(values, list) else [values]:
+                if value in (None, ""):
+                    continue
+                if key in ("city", "sub_city"):
+                    try:
+                        value = int(value)
+                    except (TypeError, ValueError):
+                        continue
+                counter[value] += weight
+
+        low = _number(filters.get("min_price") or filters.get("price_etb__gte"))
+        high = _number(filters.get("max_price") or filters.get("price_etb__lte"))
+        prices = [value for value in (low, high) if value and value > 0]
+        if prices:
+            # The middle of the range, in log space
+            self.log_prices.append((sum(math.log(value) for value in prices) / len(prices), weight))
+        bedrooms = _number(filters.get("bedrooms") or filters.get("min_bedrooms"))
+        if bedrooms:
+            self.bedrooms.append((bedrooms, weight))
+
+    def top(self, counter):
+        return [value for value, _ in counter.most_common(TOP_PREFERENCES) if value is not None]
+
+    @property
+    def is_empty(self):
+        return not (self.property_types or self.cities or self.listing_types)
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _share(counter, value):
+    total = sum(counter.values())
+    return counter[value] / total if total else 0.0
+
+
+def _mean_and_spread(pairs, minimum):
+    total = sum(weight for _, weight in pairs)
+    mean = sum(value * weight for value, weight in pairs) / total
+    variance = sum(weight * (value - mean) ** 2 for value, weight in pairs) / total
+    return mean, max(math.sqrt(variance), minimum)
+
+
+class Scorer:
+    """Scores candidates against one user's preferences"""
+
+    def __init__(self, preferences, neighbours, now):
+        self.preferences = preferences
+        self.neighbours = neighbours
+        self.now = now
+        self.price = _mean_and_spread(preferences.log_prices, 0.3) if preferences.log_prices else None
+        self.bedrooms = _mean_and_spread(preferences.bedrooms, 1.0) if preferences.bedrooms else None
+
+    def __call__(self, candidate):
+        preferences = self.preferences
+        score = (
+            SCORE_WEIGHTS["property_type"] * _share(preferences.property_types, candidate.property_type)
+            + SCORE_WEIGHTS["city"] * _share(preferences.cities, candidate.city)
+            + SCORE_WEIGHTS["sub_city"] * _share(preferences.sub_cities, candidate.sub_city)
+            + SCORE_WEIGHTS["listing_type"] * _share(preferences.listing_types, candidate.listing_type)
+            + SCORE_WEIGHTS["neighbour"] * self.neighbours.get(candidate.pk, 0.0)
+        )
+        if self.price and candidate.log_price is not None:
+            mean, spread = self.price
+            score += SCORE_WEIGHTS["price"] * math.exp(-(((candidate.log_price - mean) / spread) ** 2))
+        if self.bedrooms and candidate.bedrooms is not None:
+            mean, spread = self.bedrooms
+            score += SCORE_WEIGHTS["bedrooms"] * math.exp(-(((candidate.bedrooms - mean) / spread) ** 2))
+        age_days = max((self.now - candidate.created_at).days, 0)
+        score += SCORE_WEIGHTS["freshness"] * 0.5 ** (age_days / FRESHNESS_HALF_LIFE)
+        return score
+
+
+class Catalogue:
+    """Listed properties, bucketed for candidate generation (newest first)"""
+
+    def __init__(self):
+        from .models import Property
+
+        rows = (
+            listed(Property.objects.all())
+            .order_by("-created_at")
+            .values_list(*CANDIDATE_FIELDS)
+        )
+        self.by_pk = {}
+        self.by_type_city = defaultdict(list)
+        self.by_type = defaultdict(list)
+        self.by_city = defaultdict(list)
+        for row in rows:
+            candidate = Candidate(row)
+            self.by_pk[candidate.pk] = candidate
+            self.by_type_city[(candidate.property_type, candidate.city)].append(candidate)
+            self.by_type[candidate.property_type].append(candidate)
+            self.by_city[candidate.city].append(candidate)
+
+    def candidates(self, preferences, neighbours):
+        limit = settings.RECOMMENDATION_CANDIDATES
+        types = preferences.top(preferences.property_types)
+        cities = preferences.top(preferences.cities)
+        if types and cities:
+            buckets = [self.by_type_city[(t, c)] for t in types for c in cities]
+        elif types:
+            buckets = [self.by_type[t] for t in types]
+        else:
+            buckets = [self.by_city[c] for c in cities]
+
+        per_bucket = max(limit // max(len(buckets), 1), 1)
+        found = {}
+        for bucket in buckets:
+            for candidate in bucket[:per_bucket]:
+                found[candidate.pk] = candidate
+        for pk in neighbours:
+            if pk in self.by_pk:
+                found[pk] = self.by_pk[pk]
+        return found.values()
+
+
+def listed(queryset):
+    """Properties that can be recommended"""
+    return queryset.filter(is_active=True, approval_status="approved", property_status="available")
+
+
+def _signal_user_ids(since):
+    from users.models import UserProfile
+    from .models import Inquiry, PropertyView, SearchHistory, TrackedProperty
+
+    ids = set(PropertyView.objects.filter(viewed_at__gte=since, user__isnull=False).values_list("user_id", flat=True).distinct())
+    ids |= set(TrackedProperty.objects.values_list("user_id", flat=True).distinct())
+    ids |= set(Inquiry.objects.filter(created_at__gte=since, user__isnull=False).values_list("user_id", flat=True).distinct())
+    ids |= set(SearchHistory.objects.filter(created_at__gte=since, user__isnull=False).values_list("user_id", flat=True).distinct())
+    ids |= set(
+        UserProfile.objects.filter(Q(city__isnull=False) | ~Q(preferred_property_types=[]))
+        .values_list("user_id", flat=True)
+    )
+    return sorted(ids)
+
+
+def _load_preferences(user_ids, since, catalogue):
+    """
+    ({user_id: Preferences}, {user_id: neighbour scores}) for a chunk of
+    users, a few queries per signal
+    """
+    from users.models import UserProfile
+    from .models import Inquiry, Property, PropertyView, SearchHistory, TrackedProperty
+
+    interactions = []  # (user_id, property_id, weight, excluded)
+    for user_id, property_id, views in (
+        PropertyView.objects.filter(user_id__in=user_ids, viewed_at__gte=since)
+        .values("user_id", "property_id")
+        .annotate(views=Count("id"))
+        .values_list("user_id", "property_id", "views")
+        .order_by()
+    ):
+        interactions.append((user_id, property_id, SIGNAL_WEIGHTS["view"] * (1 + math.log(views)), False))
+    for user_id, property_id in TrackedProperty.objects.filter(user_id__in=user_ids).values_list("user_id", "property_id"):
+        # Already saved: the user has it, no need to recommend it
+        interactions.append((user_id, property_id, SIGNAL_WEIGHTS["save"], True))
+    for user_id, property_id in (
+        Inquiry.objects.filter(user_id__in=user_ids, created_at__gte=since).values_list("user_id", "property_id")
+    ):
+        # Already in touch about it: informative, but not worth recommending
+        interactions.append((user_id, property_id, SIGNAL_WEIGHTS["inquiry"], True))
+
+    # Interacted properties that are no longer listed still describe tastes
+    missing = {property_id for _, property_id, _, _ in interactions} - set(catalogue.by_pk)
+    extra = {
+        row[0]: Candidate(row)
+        for row in Property.objects.filter(pk__in=missing).values_list(*CANDIDATE_FIELDS)
+    }
+
+    preferences = defaultdict(Preferences)
+    for user_id, property_id, weight, excluded in interactions:
+        candidate = catalogue.by_pk.get(property_id) or extra.get(property_id)
+        if candidate is None:
+            continue
+        preferences[user_id].add_property(candidate, weight)
+        if excluded:
+            preferences[user_id].excluded.add(property_id)
+
+    for user_id, filters in (
+        SearchHistory.objects.filter(user_id__in=user_ids, created_at__gte=since).values_list("user_id", "filters")
+    ):
+        preferences[user_id].add_filters(filters, SIGNAL_WEIGHTS["search"])
+
+    for user_id, property_types, city_id, sub_city_id, budget_min, budget_max in (
+        UserProfile.objects.filter(user_id__in=user_ids).values_list(
+            "user_id", "preferred_property_types", "city_id", "sub_city_id",
+            "budget_range_min", "budget_range_max",
+        )
+    ):
+        preferences[user_id].add_filters(
+            {
+                "property_type": property_types or None,
+                "city": city_id,
+                "sub_city": sub_city_id,
+                "min_price": budget_min,
+                "max_price": budget_max,
+            },
+            SIGNAL_WEIGHTS["profile"],
+        )
+    return preferences, _neighbour_scores(preferences)
+
+
+def _neighbour_scores(preferences):
+    """
+    {user_id: {property_id: strength}}: the neighbours of the properties
+    each user interacted with most, from one query for the whole chunk
+    """
+    from .models import PropertySimilarity
+
+    tops = {
+        user_id: [pk for pk, _ in prefs.interacted.most_common(20)]
+        for user_id, prefs in preferences.items()
+        if prefs.interacted
+    }
+    similar = defaultdict(list)
+    for property_id, similar_id, score in (
+        PropertySimilarity.objects.filter(
+            property_id__in={pk for top in tops.values() for pk in top}
+        ).values_list("property_id", "similar_id", "score")
+    ):
+        similar[property_id].append((similar_id, score))
+
+    neighbours = {}
+    for user_id, top in tops.items():
+        interacted = preferences[user_id].interacted
+        strongest = max(interacted.values())
+        scores = {}
+        for property_id in top:
+            for similar_id, score in similar.get(property_id, ()):
+                strength = score * interacted[property_id] / strongest
+                scores[similar_id] = max(scores.get(similar_id, 0.0), strength)
+        neighbours[user_id] = scores
+    return neighbours
+
+
+def recommend(user_id, preferences, neighbours, catalogue, now):
+    """Best (property_id, score) pairs for one user, given its neighbour scores"""
+    scorer = Scorer(preferences, neighbours, now)
+    skip = set(preferences.excluded)
+    scored = (
+        (scorer(candidate), candidate.pk)
+        for candidate in catalogue.candidates(preferences, neighbours)
+        if candidate.pk not in skip and candidate.owner != user_id
+    )
+    return [(pk, round(score, 4)) for score, pk in heapq.nlargest(settings.RECOMMENDATION_SIZE, scored)]
+
+
+def build_recommendations(user_ids=None, batch_size=200):
+    """
+    Rebuild the stored recommendations of the given users (default: every
+    user with recent activity or profile preferences); returns their number.
+    """
+    from .models import RecommendationList
+
+    now = timezone.now()
+    since = now - timedelta(days=settings.RECOMMENDATION_LOOKBACK_DAYS)
+    full_build = user_ids is None
+    user_ids = _signal_user_ids(since) if full_build else sorted(set(user_ids))
+    catalogue = Catalogue()
+
+    built = 0
+    for start in range(0, len(user_ids), batch_size):
+        chunk = user_ids[start:start + batch_size]
+        preferences, neighbours = _load_preferences(chunk, since, catalogue)
+        rows = [
+            RecommendationList(
+                user_id=user_id,
+                items=recommend(user_id, prefs, neighbours.get(user_id, {}), catalogue, now),
+                computed_at=now,
+            )
+            for user_id, prefs in preferences.items()
+            if not prefs.is_empty
+        ]
+        with transaction.atomic():
+            RecommendationList.objects.filter(user_id__in=chunk).delete()
+            RecommendationList.objects.bulk_create(rows)
+        built += len(rows)
+
+    if full_build:
+        # Users without recent activity fall back to the live query
+        RecommendationList.objects.filter(computed_at__lt=now).delete()
+    return built
+
+
+def recommended_properties(user, limit=12):
+    """
+    The user's stored recommendations that are still listed, best first,
+    as a list of Property instances; None when nothing is stored.
+    """
+    from .models import Property, RecommendationList, TrackedProperty
+
+    items = RecommendationList.objects.filter(user=user).values_list("items", flat=True).first()
+    if not items:
+        return None
+
+    ranked = [pk for pk, _ in items]
+    live = set(
+        listed(Property.objects.filter(pk__in=ranked))
+        .exclude(owner=user)
+        .exclude(pk__in=TrackedProperty.objects.filter(user=user).values("property_id"))
+        .values_list("pk", flat=True)
+    )
+    chosen = [pk for pk in ranked if pk in live][:limit]
+    properties = Property.objects.filter(pk__in=chosen).select_related(
+        "city", "sub_city", "owner", "agent"
+    ).prefetch_related("images", "amenities").in_bulk()
+    return [properties[pk] for pk in chosen if pk in properties]
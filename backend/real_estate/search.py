@@ -0,0 +1,182 @@
+"""
+Keyword search over properties.
+
+Searching used to OR icontains lookups over the text columns and the city
+and sub city names, i.e. LIKE '%x%' scans plus joins on every search.
+Instead every property keeps its normalised terms in PropertySearchTerm,
+an inverted index rewritten when the property is saved. A search looks the
+query terms up by prefix (an indexed LIKE 'x%'), requires every term to
+match and ranks properties by the summed weights of the matching terms
+(title matches count more than description matches).
+
+Text is tokenised on anything that isn't a letter or digit, which covers
+the Ethiopic word space and punctuation (፡ ። ፣ ፤ ...), and Amharic letters
+that are commonly written interchangeably (ሐ/ኀ for ሀ, ሠ for ሰ, ዐ for አ,
+ፀ for ጸ) are folded to one form, so spelling variants find each other.
+
+Run `python manage.py rebuild_search_index` after bulk imports, raw
+updates or renaming a city.
+"""
+import re
+import unicodedata
+import uuid
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum, Value
+
+SEARCH_RANK = "search_rank"
+
+# Where a term was found and how much a match there is worth
+FIELD_WEIGHTS = (
+    ("title", 8),
+    ("title_amharic", 8),
+    ("city__name", 4),
+    ("city__name_amharic", 4),
+    ("sub_city__name", 4),
+    ("sub_city__name_amharic", 4),
+    ("specific_location", 4),
+    ("description", 1),
+    ("description_amharic", 1),
+)
+INDEXED_FIELDS = {field.split("__")[0] for field, _ in FIELD_WEIGHTS}
+
+# Repeats of a term in one field stop counting after this many
+MAX_OCCURRENCES = 3
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+
+STOP_WORDS = frozenset(
+    "a an and are at for from in is of on or the to with".split()
+)
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def _fold_series(variants, base):
+    # An Ethiopic consonant series is 7 consecutive vowel orders
+    return {variant + order: base + order for variant in variants for order in range(7)}
+
+
+AMHARIC_FOLDING = {
+    **_fold_series((0x1210, 0x1280), 0x1200),  # ሐ, ኀ -> ሀ
+    **_fold_series((0x1220,), 0x1230),  # ሠ -> ሰ
+    **_fold_series((0x12D0,), 0x12A0),  # ዐ -> አ
+    **_fold_series((0x1340,), 0x1338),  # ፀ -> ጸ
+}
+
+
+def normalize(text):
+    return unicodedata.normalize("NFKC", text).casefold().translate(AMHARIC_FOLDING)
+
+
+def tokenize(text):
+    """Normalised search terms of `text`, in order, repeats included"""
+    if not text:
+        return []
+    terms = []
+    for token in TOKEN_RE.findall(normalize(str(text))):
+        if token in STOP_WORDS or (len(token) < 2 and not token.isdigit()):
+            continue
+        terms.append(token[:MAX_TERM_LENGTH])
+    return terms
+
+
+def property_terms(values):
+    """{term: weight} for a dict of FIELD_WEIGHTS values of one property"""
+    weights = Counter()
+    for field, field_weight in FIELD_WEIGHTS:
+        for term, occurrences in Counter(tokenize(values.get(field))).items():
+            weights[term] += field_weight * min(occurrences, MAX_OCCURRENCES)
+    return weights
+
+
+def reindex_properties(property_ids):
+    """Rewrite the index entries of the given properties"""
+    from .models import Property, PropertySearchTerm
+
+    property_ids = list(property_ids)
+    if not property_ids:
+        return 0
+
+    fields = [field for field, _ in FIELD_WEIGHTS]
+    rows = Property.objects.filter(pk__in=property_ids).values("pk", *fields)
+
+    entries = []
+    for row in rows:
+        for term, weight in property_terms(row).items():
+            entries.append(PropertySearchTerm(property_id=row["pk"], term=term, weight=weight))
+
+    with transaction.atomic():
+        PropertySearchTerm.objects.filter(property_id__in=property_ids).delete()
+        PropertySearchTerm.objects.bulk_create(entries, batch_size=1000)
+    return len(property_ids)
+
+
+def index_property(property_id):
+    reindex_properties([property_id])
+
+
+def rebuild_index(batch_size=500):
+    """Reindex every property; returns the number indexed"""
+    from .models import Property
+
+    indexed = 0
+    last_id = 0
+    while True:
+        ids = list(
+            Property.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return indexed
+        indexed += reindex_properties(ids)
+        last_id = ids[-1]
+
+
+def _parse_uuid(value):
+    try:
+        return uuid.UUID(value.strip())
+    except (AttributeError, ValueError):
+        return None
+
+
+def search_properties(queryset, text):
+    """
+    Narrow a Property queryset to matches of `text`, annotated with their
+    relevance as `search_rank`. Ordering is left to the caller.
+    """
+    no_rank = {SEARCH_RANK: Value(0, output_field=IntegerField())}
+
+    property_id = _parse_uuid(text)
+    if property_id is not None:
+        return queryset.filter(property_id=property_id).annotate(**no_rank)
+
+    terms = list(dict.fromkeys(tokenize(text)))[:MAX_QUERY_TERMS]
+    if not terms:
+        # Only stop words or punctuation: nothing to narrow by
+        return queryset.annotate(**no_rank)
+
+    from .models import PropertySearchTerm
+
+    matches = {f"matched_{i}": Count("pk", filter=Q(term__startswith=term)) for i, term in enumerate(terms)}
+    any_term = Q()
+    for term in terms:
+        any_term |= Q(term__startswith=term)
+
+    hits = (
+        PropertySearchTerm.objects.filter(any_term)
+        .values("property_id")
+        .annotate(rank=Sum("weight"), **matches)
+        .filter(**{f"{name}__gt": 0 for name in matches})
+        .order_by()
+    )
+    return queryset.filter(pk__in=hits.values("property_id")).annotate(
+        **{
+            SEARCH_RANK: Subquery(
+                hits.filter(property_id=OuterRef("pk")).values("rank")[:1],
+                output_field=IntegerField(),
+            )
+        }
+    )
@@ -0,0 +1,110 @@
+"""
+Cached property search results.
+
+Popular searches ("apartment for rent in Bole") are repeated over and
+over with the same parameters. The ordered ids of their matches are
+cached under a canonical signature of the query (see
+api.cache.normalized_params), and each page is hydrated from its slice of
+ids with a primary key lookup instead of re-running the filter, sort and
+count.
+
+Only anonymous list requests and saved search executions are cached: a
+signed-in user's listing also includes their own unpublished properties.
+Results with more than SEARCH_CACHE_MAX_IDS matches are not cached, and
+keyset (?cursor=) requests bypass the cache. Entries live for
+SEARCH_CACHE_TTL seconds, and every listing change to a Property
+invalidates them all (see the receivers in models.py).
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from api import cache as api_cache
+
+logger = logging.getLogger(__name__)
+
+# Parameters that don't change which properties match or their order
+IGNORED_PARAMS = (
+    "page", "page_size", "cursor", "pagination", "include_count",
+    "facets", "fields", "expand",
+)
+
+# Cached in place of the ids of results too large to cache
+TOO_LARGE = "too_large"
+
+
+def cached_result_ids(queryset, *signature):
+    """
+    Ordered ids of the rows of `queryset`, from the cache when the same
+    `signature` was seen recently; None when there are too many to cache.
+    """
+    try:
+        key = api_cache.make_cache_key(api_cache.SEARCH_RESULTS, *signature)
+        ids = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Search cache read failed: {e}")
+        return None
+
+    if ids is None:
+        limit = settings.SEARCH_CACHE_MAX_IDS
+        ids = list(queryset.values_list("pk", flat=True)[:limit + 1])
+        if len(ids) > limit:
+            ids = TOO_LARGE
+        try:
+            cache.set(key, ids, settings.SEARCH_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Search cache write failed: {e}")
+    return None if ids == TOO_LARGE else ids
+
+
+def hydrate(queryset, ids):
+    """Instances of `ids` from `queryset`, in the order of `ids`"""
+    ids = list(ids)
+    by_pk = {obj.pk: obj for obj in queryset.filter(pk__in=ids).order_by()}
+    return [by_pk[pk] for pk in ids if pk in by_pk]
+
+
+def filters_signature(filters):
+    """Canonical form of a saved search's filters dict"""
+    matching = {name: value for name, value in (filters or {}).items() if name not in IGNORED_PARAMS}
+    return json.dumps(matching, sort_keys=True, default=str)
+
+
+def invalidate_search_results():
+    api_cache.bump_cache_version(api_cache.SEARCH_RESULTS, api_cache.FACETS)
+
+
+class SearchResultCacheMixin:
+    """
+    List view mixin serving anonymous requests from cached result ids.
+
+    Pages are cut from the cached id list by the view's paginator and
+    hydrated from get_queryset(), so select_related, prefetches and
+    annotations still apply to the objects serialised.
+    """
+
+    def get_cached_result_ids(self, request):
+        if request.user.is_authenticated or "cursor" in request.query_params:
+            return None
+        if request.query_params.get("pagination") == "cursor":
+            return None
+        return cached_result_ids(
+            self.filter_queryset(self.get_queryset()),
+            type(self).__name__,
+            api_cache.normalized_params(request.query_params, exclude=IGNORED_PARAMS),
+        )
+
+    def list(self, request, *args, **kwargs):
+        ids = self.get_cached_result_ids(request)
+        if ids is None:
+            return super().list(request, *args, **kwargs)
+
+        page = self.paginate_queryset(ids)
+        objects = hydrate(self.get_queryset(), page if page is not None else ids)
+        serializer = self.get_serializer(objects, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
@@ -0,0 +1,255 @@
+"""
+Precomputed similar properties.
+
+PropertyViewSet.similar used to pick random rows (ORDER BY RAND() over an
+OR filter) and find_similar scored every candidate with a Case/When
+expression on each request. Instead the neighbours of every listed
+property are computed offline and stored in PropertySimilarity, the top
+SIMILARITY_TOP_K per property, so both endpoints read a few indexed rows.
+
+Only approved, active properties of the same listing and property type
+are compared. Each is described by a feature vector: log price and log
+area, bedrooms and bathrooms, city and sub city (compared for equality,
+the dot product of their one-hot encodings) and the amenity flags as a
+bitmask. Within a group the candidates of a property are the
+SIMILARITY_WINDOW properties on either side of it in price order, so a
+pass is linear in the group size instead of quadratic.
+
+The nightly task (or `python manage.py rebuild_similarity_index`)
+rebuilds the whole index. A saved property whose features changed is
+refreshed on its own, along with the properties that list it or should
+now list it.
+"""
+import heapq
+import logging
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+AMENITY_FLAGS = (
+    "has_parking", "has_garden", "has_security", "has_furniture",
+    "has_air_conditioning", "has_heating", "has_internet", "has_generator",
+    "has_elevator", "has_swimming_pool", "has_gym", "has_conference_room",
+    "is_pet_friendly", "is_wheelchair_accessible", "has_backup_water",
+)
+FEATURE_FIELDS = (
+    "listing_type", "property_type", "city_id", "sub_city_id", "price_etb",
+    "monthly_rent", "total_area", "bedrooms", "bathrooms",
+) + AMENITY_FLAGS
+# Saving any of these (or a visibility change) refreshes the neighbours
+TRACKED_FIELDS = {
+    field[:-3] if field.endswith("_id") else field for field in FEATURE_FIELDS
+} | {"is_active", "approval_status"}
+
+# Share of the score of each feature; they add up to 1
+WEIGHTS = {
+    "sub_city": 0.25,
+    "city": 0.15,
+    "price": 0.25,
+    "area": 0.15,
+    "rooms": 0.10,
+    "amenities": 0.10,
+}
+# Log ratio at which price/area similarity has dropped to 1/e (about ±30%)
+LOG_SCALE = 0.3
+
+SIGNATURE_KEY = "property_similarity:signature:{}"
+
+
+class Vector:
+    """Features of one property, as compared by score()"""
+    __slots__ = (
+        "pk", "listing_type", "property_type", "city", "sub_city", "log_price",
+        "log_area", "bedrooms", "bathrooms", "amenities",
+    )
+
+    def __init__(self, row):
+        values = dict(zip(("pk",) + FEATURE_FIELDS, row))
+        price = values["monthly_rent"] if values["listing_type"] == "for_rent" else values["price_etb"]
+        self.pk = values["pk"]
+        self.listing_type = values["listing_type"]
+        self.property_type = values["property_type"]
+        self.city = values["city_id"]
+        self.sub_city = values["sub_city_id"]
+        self.log_price = math.log(float(price)) if price and price > 0 else None
+        self.log_area = math.log(float(values["total_area"])) if values["total_area"] and values["total_area"] > 0 else None
+        self.bedrooms = values["bedrooms"] or 0
+        self.bathrooms = values["bathrooms"] or 0
+        self.amenities = sum(1 << i for i, flag in enumerate(AMENITY_FLAGS) if values[flag])
+
+    def signature(self):
+        # The type decides the group, so a type change must not look unchanged
+        return (
+            self.listing_type, self.property_type, self.city, self.sub_city,
+            self.log_price, self.log_area, self.bedrooms, self.bathrooms, self.amenities,
+        )
+
+
+def _closeness(a, b):
+    if a is None or b is None:
+        return 0.0
+    return math.exp(-(((a - b) / LOG_SCALE) ** 2))
+
+
+def score(a, b):
+    """Similarity of two vectors, from 0 to 1"""
+    union = a.amenities | b.amenities
+    amenities = bin(a.amenities & b.amenities).count("1") / bin(union).count("1") if union else 1.0
+    rooms = 1.0 / (1 + abs(a.bedrooms - b.bedrooms) + 0.5 * abs(a.bathrooms - b.bathrooms))
+    return (
+        WEIGHTS["sub_city"] * (a.sub_city == b.sub_city)
+        + WEIGHTS["city"] * (a.city == b.city)
+        + WEIGHTS["price"] * _closeness(a.log_price, b.log_price)
+        + WEIGHTS["area"] * _closeness(a.log_area, b.log_area)
+        + WEIGHTS["rooms"] * rooms
+        + WEIGHTS["amenities"] * amenities
+    )
+
+
+def _eligible():
+    from .models import Property
+
+    return Property.objects.filter(is_active=True, approval_status="approved")
+
+
+def _load_group(listing_type, property_type):
+    """Vectors of one group, in price order (unpriced last)"""
+    rows = (
+        _eligible()
+        .filter(listing_type=listing_type, property_type=property_type)
+        .order_by()
+        .values_list("pk", *FEATURE_FIELDS)
+    )
+    vectors = [Vector(row) for row in rows]
+    vectors.sort(key=lambda vector: (vector.log_price is None, vector.log_price or 0, vector.pk))
+    return vectors
+
+
+def _neighbours(vectors, index, top_k, window):
+    """Top (score, pk) pairs of vectors[index] among its price window"""
+    base = vectors[index]
+    candidates = vectors[max(index - window, 0):index] + vectors[index + 1:index + 1 + window]
+    return heapq.nlargest(top_k, ((score(base, other), other.pk) for other in candidates))
+
+
+def _similarity_rows(property_id, neighbours, computed_at):
+    from .models import PropertySimilarity
+
+    return [
+        PropertySimilarity(
+            property_id=property_id, similar_id=similar_id,
+            score=round(value, 4), rank=rank, computed_at=computed_at,
+        )
+        for rank, (value, similar_id) in enumerate(neighbours, start=1)
+    ]
+
+
+def _store(results, computed_at):
+    """Replace the neighbours of each property in `results` ({pk: neighbours})"""
+    from .models import PropertySimilarity
+
+    rows = []
+    for property_id, neighbours in results.items():
+        rows.extend(_similarity_rows(property_id, neighbours, computed_at))
+    with transaction.atomic():
+        PropertySimilarity.objects.filter(property_id__in=list(results)).delete()
+        PropertySimilarity.objects.bulk_create(rows, batch_size=1000)
+
+
+def rebuild_index(batch_size=500):
+    """Recompute the neighbours of every eligible property; returns their number"""
+    from .models import PropertySimilarity
+
+    top_k, window = settings.SIMILARITY_TOP_K, settings.SIMILARITY_WINDOW
+    started = timezone.now()
+    groups = _eligible().order_by().values_list("listing_type", "property_type").distinct()
+
+    built = 0
+    for listing_type, property_type in groups:
+        vectors = _load_group(listing_type, property_type)
+        for start in range(0, len(vectors), batch_size):
+            batch = range(start, min(start + batch_size, len(vectors)))
+            _store({vectors[i].pk: _neighbours(vectors, i, top_k, window) for i in batch}, started)
+            cache.set_many({SIGNATURE_KEY.format(vectors[i].pk): vectors[i].signature() for i in batch}, None)
+        built += len(vectors)
+
+    # Properties no longer listed, or rows left from an older build
+    PropertySimilarity.objects.filter(computed_at__lt=started).delete()
+    return built
+
+
+def refresh_property(property_id):
+    """
+    Update the index after property `property_id` changed: its own
+    neighbours, and those of the properties in its window that list it or
+    would now rank it above their last neighbour.
+    """
+    from .models import PropertySimilarity
+
+    row = (
+        _eligible().filter(pk=property_id)
+        .values_list("listing_type", "property_type", "pk", *FEATURE_FIELDS)
+        .first()
+    )
+    if row is None:
+        # Gone, unlisted or not approved: drop it from the index
+        PropertySimilarity.objects.filter(property_id=property_id).delete()
+        PropertySimilarity.objects.filter(similar_id=property_id).delete()
+        cache.delete(SIGNATURE_KEY.format(property_id))
+        return
+
+    current = Vector(row[2:])
+    if cache.get(SIGNATURE_KEY.format(property_id)) == current.signature():
+        # Saved without changing its features (counters, promotion, ...)
+        return
+
+    top_k, window = settings.SIMILARITY_TOP_K, settings.SIMILARITY_WINDOW
+    vectors = _load_group(row[0], row[1])
+    position = {vector.pk: index for index, vector in enumerate(vectors)}
+    if property_id not in position:
+        return
+
+    index = position[property_id]
+    nearby = vectors[max(index - window, 0):index + 1 + window]
+    listed_by = set(
+        PropertySimilarity.objects.filter(similar_id=property_id).values_list("property_id", flat=True)
+    )
+    # Score of the last neighbour of each nearby property with a full list
+    floor = dict(
+        PropertySimilarity.objects.filter(property_id__in=[other.pk for other in nearby], rank=top_k)
+        .values_list("property_id", "score")
+    )
+
+    affected = {property_id} | (listed_by & set(position))
+    for other in nearby:
+        if other.pk not in affected and score(current, other) > floor.get(other.pk, -1.0):
+            affected.add(other.pk)
+
+    _store({pk: _neighbours(vectors, position[pk], top_k, window) for pk in affected}, timezone.now())
+    # Properties of its former group (its type changed) no longer list it
+    PropertySimilarity.objects.filter(
+        similar_id=property_id, property_id__in=listed_by - set(position)
+    ).delete()
+    cache.set(SIGNATURE_KEY.format(property_id), current.signature(), None)
+
+
+def similar_properties(property_id, limit=None):
+    """
+    Listed neighbours of a property, best first, annotated with their
+    `similarity_score`. Empty until the property has been indexed.
+    """
+    from .models import Property
+
+    queryset = (
+        Property.objects.filter(similar_of__property_id=property_id, is_active=True)
+        .annotate(similarity_score=F("similar_of__score"))
+        .order_by("similar_of__rank")
+    )
+    return queryset[:limit] if limit else queryset
+
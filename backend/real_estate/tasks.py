@@ -0,0 +1,91 @@
+import threading
+
+from django.db import connection
+
+from .comparison_reports import cleanup_expired_reports, run_report
+from .comparison_sessions import migrate_legacy_sessions
+from .recommendations import build_recommendations
+from .similarity import rebuild_index, refresh_property
+from .valuation import train_models
+
+
+def _in_own_connection(func, *args):
+    """Thread target: run func, then close the connection the thread opened"""
+    try:
+        return func(*args)
+    finally:
+        connection.close()
+
+
+try:
+    # Prefer Celery task if celery app exists (scheduled by CELERY_BEAT_SCHEDULE)
+    from utopia_backend.celery_app import app
+
+    @app.task(ignore_result=True)
+    def rebuild_similarity_index_task():
+        return rebuild_index()
+
+    @app.task(ignore_result=True)
+    def refresh_similarity_task(property_id):
+        return refresh_property(property_id)
+
+    @app.task(ignore_result=True)
+    def build_recommendations_task():
+        return build_recommendations()
+
+    @app.task(ignore_result=True)
+    def train_valuation_models_task():
+        return train_models()
+
+    @app.task(ignore_result=True)
+    def run_comparison_report_task(report_id):
+        return run_report(report_id)
+
+    @app.task(ignore_result=True)
+    def cleanup_comparison_reports_task():
+        return cleanup_expired_reports()
+
+    @app.task(ignore_result=True)
+    def cleanup_comparison_sessions_task():
+        return migrate_legacy_sessions()
+
+    def enqueue_similarity_refresh(property_id):
+        refresh_similarity_task.delay(property_id)
+
+    def enqueue_comparison_report(report_id):
+        run_comparison_report_task.delay(str(report_id))
+except Exception:
+    def rebuild_similarity_index_task():
+        return rebuild_index()
+
+    def refresh_similarity_task(property_id):
+        return refresh_property(property_id)
+
+    def build_recommendations_task():
+        return build_recommendations()
+
+    def train_valuation_models_task():
+        return train_models()
+
+    def run_comparison_report_task(report_id):
+        return run_report(report_id)
+
+    def cleanup_comparison_reports_task():
+        return cleanup_expired_reports()
+
+    def cleanup_comparison_sessions_task():
+        return migrate_legacy_sessions()
+
+    def enqueue_similarity_refresh(property_id):
+        # No worker available: refresh in a background thread so the save isn't held
+        threading.Thread(
+            target=_in_own_connection, args=(refresh_similarity_task, property_id),
+            name="similarity-refresh", daemon=True,
+        ).start()
+
+    def enqueue_comparison_report(report_id):
+        # No worker available: build in a background thread so the request isn't held
+        threading.Thread(
+            target=_in_own_connection, args=(run_comparison_report_task, str(report_id)),
+            name="comparison-report", daemon=True,
+        ).start()
@@ -0,0 +1,628 @@
+"""
+Property valuation from models fitted offline.
+
+PropertyValuationView used to count and aggregate the matching listings
+on every request (five or more queries, unbounded on a public endpoint),
+then add flat ETB amounts per amenity and report a fixed "rising" trend.
+Valuations now come from regression models fitted by a nightly job
+(train_models, or `python manage.py train_valuation_models`) and stored
+in ValuationModel, one per segment: each city with enough listings, plus
+a country-wide fallback, for sale and for rent. A request is a dot
+product against a model held in memory; it doesn't touch the database.
+
+Each model is a least-squares fit (with a light ridge penalty) of log
+price per m² on log area, bedrooms, building age, the property type, the
+sub city, the amenity flags of the valuation form and how long ago the
+listing was posted. That last coefficient is the market trend: it tells
+how much older listings were priced below or above newer ones, per year.
+The value range is a 90% prediction interval from the residual spread
+and the uncertainty of the coefficients.
+
+Each model also keeps up to VALUATION_INDEX_SIZE recent listings of its
+segment, so the nearest comparables of a valuation can be listed without
+a query.
+
+Appraisals are memoized: the inputs are rounded (see normalize_spec) and
+the value per m² of each rounded spec is cached for VALUATION_CACHE_TTL,
+keyed with the model version, so repeated and near-identical requests,
+such as the items of a portfolio valued through estimate_many, are
+answered from the cache.
+
+NumPy is not a dependency, so the fit is done in plain Python over
+sparse rows; a model has a few dozen coefficients.
+"""
+import heapq
+import logging
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api import cache as api_cache
+
+logger = logging.getLogger(__name__)
+
+SALE = "for_sale"
+RENT = "for_rent"
+
+# Amenity flags of the valuation form
+AMENITIES = ("has_parking", "has_security", "has_garden", "has_furniture")
+
+# Listing condition is not recorded, so it can't be learned
+CONDITION_MULTIPLIERS = {
+    "excellent": 1.2,
+    "good": 1.0,
+    "average": 0.9,
+    "needs_work": 0.7,
+}
+
+# Months of rent a property is worth when only rents are known
+RENT_MONTHS_TO_VALUE = 200
+DEFAULT_VALUE = 5000000
+
+# Input bounds: the precision of PropertyValuation.total_area, the
+# built_year validators of Property, and a sane number of bedrooms
+MAX_TOTAL_AREA = 99999999.99
+MIN_BUILT_YEAR, MAX_BUILT_YEAR = 1800, 2100
+MAX_BEDROOMS = 100
+
+# Two-sided 90% interval
+INTERVAL_Z = 1.645
+# Ridge penalty on every coefficient but the intercept
+RIDGE = 1.0
+# Sub cities with fewer listings than this share the baseline
+MIN_SUB_CITY_SAMPLES = 10
+# Trend (percent per year) below which the market is "stable"
+STABLE_TREND = 2.0
+
+COMPARABLE_COUNT = 5
+
+# Rounding of the inputs that share a cached appraisal (see normalize_spec)
+AREA_STEP = 5  # m²
+YEAR_BUCKET = 5  # years
+
+# Inputs of the appraisal cache key
+KEY_FIELDS = ("property_type", "total_area", "bedrooms", "built_year", "city", "sub_city") + AMENITIES
+
+FIELDS = (
+    "pk", "listing_type", "property_type", "city_id", "sub_city_id",
+    "total_area", "bedrooms", "built_year", "price_etb", "monthly_rent",
+    "listed_date",
+) + AMENITIES
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes", "on")
+    return bool(value)
+
+
+def _locations():
+    """
+    (ids of the active cities, {sub city id: city id} of their sub
+    cities), cached with the sub cities (bumped on every City and SubCity
+    change)
+    """
+    from .models import City, SubCity
+
+    key = api_cache.make_cache_key(api_cache.SUB_CITIES, "valuation_locations")
+    try:
+        locations = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Location cache read failed: {e}")
+        locations = None
+    if locations is None:
+        locations = (
+            set(City.objects.filter(is_active=True).values_list("pk", flat=True)),
+            dict(
+                SubCity.objects.filter(city__is_active=True)
+                .values_list("pk", "city_id")
+            ),
+        )
+        try:
+            cache.set(key, locations, settings.LOOKUP_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Location cache write failed: {e}")
+    return locations
+
+
+def parse_spec(data):
+    """
+    Validated valuation inputs from request data; raises ValueError with
+    the message to return. Every value fits its PropertyValuation column,
+    and the city and sub city exist and match.
+    """
+    from .models import Property
+
+    if not data.get("property_type"):
+        raise ValueError("Property type is required")
+    if not data.get("total_area"):
+        raise ValueError("Total area is required")
+
+    try:
+        spec = {
+            "property_type": str(data["property_type"]),
+            "total_area": float(data["total_area"]),
+            "bedrooms": int(data["bedrooms"]) if data.get("bedrooms") else 0,
+            "built_year": int(data["built_year"]) if data.get("built_year") else None,
+            "city": int(data["city"]) if data.get("city") else None,
+            "sub_city": int(data["sub_city"]) if data.get("sub_city") else None,
+        }
+    except (ValueError, TypeError):
+        raise ValueError("Invalid data type in request")
+
+    if spec["property_type"] not in dict(Property.PROPERTY_TYPES):
+        raise ValueError("Invalid property type")
+    if not math.isfinite(spec["total_area"]) or not spec["total_area"] > 0:
+        raise ValueError("Total area must be positive")
+    if spec["total_area"] > MAX_TOTAL_AREA:
+        raise ValueError(f"Total area must be at most {MAX_TOTAL_AREA:,.2f} m²")
+    if not 0 <= spec["bedrooms"] <= MAX_BEDROOMS:
+        raise ValueError(f"Bedrooms must be between 0 and {MAX_BEDROOMS}")
+    if spec["built_year"] is not None and not MIN_BUILT_YEAR <= spec["built_year"] <= MAX_BUILT_YEAR:
+        raise ValueError(f"Built year must be between {MIN_BUILT_YEAR} and {MAX_BUILT_YEAR}")
+
+    if spec["city"] is not None or spec["sub_city"] is not None:
+        cities, sub_cities = _locations()
+        if spec["city"] is not None and spec["city"] not in cities:
+            raise ValueError("Unknown city")
+        if spec["sub_city"] is not None:
+            if spec["sub_city"] not in sub_cities:
+                raise ValueError("Unknown sub city")
+            if spec["city"] is None:
+                spec["city"] = sub_cities[spec["sub_city"]]
+            elif sub_cities[spec["sub_city"]] != spec["city"]:
+                raise ValueError("Sub city is not in the given city")
+
+    spec["condition"] = data.get("condition") or "good"
+    for name in AMENITIES:
+        spec[name] = _flag(data.get(name))
+    return spec
+
+
+def _segment_name(listing_type, city_id):
+    return f"{listing_type}:{city_id or 'all'}"
+
+
+class Layout:
+    """Column positions of the features of a model"""
+
+    # Dense columns, then one column per non-baseline type and sub city
+    DENSE = ("intercept", "log_area", "bedrooms", "age", "age_unknown", "years_ago") + AMENITIES
+
+    def __init__(self, property_types, sub_cities, median_age):
+        self.property_types = list(property_types)
+        self.sub_cities = list(sub_cities)
+        self.median_age = median_age
+        offset = len(self.DENSE)
+        self.type_column = {name: offset + i for i, name in enumerate(self.property_types)}
+        offset += len(self.property_types)
+        self.sub_city_column = {pk: offset + i for i, pk in enumerate(self.sub_cities)}
+        self.size = offset + len(self.sub_cities)
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["property_types"], data["sub_cities"], data["median_age"])
+
+    def to_json(self):
+        return {
+            "property_types": self.property_types,
+            "sub_cities": self.sub_cities,
+            "median_age": self.median_age,
+        }
+
+    def row(self, area, bedrooms, age, years_ago, property_type, sub_city, amenities):
+        """Sparse feature row: [(column, value), ...]"""
+        known_age = age is not None
+        values = [
+            1.0,
+            math.log(area),
+            float(bedrooms or 0),
+            (age if known_age else self.median_age) / 10,
+            0.0 if known_age else 1.0,
+            years_ago,
+        ] + [1.0 if flag else 0.0 for flag in amenities]
+        row = [(i, value) for i, value in enumerate(values) if value]
+        if property_type in self.type_column:
+            row.append((self.type_column[property_type], 1.0))
+        if sub_city in self.sub_city_column:
+            row.append((self.sub_city_column[sub_city], 1.0))
+        return row
+
+
+def _invert(matrix):
+    """Inverse of a symmetric positive definite matrix (Gauss-Jordan)"""
+    n = len(matrix)
+    a = [list(row) + [1.0 if i == j else 0.0 for j in range(n)] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        if abs(a[pivot][col]) < 1e-12:
+            raise ValueError("Singular design matrix")
+        a[col], a[pivot] = a[pivot], a[col]
+        scale = a[col][col]
+        a[col] = [value / scale for value in a[col]]
+        for r in range(n):
+            if r != col and a[r][col]:
+                factor = a[r][col]
+                a[r] = [value - factor * pivot_value for value, pivot_value in zip(a[r], a[col])]
+    return [row[n:] for row in a]
+
+
+def _quadratic(matrix, row):
+    """x' M x for a sparse row x"""
+    return sum(xi * xj * matrix[i][j] for i, xi in row for j, xj in row)
+
+
+def fit(rows, targets, size):
+    """
+    Ridge least squares of `targets` on sparse `rows`. Returns
+    (coefficients, covariance of the coefficients, residual std, r²).
+    """
+    xtx = [[0.0] * size for _ in range(size)]
+    xty = [0.0] * size
+    for row, y in zip(rows, targets):
+        for i, xi in row:
+            xty[i] += xi * y
+            xtx_i = xtx[i]
+            for j, xj in row:
+                xtx_i[j] += xi * xj
+    for i in range(1, size):
+        xtx[i][i] += RIDGE
+
+    inverse = _invert(xtx)
+    coefficients = [sum(m * v for m, v in zip(inverse_row, xty)) for inverse_row in inverse]
+
+    n = len(targets)
+    mean = sum(targets) / n
+    sse = sst = 0.0
+    for row, y in zip(rows, targets):
+        residual = y - sum(coefficients[i] * x for i, x in row)
+        sse += residual * residual
+        sst += (y - mean) ** 2
+    variance = sse / max(n - size, 1)
+    covariance = [[variance * value for value in inverse_row] for inverse_row in inverse]
+    r_squared = 1 - sse / sst if sst else 0.0
+    return coefficients, covariance, math.sqrt(variance), r_squared
+
+
+def _training_rows(listing_type):
+    """Approved listings of a type with a usable price, newest first"""
+    from .models import Property
+
+    price = "price_etb" if listing_type == SALE else "monthly_rent"
+    queryset = (
+        Property.objects.filter(
+            listing_type=listing_type,
+            approval_status="approved",
+            total_area__gt=0,
+            **{f"{price}__gt": 0},
+        )
+        .filter(Q(is_active=True) | Q(property_status__in=["sold", "rented"]))
+        .order_by("-listed_date")
+    )
+    return list(queryset.values_list(*FIELDS)[:settings.VALUATION_MAX_TRAINING_ROWS])
+
+
+def _fit_segment(records, listing_type, now):
+    """Fit one segment; returns the field values of its ValuationModel, or None"""
+    price_index = FIELDS.index("price_etb" if listing_type == SALE else "monthly_rent")
+    this_year = now.year
+
+    ages = sorted(this_year - record[7] for record in records if record[7])
+    median_age = ages[len(ages) // 2] if ages else 0
+    types = Counter(record[2] for record in records)
+    sub_cities = Counter(record[4] for record in records if record[4])
+
+    # The most common type is the baseline the others are measured against
+    property_types = [name for name, _ in types.most_common()[1:]]
+    frequent = [pk for pk, count in sub_cities.most_common() if count >= MIN_SUB_CITY_SAMPLES]
+    layout = Layout(property_types, frequent[1:] if len(frequent) == len(sub_cities) else frequent, median_age)
+    if len(records) < max(settings.VALUATION_MIN_SAMPLES, 2 * layout.size):
+        # Too few listings for the sub cities: fit without them
+        layout = Layout(property_types, [], median_age)
+        if len(records) < max(settings.VALUATION_MIN_SAMPLES, 2 * layout.size):
+            return None
+
+    rows, targets = [], []
+    for record in records:
+        area = float(record[5])
+        age = this_year - record[7] if record[7] else None
+        years_ago = (now - record[10]).days / 365.25 if record[10] else 0.0
+        rows.append(layout.row(area, record[6], age, years_ago, record[2], record[4], record[11:]))
+        targets.append(math.log(float(record[price_index]) / area))
+
+    try:
+        coefficients, covariance, residual_std, r_squared = fit(rows, targets, layout.size)
+    except ValueError as e:
+        logger.warning(f"Could not fit valuation model: {e}")
+        return None
+
+    # Older listings priced lower means prices are rising
+    trend = (math.exp(-coefficients[Layout.DENSE.index("years_ago")]) - 1) * 100
+    comparables = [
+        [record[0], float(record[5]), record[6], record[7], record[4], record[2],
+         round(float(record[price_index]) / float(record[5]), 2)]
+        for record in records[:settings.VALUATION_INDEX_SIZE]
+    ]
+    return {
+        "layout": layout.to_json(),
+        "coefficients": coefficients,
+        "covariance": covariance,
+        "residual_std": residual_std,
+        "r_squared": r_squared,
+        "sample_size": len(records),
+        "trend_per_year": trend,
+        "comparables": comparables,
+    }
+
+
+def train_models():
+    """Refit every valuation model; returns the number of segments stored"""
+    from .models import ValuationModel
+
+    now = timezone.now()
+    trained = 0
+    for listing_type in (SALE, RENT):
+        records = _training_rows(listing_type)
+        by_city = defaultdict(list)
+        for record in records:
+            by_city[record[3]].append(record)
+
+        segments = [(None, records)] + list(by_city.items())
+        for city_id, segment_records in segments:
+            values = _fit_segment(segment_records, listing_type, now)
+            if values is None:
+                continue
+            ValuationModel.objects.update_or_create(
+                segment=_segment_name(listing_type, city_id),
+                defaults=dict(values, city_id=city_id, listing_type=listing_type, trained_at=now),
+            )
+            trained += 1
+
+    with transaction.atomic():
+        # Segments that no longer have enough listings
+        ValuationModel.objects.filter(trained_at__lt=now).delete()
+    api_cache.bump_cache_version(api_cache.VALUATION_MODELS)
+    return trained
+
+
+class Segment:
+    """A ValuationModel ready for predictions"""
+
+    def __init__(self, model):
+        self.name = model.segment
+        self.listing_type = model.listing_type
+        self.layout = Layout.from_json(model.layout)
+        self.coefficients = model.coefficients
+        self.covariance = model.covariance
+        self.residual_std = model.residual_std
+        self.r_squared = model.r_squared
+        self.sample_size = model.sample_size
+        self.trend_per_year = model.trend_per_year
+        self.comparables = model.comparables
+        self.trained_at = model.trained_at
+
+    def predict(self, spec):
+        """(log value per m², standard error of a single prediction)"""
+        age = timezone.now().year - spec["built_year"] if spec["built_year"] else None
+        row = self.layout.row(
+            spec["total_area"], spec["bedrooms"], age, 0.0, spec["property_type"],
+            spec["sub_city"], [spec[name] for name in AMENITIES],
+        )
+        estimate = sum(self.coefficients[i] * x for i, x in row)
+        error = math.sqrt(self.residual_std ** 2 + max(_quadratic(self.covariance, row), 0.0))
+        return estimate, error
+
+    def nearest(self, spec, k=COMPARABLE_COUNT):
+        """The k indexed listings closest to `spec`"""
+        log_area = math.log(spec["total_area"])
+        this_year = timezone.now().year
+
+        def distance(comparable):
+            pk, area, bedrooms, built_year, sub_city, property_type, per_sqm = comparable
+            d = abs(math.log(area) - log_area) / 0.3 + abs((bedrooms or 0) - spec["bedrooms"])
+            d += 0 if property_type == spec["property_type"] else 2
+            if spec["sub_city"]:
+                d += 0 if sub_city == spec["sub_city"] else 1
+            if spec["built_year"] and built_year:
+                d += abs(built_year - spec["built_year"]) / 10
+            return d
+
+        return [
+            {
+                "id": comparable[0],
+                "total_area": comparable[1],
+                "bedrooms": comparable[2],
+                "built_year": comparable[3],
+                "property_type": comparable[5],
+                "price_per_sqm": comparable[6],
+            }
+            for comparable in heapq.nsmallest(k, self.comparables, key=distance)
+        ]
+
+
+_loaded = {}
+
+
+def load_segments():
+    """{segment name: Segment}, held in memory until the models are retrained"""
+    from .models import ValuationModel
+
+    key = api_cache.make_cache_key(api_cache.VALUATION_MODELS, "segments")
+    segments = _loaded.get(key)
+    if segments is not None:
+        return segments
+
+    try:
+        segments = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Valuation model cache read failed: {e}")
+        segments = None
+    if segments is None:
+        segments = {model.segment: Segment(model) for model in ValuationModel.objects.all()}
+        try:
+            cache.set(key, segments, None)
+        except Exception as e:
+            logger.warning(f"Valuation model cache write failed: {e}")
+
+    _loaded.clear()
+    _loaded[key] = segments
+    return segments
+
+
+def _pick_segment(segments, spec):
+    for listing_type in (SALE, RENT):
+        for city_id in (spec["city"], None):
+            segment = segments.get(_segment_name(listing_type, city_id))
+            if segment is not None:
+                return segment
+    return None
+
+
+def _confidence(error):
+    if error < 0.2:
+        return "high"
+    if error < 0.4:
+        return "medium"
+    return "low"
+
+
+def normalize_spec(spec):
+    """
+    The model inputs of a parsed spec, rounded so that near-identical
+    requests share one cached appraisal: the area to AREA_STEP m² and the
+    built year to the middle of its YEAR_BUCKET. The condition is left
+    out; it only scales the value and is applied after the lookup.
+    """
+    normalized = {
+        "property_type": spec["property_type"],
+        "total_area": float(max(round(spec["total_area"] / AREA_STEP), 1) * AREA_STEP),
+        "bedrooms": spec["bedrooms"],
+        "built_year": None,
+        "city": spec["city"],
+        "sub_city": spec["sub_city"],
+    }
+    if spec["built_year"]:
+        normalized["built_year"] = spec["built_year"] // YEAR_BUCKET * YEAR_BUCKET + YEAR_BUCKET // 2
+    for name in AMENITIES:
+        normalized[name] = spec[name]
+    return normalized
+
+
+def _appraisal_key(normalized):
+    # Versioned with the models, so retraining drops every appraisal
+    return api_cache.make_cache_key(
+        api_cache.VALUATION_MODELS, "appraisal", *(normalized[name] for name in KEY_FIELDS)
+    )
+
+
+def _appraise(segments, normalized):
+    """Value per m² of a normalized spec, or None without a model to ask"""
+    segment = _pick_segment(segments, normalized)
+    if segment is None:
+        return None
+
+    log_per_sqm, error = segment.predict(normalized)
+    months = 1 if segment.listing_type == SALE else RENT_MONTHS_TO_VALUE
+    return {
+        "per_sqm": math.exp(log_per_sqm) * months,
+        "low_per_sqm": math.exp(log_per_sqm - INTERVAL_Z * error) * months,
+        "high_per_sqm": math.exp(log_per_sqm + INTERVAL_Z * error) * months,
+        "confidence": _confidence(error),
+        "sample_size": segment.sample_size,
+        "trend": segment.trend_per_year,
+        "valuation_type": "sale" if segment.listing_type == SALE else "rent",
+        "model": {
+            "segment": segment.name,
+            "r_squared": round(segment.r_squared, 3),
+            "trained_at": segment.trained_at.isoformat(),
+        },
+        "comparables": segment.nearest(normalized),
+    }
+
+
+def estimate_many(specs, include_comparables=False):
+    """
+    Valuations of parsed specs (see parse_spec), in the view's response
+    format. Appraisals are looked up in the cache in one round trip, and
+    only the missing ones are computed and stored, once per distinct key.
+    """
+    normalized = [normalize_spec(spec) for spec in specs]
+    keys = [_appraisal_key(item) for item in normalized]
+
+    try:
+        appraisals = cache.get_many(set(keys))
+    except Exception as e:
+        logger.warning(f"Valuation cache read failed: {e}")
+        appraisals = {}
+
+    missing = {key: item for key, item in zip(keys, normalized) if key not in appraisals}
+    if missing:
+        segments = load_segments()
+        fresh = {key: _appraise(segments, item) for key, item in missing.items()}
+        appraisals.update(fresh)
+        fresh = {key: appraisal for key, appraisal in fresh.items() if appraisal is not None}
+        if fresh:
+            try:
+                cache.set_many(fresh, settings.VALUATION_CACHE_TTL)
+            except Exception as e:
+                logger.warning(f"Valuation cache write failed: {e}")
+
+    return [
+        _result(spec, appraisals[key], include_comparables)
+        for spec, key in zip(specs, keys)
+    ]
+
+
+def estimate(spec, include_comparables=False):
+    """Valuation of a parsed spec (see parse_spec), in the view's response format"""
+    return estimate_many([spec], include_comparables)[0]
+
+
+def _result(spec, appraisal, include_comparables):
+    """Scale an appraisal to the area and condition of `spec`"""
+    multiplier = CONDITION_MULTIPLIERS.get(spec["condition"], 1.0)
+    area = spec["total_area"]
+
+    if appraisal is None:
+        value = DEFAULT_VALUE * multiplier
+        low, high = value * 0.85, value * 1.15
+        confidence, sample_size, trend, valuation_type = "low", 0, 0.0, "default"
+    else:
+        scale = area * multiplier
+        value = appraisal["per_sqm"] * scale
+        low = appraisal["low_per_sqm"] * scale
+        high = appraisal["high_per_sqm"] * scale
+        confidence = appraisal["confidence"]
+        sample_size = appraisal["sample_size"]
+        trend = appraisal["trend"]
+        valuation_type = appraisal["valuation_type"]
+
+    if trend > STABLE_TREND:
+        market_trend = "rising"
+    elif trend < -STABLE_TREND:
+        market_trend = "falling"
+    else:
+        market_trend = "stable"
+
+    result = {
+        "estimated_value": round(value, 2),
+        "value_range": {"low": round(low, 2), "high": round(high, 2)},
+        "confidence": confidence,
+        "comparables_count": sample_size,
+        "price_per_sqm": round(value / area, 2),
+        "valuation_type": valuation_type,
+        "market_trend": market_trend,
+        "trend_strength": round(trend, 2),
+        "valuation_date": timezone.now().date().isoformat(),
+        "notes": f"Based on {sample_size} similar properties. Condition: {spec['condition']}.",
+    }
+    if appraisal is not None:
+        result["model"] = dict(appraisal["model"])
+        if include_comparables:
+            result["comparables"] = [dict(item) for item in appraisal["comparables"]]
+    return result
@@ -0,0 +1,154 @@
+"""
+Write-behind ingestion of property page views.
+
+Views are deduplicated per viewer per day in the cache and appended to an
+in-process buffer, the write-behind buffer of the audit log (see
+api/audit.py). A background thread flushes the buffer periodically (or as
+soon as it reaches PROPERTY_VIEW_BATCH_SIZE) with one bulk INSERT of
+PropertyView rows and one aggregated UPDATE of Property.views_count per
+batch of properties, instead of an UPDATE + INSERT per request. A batch
+the database rejects (a viewer deleted since the view) is retried view by
+view; connection errors keep the batch for the next flush.
+
+The buffer is best-effort: views still in memory when a worker is killed
+are lost, which is acceptable for view statistics.
+"""
+import hashlib
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from api.audit import WriteBehindBuffer
+
+from .models import Property, PropertyView
+
+logger = logging.getLogger(__name__)
+
+
+def mark_viewed_today(property_id, viewer_id):
+    """
+    Return True the first time a viewer is seen for a property today.
+
+    Uses an atomic cache.add on a short hashed key that expires at local
+    midnight. Anonymous requests without a viewer id are always counted,
+    and so is every view while the cache is unavailable.
+    """
+    if not viewer_id:
+        return True
+
+    now = timezone.localtime()
+    tomorrow = (now + timedelta(days=1)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    viewer_hash = hashlib.md5(str(viewer_id).encode("utf-8")).hexdigest()[:12]
+    key = f"pv_seen:{now:%Y%m%d}:{property_id}:{viewer_hash}"
+
+    try:
+        return cache.add(key, 1, timeout=int((tomorrow - now).total_seconds()) + 60)
+    except Exception as e:
+        logger.warning(f"View dedupe cache unavailable: {e}")
+        return True
+
+
+class PropertyViewBuffer(WriteBehindBuffer):
+    """
+    Thread-safe bounded buffer of property views awaiting a flush. Each
+    entry is a view event; writing a batch inserts its PropertyView rows
+    and adds the counted views to Property.views_count.
+    """
+    setting_prefix = "PROPERTY_VIEW"
+    label = "property view"
+    thread_name = "property-view-flusher"
+
+    def __init__(self):
+        super().__init__()
+        self._pending_counts = Counter()
+
+    def record(self, property_id, user_id=None, ip_address=None, user_agent="",
+               session_id="", count=True):
+        """Queue a view; `count` controls whether it bumps views_count"""
+        self.enqueue({
+            "property_id": property_id,
+            "user_id": user_id,
+            "ip_address": ip_address or "0.0.0.0",
+            "user_agent": (user_agent or "")[:500],
+            "session_id": session_id or "",
+            "viewed_at": timezone.now(),
+            "count": count,
+        })
+
+    def pending_count(self, property_id):
+        """Views counted for a property but not yet written to the database"""
+        with self._lock:
+            return self._pending_counts.get(property_id, 0)
+
+    def _added(self, event):
+        if event["count"]:
+            self._pending_counts[event["property_id"]] += 1
+
+    def _settled(self, events):
+        with self._lock:
+            for event in events:
+                if event["count"]:
+                    self._pending_counts[event["property_id"]] -= 1
+                    if self._pending_counts[event["property_id"]] <= 0:
+                        del self._pending_counts[event["property_id"]]
+
+    def write_one(self, event):
+        self.write([event])
+
+    def write(self, events):
+        """Insert the views of `events` and add them to views_count; returns rows inserted"""
+        batch_size = self._setting("BATCH_SIZE", 500)
+
+        # Skip views of properties deleted since they were buffered
+        existing_ids = set(
+            Property.objects.filter(
+                id__in={event["property_id"] for event in events}
+            ).values_list("id", flat=True)
+        )
+        rows = [
+            PropertyView(
+                property_id=event["property_id"],
+                user_id=event["user_id"],
+                ip_address=event["ip_address"],
+                user_agent=event["user_agent"],
+                session_id=event["session_id"],
+                viewed_at=event["viewed_at"],
+            )
+            for event in events
+            if event["property_id"] in existing_ids
+        ]
+        counts = Counter(
+            event["property_id"] for event in events
+            if event["count"] and event["property_id"] in existing_ids
+        )
+        increments = list(counts.items())
+
+        with transaction.atomic():
+            PropertyView.objects.bulk_create(rows, batch_size=batch_size)
+
+            # One UPDATE ... SET views_count = views_count + CASE ... per batch
+            for start in range(0, len(increments), batch_size):
+                chunk = increments[start:start + batch_size]
+                Property.objects.filter(
+                    id__in=[property_id for property_id, _ in chunk]
+                ).update(
+                    views_count=F("views_count") + Case(
+                        *[
+                            When(id=property_id, then=Value(amount))
+                            for property_id, amount in chunk
+                        ],
+                        default=Value(0),
+                        output_field=IntegerField(),
+                    )
+                )
+        return len(rows)
+
+
+view_buffer = PropertyViewBuffer()
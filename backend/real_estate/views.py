@@ -29,6 +29,13 @@ from .serializers import (
     SavedSearchSerializer,
 )
 from subscriptions.models import PropertyPromotion
+from api import cache as api_cache
+from api.filters import PropertySearchFilter, RelevanceOrderingFilter
+from .search import SEARCH_RANK, search_properties
+from .facets import property_facets
+from .search_cache import SearchResultCacheMixin, cached_result_ids, filters_signature, hydrate
+from .view_tracking import mark_viewed_today, view_buffer
+from .visibility import listing_queryset
 from users.utils.activity import log_user_activity
 
 
@@ -50,13 +57,13 @@ class FeaturedPropertiesView(generics.ListAPIView):
         )
 
 
-class PropertyListView(generics.ListAPIView):
+class PropertyListView(SearchResultCacheMixin, generics.ListAPIView):
     serializer_class = PropertySerializer
     permission_classes = [AllowAny]
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
-        filters.OrderingFilter,
+        PropertySearchFilter,
+        RelevanceOrderingFilter,
     ]
     filterset_fields = {
         "property_type": ["exact"],
@@ -80,16 +87,6 @@ class PropertyListView(generics.ListAPIView):
         "has_backup_water": ["exact"],
         "has_elevator": ["exact"],
     }
-    search_fields = [
-        "property_id",
-        "title",
-        "title_amharic",
-        "description",
-        "description_amharic",
-        "specific_location",
-        "city__name",
-        "sub_city__name",
-    ]
     ordering_fields = [
         "promotion_priority",
         "price_etb",
@@ -99,6 +96,8 @@ class PropertyListView(generics.ListAPIView):
         "views_count",
     ]
     ordering = ["-promotion_priority", "-created_at"]
+    # Keyword searches: promoted listings first, then by relevance
+    search_ordering = ["-promotion_priority", "-search_rank", "-created_at"]
 
     def get_queryset(self):
         # Default filters
@@ -111,15 +110,8 @@ class PropertyListView(generics.ListAPIView):
         if not status_param:
             filters["property_status"] = "available"
 
-        # Base queryset for approved properties (and user's own pending ones)
-        queryset = Property.objects.filter(approval_status="approved", **filters)
-
-        # If user is authenticated, also include their own pending properties
-        if self.request.user.is_authenticated:
-            user_properties = Property.objects.filter(owner=self.request.user)
-            queryset = queryset | user_properties.filter(
-                approval_status="pending", is_active=True
-            )
+        # Approved properties, plus the user's own pending ones (no DISTINCT needed)
+        queryset = listing_queryset(self.request.user, **filters)
 
         return (
             queryset.annotate(
@@ -133,9 +125,17 @@ class PropertyListView(generics.ListAPIView):
             )
             .select_related("city", "sub_city", "owner", "agent", "developer")
             .prefetch_related("amenities", "images")
-            .distinct()
         )
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # ?facets=true: sidebar counts for the same filters
+        if request.query_params.get("facets", "").lower() in ("1", "true"):
+            response.data["facets"] = property_facets(
+                self.filter_queryset(self.get_queryset()), request, self
+            )
+        return response
+
 
 class PropertyDetailView(
     generics.RetrieveUpdateAPIView
@@ -265,18 +265,26 @@ class CityListView(generics.ListAPIView):
     serializer_class = CitySerializer
     permission_classes = [AllowAny]
 
+    @api_cache.cache_response(api_cache.CITIES)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
 class SubCityListView(generics.ListAPIView):
     serializer_class = SubCitySerializer
     permission_classes = [AllowAny]
 
     def get_queryset(self):
-        queryset = SubCity.objects.all()
+        queryset = SubCity.objects.select_related("city")
         city_id = self.request.query_params.get("city", None)
         if city_id is not None:
             queryset = queryset.filter(city_id=city_id)
         return queryset
 
+    @api_cache.cache_response(api_cache.SUB_CITIES)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
 class AmenityListView(generics.ListAPIView):
     serializer_class = AmenitySerializer
@@ -285,6 +293,10 @@ class AmenityListView(generics.ListAPIView):
     def get_queryset(self):
         return Amenity.objects.filter(is_active=True).order_by("amenity_type", "name")
 
+    @api_cache.cache_response(api_cache.AMENITIES)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
@@ -298,51 +310,35 @@ class TrackPropertyView(generics.GenericAPIView):
 
     def post(self, request, id):
         try:
-            property = Property.objects.get(id=id)
+            property = Property.objects.values("id", "views_count").get(id=id)
 
             # Get unique viewer identifier
             viewer_id = self.get_viewer_id(request)
 
-            today = timezone.now().date()
-            today_start = timezone.datetime.combine(today, datetime.min.time())
-            today_start = timezone.make_aware(today_start)
-
+            # Dedupe per user (or per session for anonymous users) per day
             if request.user.is_authenticated:
-                # Check by user for today
-                already_viewed_today = PropertyView.objects.filter(
-                    property=property, user=request.user, viewed_at__gte=today_start
-                ).exists()
+                dedupe_key = f"user:{request.user.id}"
             else:
-                # Check by session for today
-                already_viewed_today = (
-                    PropertyView.objects.filter(
-                        property=property,
-                        session_id=viewer_id,
-                        viewed_at__gte=today_start,
-                    ).exists()
-                    if viewer_id
-                    else False
-                )
+                dedupe_key = f"session:{viewer_id}" if viewer_id else None
 
-            # Only increment if this is the first view today
-            if not already_viewed_today:
-                Property.objects.filter(id=id).update(views_count=F("views_count") + 1)
-                property.refresh_from_db()
+            already_viewed_today = not mark_viewed_today(property["id"], dedupe_key)
 
-            # Always create a view record for analytics
-            PropertyView.objects.create(
-                property=property,
-                user=request.user if request.user.is_authenticated else None,
+            # Always record the view for analytics; only the first view today
+            # bumps views_count. Both are written in batches by the flusher.
+            view_buffer.record(
+                property["id"],
+                user_id=request.user.id if request.user.is_authenticated else None,
                 ip_address=self.get_client_ip(request),
-                user_agent=request.META.get("HTTP_USER_AGENT", "")[:500],
+                user_agent=request.META.get("HTTP_USER_AGENT", ""),
                 session_id=viewer_id or "",
-                viewed_at=timezone.now(),
+                count=not already_viewed_today,
             )
+            views_count = property["views_count"] + view_buffer.pending_count(property["id"])
 
             return Response(
                 {
                     "status": "success",
-                    "views_count": property.views_count,
+                    "views_count": views_count,
                     "already_viewed_today": already_viewed_today,
                     "message": (
                         "View counted"
@@ -904,18 +900,17 @@ class SavedSearchViewSet(viewsets.ModelViewSet):
 
             # Apply search query if present
             if filters.get("search"):
-                from django.db.models import Q
-
-                properties = properties.filter(
-                    Q(title__icontains=filters["search"])
-                    | Q(description__icontains=filters["search"])
-                    | Q(specific_location__icontains=filters["search"])
-                )
+                properties = search_properties(properties, filters["search"])
 
             # Ordering - prioritize promoted properties
             ordering = filters.get("ordering")
             if ordering:
                 properties = properties.order_by(ordering)
+            elif filters.get("search"):
+                # Promoted first, then by relevance
+                properties = properties.order_by(
+                    "-is_promoted", "-promotion_tier", "-" + SEARCH_RANK, "-created_at"
+                )
             else:
                 # Default ordering: promoted first, then by date
                 properties = properties.order_by(
@@ -927,13 +922,21 @@ class SavedSearchViewSet(viewsets.ModelViewSet):
             page_number = int(filters.get("page", 1))
 
             # Calculate pagination
-            total_count = properties.count()
-            total_pages = (total_count + page_size - 1) // page_size
-
-            # Get paginated results
             start = (page_number - 1) * page_size
             end = start + page_size
-            paginated_properties = properties[start:end]
+            ids = cached_result_ids(properties, "saved_search", filters_signature(filters))
+            if ids is not None:
+                # Same filters executed recently: page from the cached ids
+                total_count = len(ids)
+                paginated_properties = hydrate(
+                    Property.objects.select_related("city", "sub_city", "owner", "agent")
+                    .prefetch_related("images", "amenities"),
+                    ids[start:end],
+                )
+            else:
+                total_count = properties.count()
+                paginated_properties = properties[start:end]
+            total_pages = (total_count + page_size - 1) // page_size
 
             # Update match count
             saved_search.match_count = total_count
@@ -0,0 +1,58 @@
+"""
+Which properties a user can see in listings.
+
+Listings are approved, active properties, plus a signed-in user's own
+properties that are not public yet. Both the list view and the property
+viewset used to express this as an OR across the owner/agent columns (or
+by OR-ing two querysets) followed by DISTINCT. That kept MySQL from using
+an index for the common, public branch, and the DISTINCT sorted full rows.
+
+Now the user's own ids are fetched first with indexed lookups on
+owner/agent. They are merged into the public filter as `pk IN (...)`. The
+public branch is served by the composite (approval_status, is_active,
+property_status, created_at) index. No DISTINCT is needed because there
+is no join. `manage.py benchmark_property_visibility` prints both plans.
+"""
+from django.db.models import Q
+
+from .models import Property
+
+
+def own_pending_ids(user):
+    """Ids of the user's active properties still waiting for approval"""
+    return list(
+        Property.objects.filter(owner=user, approval_status="pending", is_active=True)
+        .values_list("pk", flat=True)
+    )
+
+
+def own_inactive_ids(user):
+    """Ids of inactive properties the user owns or is the agent of (one UNION query)"""
+    owned = Property.objects.filter(owner=user, is_active=False).values_list("pk", flat=True)
+    represented = Property.objects.filter(agent=user, is_active=False).values_list("pk", flat=True)
+    return list(owned.order_by().union(represented.order_by()))
+
+
+def listing_queryset(user, **filters):
+    """
+    Properties for the public listing: approved ones matching `filters`,
+    plus the user's own pending ones when signed in.
+    """
+    public = Q(approval_status="approved", **filters)
+    if user.is_authenticated:
+        own_ids = own_pending_ids(user)
+        if own_ids:
+            return Property.objects.filter(public | Q(pk__in=own_ids))
+    return Property.objects.filter(public)
+
+
+def visible_to(queryset, user):
+    """
+    Narrow `queryset` to active properties, plus inactive ones the user
+    owns or is the agent of when signed in.
+    """
+    if user.is_authenticated:
+        own_ids = own_inactive_ids(user)
+        if own_ids:
+            return queryset.filter(Q(is_active=True) | Q(pk__in=own_ids))
+    return queryset.filter(is_active=True)
@@ -23,6 +23,7 @@ from .serializers import (
     CalculatePromotionPriceSerializer,
 )
 from real_estate.models import Property
+from api import cache as api_cache
 
 
 class PropertyPromotionTierViewSet(viewsets.ReadOnlyModelViewSet):
@@ -32,6 +33,14 @@ class PropertyPromotionTierViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = PropertyPromotionTierSerializer
     permission_classes = [AllowAny]
 
+    @api_cache.cache_response(api_cache.PROMOTION_TIERS)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @api_cache.cache_response(api_cache.PROMOTION_TIERS)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class PropertyPromotionViewSet(viewsets.ModelViewSet):
     """Property promotions - required for visibility"""
@@ -6,6 +6,9 @@ from django.core.validators import RegexValidator
 from django.utils import timezone
 import uuid
 
+# Fields counted by CustomUser.profile_completion_percentage
+PROFILE_COMPLETION_FIELDS = ['first_name', 'last_name', 'phone_number', 'profile_picture', 'bio']
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -221,9 +224,8 @@ class CustomUser(AbstractUser):
     
     @property
     def profile_completion_percentage(self):
-        fields = ['first_name', 'last_name', 'phone_number', 'profile_picture', 'bio']
-        completed = sum(1 for field in fields if getattr(self, field))
-        return int((completed / len(fields)) * 100)
+        completed = sum(1 for field in PROFILE_COMPLETION_FIELDS if getattr(self, field))
+        return int((completed / len(PROFILE_COMPLETION_FIELDS)) * 100)
 
     def update_activity(self):
         """Update user's last activity timestamp"""
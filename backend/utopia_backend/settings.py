@@ -257,7 +257,8 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',
-        'user': '1000/day'
+        'user': '1000/day',
+        'valuation_batch': '100/day',
     }
 }
 
@@ -311,19 +312,157 @@ CHAPA_API_URL = 'https://api.chapa.co/v1'
 # Google Maps
 GOOGLE_MAPS_API_KEY = config('GOOGLE_MAPS_API_KEY', default='')
 
-# # Cache
-# CACHES = {
-#     'default': {
-#         'BACKEND': 'django_redis.cache.RedisCache',
-#         'LOCATION': config('REDIS_URL', default='redis://localhost:6379/0'),
-#         'OPTIONS': {
-#             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-#         }
-#     }
-# }
-
-# # Cache time to live is 15 minutes
-# CACHE_TTL = 60 * 15
+# Cache
+# Redis is used when REDIS_URL is set; otherwise fall back to a local
+# in-process cache so development and tests work without a Redis server.
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'utopia',
+            'TIMEOUT': 60 * 15,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'utopia-default',
+            'KEY_PREFIX': 'utopia',
+            'TIMEOUT': 60 * 15,
+            'OPTIONS': {
+                'MAX_ENTRIES': 5000,
+            },
+        }
+    }
+
+# Cache time to live is 15 minutes
+CACHE_TTL = config('CACHE_TTL', default=60 * 15, cast=int)
+
+# Lookup tables (cities, sub-cities, amenities, promotion tiers) change
+# rarely and are invalidated on save, so they can live much longer.
+LOOKUP_CACHE_TTL = config('LOOKUP_CACHE_TTL', default=60 * 60 * 6, cast=int)
+
+# Homepage market statistics are recomputed at most this often (seconds)
+MARKET_STATS_CACHE_TTL = config('MARKET_STATS_CACHE_TTL', default=60 * 10, cast=int)
+
+# Property view tracking (write-behind buffer, see real_estate/view_tracking.py)
+PROPERTY_VIEW_FLUSH_INTERVAL = config('PROPERTY_VIEW_FLUSH_INTERVAL', default=10, cast=int)  # seconds
+PROPERTY_VIEW_BATCH_SIZE = 500
+PROPERTY_VIEW_MAX_BUFFER = 10000
+PROPERTY_VIEW_SYNC = config('PROPERTY_VIEW_SYNC', default=False, cast=bool)  # Flush on every view
+
+# Audit log write-behind buffer (see api/audit.py)
+AUDIT_LOG_FLUSH_INTERVAL = config('AUDIT_LOG_FLUSH_INTERVAL', default=5, cast=int)  # seconds
+AUDIT_LOG_BATCH_SIZE = 500
+AUDIT_LOG_MAX_BUFFER = config('AUDIT_LOG_MAX_BUFFER', default=10000, cast=int)
+AUDIT_LOG_SYNC = config('AUDIT_LOG_SYNC', default=False, cast=bool)  # Write every entry immediately
+
+# Unread message/notification counters (see api/counters.py)
+UNREAD_COUNTER_TTL = config('UNREAD_COUNTER_TTL', default=60 * 60, cast=int)  # seconds
+UNREAD_COUNTER_RECONCILE_INTERVAL = config('UNREAD_COUNTER_RECONCILE_INTERVAL', default=60 * 15, cast=int)  # seconds
+
+# Paginator counts (see api/counting.py): exact up to this many rows, estimated above
+PAGINATION_EXACT_COUNT_LIMIT = config('PAGINATION_EXACT_COUNT_LIMIT', default=5000, cast=int)
+PAGINATION_COUNT_CACHE_TTL = config('PAGINATION_COUNT_CACHE_TTL', default=60 * 5, cast=int)  # seconds
+
+# Property list ?facets=true counts (see real_estate/facets.py)
+FACET_CACHE_TTL = config('FACET_CACHE_TTL', default=60 * 2, cast=int)  # seconds
+
+# Cached ids of anonymous property searches (see real_estate/search_cache.py)
+SEARCH_CACHE_TTL = config('SEARCH_CACHE_TTL', default=60, cast=int)  # seconds
+SEARCH_CACHE_MAX_IDS = 1000  # Larger results are not cached
+
+# Property comparison frames (see real_estate/comparison_engine.py)
+COMPARISON_CACHE_TTL = config('COMPARISON_CACHE_TTL', default=60 * 10, cast=int)  # seconds
+
+# Valuation models (see real_estate/valuation.py)
+VALUATION_MIN_SAMPLES = 30  # Listings needed to fit a segment
+VALUATION_MAX_TRAINING_ROWS = config('VALUATION_MAX_TRAINING_ROWS', default=50000, cast=int)  # Newest listings per listing type
+VALUATION_INDEX_SIZE = 500  # Recent listings kept per segment for comparables
+VALUATION_TRAIN_INTERVAL = config('VALUATION_TRAIN_INTERVAL', default=60 * 60 * 24, cast=int)  # seconds
+VALUATION_CACHE_TTL = config('VALUATION_CACHE_TTL', default=60 * 60, cast=int)  # seconds an appraisal is memoized
+VALUATION_BATCH_MAX = 100  # Properties per batch valuation request
+
+# Write-behind PropertyValuation history (see api/valuation_history.py)
+VALUATION_HISTORY_FLUSH_INTERVAL = config('VALUATION_HISTORY_FLUSH_INTERVAL', default=5, cast=int)  # seconds
+VALUATION_HISTORY_BATCH_SIZE = 500
+VALUATION_HISTORY_MAX_BUFFER = config('VALUATION_HISTORY_MAX_BUFFER', default=10000, cast=int)
+VALUATION_HISTORY_SYNC = config('VALUATION_HISTORY_SYNC', default=False, cast=bool)  # Write every row immediately
+
+# Comparison baskets kept in the cache per session (see real_estate/comparison_sessions.py)
+COMPARISON_SESSION_TTL = config('COMPARISON_SESSION_TTL', default=SESSION_COOKIE_AGE, cast=int)  # seconds
+COMPARISON_SESSION_CLEANUP_INTERVAL = config('COMPARISON_SESSION_CLEANUP_INTERVAL', default=60 * 60 * 24, cast=int)  # seconds between legacy row migrations
+
+# Comparison reports (see real_estate/comparison_reports.py)
+COMPARISON_REPORT_TTL = config('COMPARISON_REPORT_TTL', default=24 * 7, cast=int)  # hours a finished report is kept
+COMPARISON_REPORT_TIMEOUT = config('COMPARISON_REPORT_TIMEOUT', default=60 * 15, cast=int)  # seconds before an unfinished report is no longer reused
+
+# CSV exports are streamed, reading this many rows per query (see api/exports.py)
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Batch export jobs (see api/export_jobs.py)
+EXPORT_ARTIFACT_TTL = config('EXPORT_ARTIFACT_TTL', default=24, cast=int)  # hours a finished ZIP is kept
+EXPORT_JOB_TIMEOUT = config('EXPORT_JOB_TIMEOUT', default=60 * 60, cast=int)  # seconds before an unfinished job is no longer reused
+EXPORT_CLEANUP_INTERVAL = config('EXPORT_CLEANUP_INTERVAL', default=60 * 60, cast=int)  # seconds
+
+# Map search (see real_estate/geo.py)
+MAP_MAX_MARKERS = config('MAP_MAX_MARKERS', default=500, cast=int)  # Individual markers per response
+MAP_MAX_RADIUS_KM = 100
+MAP_CLUSTER_MAX_ZOOM = 15  # From this zoom on markers are no longer clustered
+
+# Similar properties index (see real_estate/similarity.py)
+SIMILARITY_TOP_K = 12  # Neighbours stored per property
+SIMILARITY_WINDOW = config('SIMILARITY_WINDOW', default=250, cast=int)  # Candidates on each side in price order
+SIMILARITY_REBUILD_INTERVAL = config('SIMILARITY_REBUILD_INTERVAL', default=60 * 60 * 24, cast=int)  # seconds
+
+# Recommendations (see real_estate/recommendations.py)
+RECOMMENDATION_LOOKBACK_DAYS = config('RECOMMENDATION_LOOKBACK_DAYS', default=90, cast=int)
+RECOMMENDATION_CANDIDATES = 1000  # Candidates scored per user
+RECOMMENDATION_SIZE = 50  # Stored per user, before online filtering
+RECOMMENDATION_REBUILD_INTERVAL = config('RECOMMENDATION_REBUILD_INTERVAL', default=60 * 60 * 24, cast=int)  # seconds
+
+# Analytics rollups (python manage.py rollup_analytics, or the beat task below)
+ANALYTICS_ROLLUP_INITIAL_DAYS = config('ANALYTICS_ROLLUP_INITIAL_DAYS', default=365, cast=int)  # First run window
+ANALYTICS_ROLLUP_INTERVAL = config('ANALYTICS_ROLLUP_INTERVAL', default=60 * 60, cast=int)  # seconds
+
+CELERY_BEAT_SCHEDULE = {
+    'analytics-rollups': {
+        'task': 'analytics.tasks.rollup_analytics_task',
+        'schedule': ANALYTICS_ROLLUP_INTERVAL,
+    },
+    'reconcile-unread-counters': {
+        'task': 'api.tasks.reconcile_unread_counters_task',
+        'schedule': UNREAD_COUNTER_RECONCILE_INTERVAL,
+    },
+    'rebuild-similarity-index': {
+        'task': 'real_estate.tasks.rebuild_similarity_index_task',
+        'schedule': SIMILARITY_REBUILD_INTERVAL,
+    },
+    'build-recommendations': {
+        'task': 'real_estate.tasks.build_recommendations_task',
+        'schedule': RECOMMENDATION_REBUILD_INTERVAL,
+    },
+    'train-valuation-models': {
+        'task': 'real_estate.tasks.train_valuation_models_task',
+        'schedule': VALUATION_TRAIN_INTERVAL,
+    },
+    'cleanup-export-artifacts': {
+        'task': 'api.tasks.cleanup_export_artifacts_task',
+        'schedule': EXPORT_CLEANUP_INTERVAL,
+    },
+    'cleanup-comparison-reports': {
+        'task': 'real_estate.tasks.cleanup_comparison_reports_task',
+        'schedule': EXPORT_CLEANUP_INTERVAL,
+    },
+    'cleanup-comparison-sessions': {
+        'task': 'real_estate.tasks.cleanup_comparison_sessions_task',
+        'schedule': COMPARISON_SESSION_CLEANUP_INTERVAL,
+    },
+}
 
 # Logging
 LOGGING = {
@@ -781,23 +781,47 @@ export const adminApi = {
       // DEBUG: Log what we're sending
       console.log('Sending POST request to /admin/exports/batch/');
 
-      // Make the POST request
-      const response = await apiClient.post(
+      // Queue the export job (the ZIP is built in the background)
+      const jobResponse = await apiClient.post(
         '/admin/exports/batch/',
         {
           report_types: reportTypes,
           format: exportFormat
         },
         {
-          responseType: 'blob',
-          timeout: 60000,
           headers: {
-            'Content-Type': 'application/json',
-            'Accept': 'application/zip, application/octet-stream'
+            'Content-Type': 'application/json'
           }
         }
       );
 
+      let job = jobResponse.data;
+      console.log('Batch export job:', job.id, job.status);
+
+      // Poll until the job is finished
+      const deadline = Date.now() + 10 * 60 * 1000;
+      while (job.status === 'pending' || job.status === 'running') {
+        if (Date.now() > deadline) {
+          throw new Error('Export is taking too long. Please try again later.');
+        }
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        const statusResponse = await apiClient.get(`/admin/exports/jobs/${job.id}/`);
+        job = statusResponse.data;
+        console.log(`Batch export progress: ${job.progress}%`);
+      }
+
+      if (job.status !== 'completed') {
+        throw new Error(`Export failed: ${job.error || 'Unknown error'}`);
+      }
+
+      const response = await apiClient.get(
+        `/admin/exports/jobs/${job.id}/download/`,
+        {
+          responseType: 'blob',
+          timeout: 300000
+        }
+      );
+
       console.log('Batch export response status:', response.status);
 
       if (!response.data || response.data.size === 0) {
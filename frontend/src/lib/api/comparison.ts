@@ -142,6 +142,21 @@ export interface SavedComparison {
   updated_at: string
 }
 
+export interface ComparisonReport {
+  id: string
+  comparison: number | null
+  property_ids: number[]
+  format: 'csv' | 'json'
+  status: 'pending' | 'running' | 'completed' | 'failed'
+  error: string
+  file_size: number
+  download_url: string | null
+  created_at: string
+  started_at: string | null
+  completed_at: string | null
+  expires_at: string | null
+}
+
 export interface ComparisonOptions {
   fields?: string[]
   includeStats?: boolean
@@ -194,14 +209,7 @@ export const comparisonApi = {
 
   // Clear comparison session
   clearComparisonSession: async (): Promise<void> => {
-    const session = await comparisonApi.getComparisonSession()
-    if (session.session_id) {
-      // Clear by removing all properties
-      for (const property of session.properties) {
-        // Toggle removal
-        await comparisonApi.addToComparisonSession(property.id)
-      }
-    }
+    await apiClient.post('/properties/clear_comparison/')
   },
 
   // Compare properties
@@ -331,5 +339,20 @@ export const comparisonApi = {
   }> => {
     const response = await apiClient.get('/comparison/dashboard/')
     return response.data
+  },
+
+  // Queue a comparison report (built in the background, reused while unchanged)
+  requestComparisonReport: async (
+    request: { property_ids?: number[]; comparison_id?: number },
+    format: 'csv' | 'json' = 'csv'
+  ): Promise<ComparisonReport> => {
+    const response = await apiClient.post('/comparisons/generate_export/', { ...request, format })
+    return response.data
+  },
+
+  // Poll a comparison report until its download_url is set
+  getComparisonReport: async (reportId: string): Promise<ComparisonReport> => {
+    const response = await apiClient.get(`/comparisons/reports/${reportId}/`)
+    return response.data
   }
 }
\ No newline at end of file
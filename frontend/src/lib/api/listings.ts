@@ -10,6 +10,43 @@ interface PaginatedResponse<T> {
   current_page: number
 }
 
+export interface MapBounds {
+  south: number
+  west: number
+  north: number
+  east: number
+}
+
+export interface MapMarker {
+  id: number
+  title: string
+  property_type: string
+  listing_type: string
+  price_etb: number | string
+  monthly_rent: number | string | null
+  latitude: number | string
+  longitude: number | string
+  distance_km?: number
+}
+
+export interface MapCluster {
+  cell: string
+  count: number
+  latitude: number
+  longitude: number
+  min_price: number | string | null
+}
+
+export type MapSearchResponse =
+  | { clustered: false; truncated: boolean; count: number; markers: MapMarker[] }
+  | { clustered: true; precision: number; count: number; clusters: MapCluster[] }
+
+export interface MapSearchParams {
+  bounds?: MapBounds
+  center?: { lat: number; lng: number; radiusKm?: number }
+  zoom?: number
+}
+
 export const listingsApi = {
   getProperties: async (filters?: PropertyFilters) => {
     const params = new URLSearchParams()
@@ -60,6 +97,39 @@ export const listingsApi = {
     } as ApiResponse<Property>
   },
 
+  // Markers (or clusters, when zoomed out) inside the visible map area,
+  // filtered on the server instead of downloading every listing
+  getMapMarkers: async ({ bounds, center, zoom }: MapSearchParams, filters?: PropertyFilters) => {
+    const params = new URLSearchParams()
+
+    if (filters) {
+      Object.entries(filters).forEach(([key, value]) => {
+        if (value !== undefined && value !== '' && value !== null) {
+          if (Array.isArray(value)) {
+            value.forEach(v => params.append(key, v))
+          } else {
+            params.append(key, String(value))
+          }
+        }
+      })
+    }
+
+    if (bounds) {
+      params.set('bbox', [bounds.south, bounds.west, bounds.north, bounds.east].join(','))
+    }
+    if (center) {
+      params.set('lat', String(center.lat))
+      params.set('lng', String(center.lng))
+      if (center.radiusKm) params.set('radius_km', String(center.radiusKm))
+    }
+    if (zoom !== undefined) {
+      params.set('zoom', String(Math.round(zoom)))
+    }
+
+    const response = await apiClient.get<MapSearchResponse>(`properties/map/?${params.toString()}`)
+    return response.data
+  },
+
   getFeaturedProperties: async () => {
     const response = await apiClient.get<Property[]>('properties/featured/')
     return response.data
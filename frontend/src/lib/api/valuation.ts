@@ -1,5 +1,10 @@
 import apiClient from './client'
-import { ValuationRequest, ValuationResult } from '@/lib/types/valuation'
+import {
+  BatchValuationRequest,
+  BatchValuationResult,
+  ValuationRequest,
+  ValuationResult,
+} from '@/lib/types/valuation'
 
 export const valuationApi = {
   getValuation: async (data: ValuationRequest): Promise<ValuationResult> => {
@@ -7,6 +12,11 @@ export const valuationApi = {
     return response.data
   },
 
+  getBatchValuation: async (data: BatchValuationRequest): Promise<BatchValuationResult> => {
+    const response = await apiClient.post('/property-valuation/batch/', data)
+    return response.data
+  },
+
   getMarketStats: async (params?: { city?: number; sub_city?: number; property_type?: string }) => {
     const queryParams = new URLSearchParams()
     if (params?.city) queryParams.append('city', params.city.toString())
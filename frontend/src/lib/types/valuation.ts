@@ -10,6 +10,7 @@ export interface ValuationRequest {
   has_security?: boolean
   has_garden?: boolean
   has_furniture?: boolean
+  include_comparables?: boolean
 }
 
 export interface ValuationResult {
@@ -21,10 +22,40 @@ export interface ValuationResult {
   confidence: 'low' | 'medium' | 'high'
   comparables_count: number
   price_per_sqm: number
-  market_trend: string
+  valuation_type?: 'sale' | 'rent' | 'default'
+  market_trend: 'rising' | 'falling' | 'stable'
   trend_strength: number
   valuation_date: string
   note?: string
+  notes?: string
+  model?: {
+    segment: string
+    r_squared: number
+    trained_at: string
+  }
+  comparables?: Array<{
+    id: number
+    total_area: number
+    bedrooms: number
+    built_year: number | null
+    property_type: string
+    price_per_sqm: number
+  }>
+}
+
+export interface BatchValuationRequest {
+  properties: Omit<ValuationRequest, 'include_comparables'>[]
+  include_comparables?: boolean
+}
+
+export type BatchValuationItem =
+  | (ValuationResult & { index: number })
+  | { index: number; error: string }
+
+export interface BatchValuationResult {
+  count: number
+  valued: number
+  results: BatchValuationItem[]
 }
 
 export interface PropertyValuation {